@@ -7,9 +7,10 @@ from random import choice
 from random import randint
 
 import bitmaps as bmp
+from compositor import Compositor
 import narrow_letters as nl
+from button_input import ButtonInput
 import pylaunchpad as pylp
-import show_patterns as patterns
 import wide_font as wf
 
 
@@ -131,9 +132,11 @@ def scan_for_buttons(pad, duration=10):
     :param duration:
     :return:
     """
-    t_end = time.time() + duration
-    while time.time() < t_end:
-        pad.button_state_xy()
+    buttons = ButtonInput(pad)
+    buttons.start()
+    for event in buttons.events(timeout=duration):
+        print(f"X: {event.x} Y: {event.y} Pressed = {event.pressed} Velocity = {event.velocity}")
+    buttons.stop()
 
 
 def fade_up(pad, char):
@@ -163,17 +166,37 @@ def show_x_y_coordinates(pad):
         pad.set_led_xy(i, 0, 53, 53, 53)
         time.sleep(.1)
     print("setting the callback function for 8 secs")
-    pad.in_ports.set_callback(pad.midi_in_cb)
+    buttons = ButtonInput(pad)
+    # Drawing the coordinates takes nearly a second, so it runs on the handler thread, not the midi one
+    buttons.add_handler(lambda event: draw_coordinates(pad, event))
+    buttons.start()
     for i in range(8):
         time.sleep(1)
         # Turn off the very top row lights to indicate how much time remains using the call back feature
         pad.set_led_xy(8 - i, 0, 0, 0, 0)
     print("Cancelling the callback function")
-    pad.in_ports.cancel_callback()
+    buttons.stop()
     time.sleep(.5)
     pad.reset()
 
 
+def draw_coordinates(pad, event):
+    """
+    Show the X, then Y coordinate of a pressed button
+    :param pad:
+    :param event: a ButtonEvent
+    :return:
+    """
+    if not event.pressed:
+        return
+    pad.draw_char(nl.letters[str(event.x)])
+    time.sleep(.3)
+    pad.draw_char(nl.letters['.'])
+    time.sleep(.3)
+    pad.draw_char(nl.letters[str(event.y)])
+    time.sleep(.3)
+
+
 def show_message(pad):
     start_delay_time = pad.delay_time
     pad.delay_time = .05
@@ -227,13 +250,15 @@ def roll_dice(lp, value):
     bitmap = dice[value - 1]
     print(f"Rolling {value}")
 
+    updates = []
     for y in range(0, 5):
         for x in range(0, 5):
             bright = int(bitmap[y][x]) * 5
             if bright == 0:
-                lp.set_led_xy_by_colour(x, y + 1, lp.colours["black"])
+                updates.append((x, y + 1, lp.colours["black"]))
             else:
-                lp.set_led_xy_by_colour(x, y + 1, lp.colours["white"])
+                updates.append((x, y + 1, lp.colours["white"]))
+    lp.set_leds(updates)
 
 
 def tree(pad):
@@ -246,48 +271,28 @@ def tree(pad):
     pad.draw_char(bmp.tree)
 
 
-def snow(pad):
+def snow(pad, frame_time=.8):
     """
-    Animate falling snow on the tree bitmap, redrawing any green pixels as the snow falls down
+    Animate falling snow on the tree bitmap, the snow is a layer in front of the tree, see compositor.py
     :param pad:
+    :param frame_time: seconds between frames
     :return:
     """
-    # A bitmap of possible snow flake positions, that are added to a list and plotted for each row
-    # This lets us identify if a tree pixel gets overwritten with snow and re draw it once the snow has fallen
     snow_flakes = [0x1, 0x2, 0x4, 0x8, 0x10, 0x20, 0x00, 0x40, 0x00, 0x80, 0x00]
 
+    # The tree and the snow are layers, so where snow has fallen past the tree comes back by itself,
+    # and each frame only works out the pads a flake has left or landed on
+    scene = Compositor(pad)
+    scene.add_layer(bmp.tree, 'green')
+    snow_layer = scene.add_layer([], 'white', y=0, z=1)
     snow_rows = []
     for _ in range(10):
         snow_rows.insert(0, choice(snow_flakes))
-
-        for y in range(len(snow_rows)):
-            draw_single_snow_row(pad, snow_rows, y)
+        snow_layer.set_bitmap(snow_rows)
+        scene.show()
         if len(snow_rows) == 9:
             snow_rows.pop(8)
-        time.sleep(.8)
-
-
-def draw_single_snow_row(pad, snow_rows, y):
-    for x in range(0, 8):
-        # the tree starts at row 1, so for row 0, snow is always drawn
-        mask = 128 >> x
-        tree_row = get_tree_row_data(y)
-
-        if mask & snow_rows[y]:
-            pad.set_led_xy_by_colour(x, y, pad.colours['white'])
-        else:
-            if tree_row & mask:
-                pad.set_led_xy_by_colour(x, y, pad.colours['green'])
-            else:
-                pad.set_led_xy_by_colour(x, y, pad.colours['black'])
-
-
-def get_tree_row_data(y):
-    if y == 0:
-        tree_row = 0
-    else:
-        tree_row = bmp.tree[y - 1]
-    return tree_row
+        time.sleep(frame_time)
 
 
 def demos(pad):
@@ -380,6 +385,8 @@ print("Press any of the Launchpad Keys or the bottom right pad to exit")
 print("Choose a colour to paint with or the bottom right pad to exit")
 #painter_with_colour(launchpad)
 
+# Pattern playback brings in the pattern file and baking code, so only load it when it is shown
+import show_patterns as patterns
 patterns.show_file(launchpad, "fireworks.csv")
 random_dice(launchpad)
 heart(launchpad)
@@ -38,27 +38,19 @@ def theatre_chase(pad, r, g, b, step=5):
     """
     for _ in range(0, 32):
         for col in range(0, step):
-            for y in range(0, 9):
-                for x in range(0, 8, step):
-                    pad.set_led_xy(x + col, y, r, g, b)
+            pad.set_leds([(x + col, y, (r, g, b)) for y in range(0, 9) for x in range(0, 8, step)])
             time.sleep(.09)
-            for y in range(0, 9):
-                for x in range(0, 8, step):
-                    pad.set_led_xy(x + col, y, 0, 0, 0)
+            pad.set_leds([(x + col, y, (0, 0, 0)) for y in range(0, 9) for x in range(0, 8, step)])
 
 
 def theater_chase_rainbow(pad):
     step = 5
     for j in range(0, 64):
         for column in range(0, step):
-            for y in range(0, 9):
-                for x in range(0, 8, step):
-                    r, g, b = (wheel((x + (y * 9) + j) % 127))
-                    pad.set_led_xy(x + column, y, r, g, b)
+            pad.set_leds([(x + column, y, wheel((x + (y * 9) + j) % 127))
+                          for y in range(0, 9) for x in range(0, 8, step)])
             time.sleep(.09)
-            for y in range(0, 9):
-                for x in range(0, 8, step):
-                    pad.set_led_xy(x + column, y, 0, 0, 0)
+            pad.set_leds([(x + column, y, (0, 0, 0)) for y in range(0, 9) for x in range(0, 8, step)])
 
 
 # Slightly different, this makes the rainbow equally distributed throughout
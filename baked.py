@@ -0,0 +1,471 @@
+"""
+Bake an animation into the exact midi messages it sends, so it can be replayed without doing any of the work again.
+Playing a pattern converts every colour and encodes every message each time round, and scrolling text lays
+out and encodes the same frames each time it is shown. Baking runs the drawing code once against a recorder
+in place of the midi port, with a clock that doesn't wait, and keeps each message with the time it would
+have been sent. Replaying is then a wait and a send_message() per message.
+The messages are for one model of Launchpad, as encoded for its profile, so a bake only plays on that model.
+A bake can be saved as a standard midi file, which keeps the timing, or the sysex messages as a .syx file.
+Any midi player can play the file, what LPMidi needs to loop it without going blank each time round is kept
+in sequencer specific events, which players skip.
+e.g.
+baked = bake(pad, lambda clock: pad.scroll_message("Hello"))
+baked.play(pad, loops=3)
+baked.save("hello.mid")
+"""
+import json
+import struct
+import time
+
+from frame_clock import FrameClock, wait_until
+
+# Midi file timing, 1000 ticks per quarter note at 1,000,000 microseconds per quarter note is 1ms per tick
+TICKS_PER_QUARTER = 1000
+TEMPO = 1000000
+TEXT_PREFIX = "LPMidi "  # Start of the text event that says which model a midi file was baked for
+
+
+class BakeClock(FrameClock):
+    """
+    A FrameClock that doesn't wait, each tick moves the recording on by one frame time instead
+    """
+
+    def __init__(self, recorder, frame_time=0.1, drop_frames=False, spin_time=0):
+        FrameClock.__init__(self, frame_time, drop_frames, spin_time)
+        self.recorder = recorder
+
+    def tick(self):
+        if self.next_deadline is None:
+            self.start()
+        self.frames += 1
+        self.recorder.tick(self.frame_time)
+        return True
+
+
+class Recorder(object):
+    """
+    Stands in for the pad's midi output port while baking, keeps each message and when it was sent
+    """
+
+    def __init__(self, pad=None):
+        """
+        :param pad: the Launchpad being baked for, to note what it shows after the first frame
+        """
+        self.pad = pad
+        self.time = 0.0  # Seconds from the start of the bake
+        self.events = []  # (time, message)
+        # Messages and LED writes before the animation's first frame, i.e. the blank, see start_frames()
+        self.frame_start = 0
+        self.start_writes = 0
+        # (messages sent, time, what every pad shows) once the first frame's time is over, see bake()
+        self.first_frame = None
+
+    def send_message(self, message):
+        self.events.append((self.time, list(message)))
+
+    def start_frames(self):
+        """
+        Everything drawn from now on is part of the animation
+        """
+        self.frame_start = len(self.events)
+        self.start_writes = self.pad.write_count
+
+    def mark_first_frame(self):
+        """
+        Note what has been sent and shown once the first frame has been drawn and the clock is moving on.
+        Some drawing code ticks before drawing each frame and some after, so this goes by whether anything
+        has been drawn yet rather than by counting ticks
+        """
+        if self.first_frame is None and self.pad is not None and \
+                (self.pad.write_count > self.start_writes or len(self.events) > self.frame_start):
+            self.first_frame = len(self.events), self.time, [row[:] for row in self.pad.led_shown]
+
+    def tick(self, frame_time):
+        """
+        Move the recording on by a frame, for BakeClock.tick()
+        """
+        self.mark_first_frame()
+        self.time += frame_time
+
+    def clock(self, frame_time=0.1, drop_frames=False, spin_time=0):
+        """
+        Make a clock that records rather than waits, used in place of FrameClock while baking
+        """
+        return BakeClock(self, frame_time, drop_frames, spin_time)
+
+
+def bake(pad, draw, frame_time=None, start_blank=True):
+    """
+    Record what an animation sends
+    e.g.
+    bake(pad, lambda clock: show_patterns.show_frames(pad, show_patterns.stream_frames("fly.csv"), clock=clock))
+    bake(pad, lambda clock: pad.scroll_message("Hello"))
+    :param pad: the Launchpad to bake for. Nothing is sent to it, but what it is showing is forgotten,
+    see clear_led_state(), because the drawing code updates its LED buffer as if the messages had been sent
+    :param draw: function(clock) that draws the animation, passing clock to any FrameClock parameter.
+    Scrolling text makes its own clocks, those don't wait while baking either
+    :param frame_time: seconds per frame for the clock passed to draw, defaults to pad.delay_time
+    :param start_blank: start by turning every pad off, so the bake looks the same whatever the Launchpad
+    was showing before. Only the first loop starts blank, the loops after it go straight from the last frame
+    to the first, and the blank isn't sent at all if every pad is known to be off already
+    :return: a BakedAnimation
+    """
+    if frame_time is None:
+        frame_time = pad.delay_time
+    recorder = Recorder(pad)
+    with pad.led_lock:
+        out_port, clock_factory, auto_flush = pad.lp_midi_out_port, pad.clock_factory, pad.auto_flush
+        # Nothing reaches the Launchpad while baking, so afterwards it still shows what it did before
+        led_state = pad.led_buffer, pad.led_shown, pad.dirty_leds
+        pad.lp_midi_out_port = recorder
+        pad.clock_factory = recorder.clock
+        pad.auto_flush = True
+        try:
+            pad.clear_led_state()
+            if start_blank:
+                pad.fill_leds(0)
+            blank_end = len(recorder.events)
+            recorder.start_frames()
+            draw(recorder.clock(frame_time))
+            pad.flush()
+            recorder.mark_first_frame()
+            final_state = [row[:] for row in pad.led_shown]
+            # The blank and the first frame were sent to a Launchpad showing something else. The loops after
+            # the first send only the pads that differ between the last frame and the first instead
+            first_end, first_time, first_state = recorder.first_frame or (len(recorder.events), 0.0, final_state)
+            seam_start = len(recorder.events)
+            pad.auto_flush = False
+            for x, y in pad.profile.pads:
+                if first_state[y][x] is not None:
+                    pad.store_led(x, y, first_state[y][x])
+            pad.flush()
+            seam = [message for _, message in recorder.events[seam_start:]]
+            del recorder.events[seam_start:]
+        finally:
+            pad.lp_midi_out_port = out_port
+            pad.clock_factory = clock_factory
+            pad.auto_flush = auto_flush
+            pad.led_buffer, pad.led_shown, pad.dirty_leds = led_state
+    # A loop lasts as long as its ticks. Drawing code that ticks before it draws has no tick after the last frame,
+    # so that is held for as long as the first frame waited, as it would be with a clock that kept going
+    blank = [message for _, message in recorder.events[:blank_end]]
+    return BakedAnimation(recorder.events[blank_end:], recorder.time + first_time, pad.profile.key, final_state,
+                          blank, seam, first_time, first_end - blank_end)
+
+
+class BakedAnimation(object):
+    """
+    Messages ready to send, grouped by the time they are sent at
+    """
+
+    def __init__(self, events, duration=None, profile_key=None, final_state=None, blank=None, seam=None,
+                 seam_time=0.0, loop_from=None):
+        """
+        :param events: list of (seconds from the start, message), in time order
+        :param duration: seconds the animation lasts, defaults to the time of the last message
+        :param profile_key: the device_profiles key of the model the messages are for, None if not known
+        :param final_state: what each pad shows at the end, as in LaunchpadBase.led_shown, None if not known
+        :param blank: messages that turn every pad off, sent before the first loop unless they are all off already
+        :param seam: messages that take the pads from the last frame to the first, sent at seam_time on the loops
+        after the first in place of the first frame's messages
+        :param seam_time: seconds from the start of a loop the first frame is shown at
+        :param loop_from: how many of the events are the first frame's, None to send all of them every loop
+        """
+        self.frames = group_events(events)  # (time, list of messages)
+        if duration is None:
+            duration = self.frames[-1][0] if self.frames else 0.0
+        self.duration = duration
+        self.profile_key = profile_key
+        self.final_state = final_state
+        self.blank = list(blank or [])
+        self.seam = list(seam or [])
+        self.seam_time = seam_time
+        self.loop_from = loop_from
+        if loop_from is None:
+            self.repeat_frames = self.frames
+            self.loop_time = duration
+        else:
+            self.repeat_frames = group_events([(seam_time, message) for message in self.seam] + events[loop_from:])
+            # Seconds from the start of one loop to the start of the next
+            self.loop_time = duration - seam_time
+
+    def events(self):
+        """
+        :return: a generator of (time, message)
+        """
+        for message in self.blank:
+            yield 0.0, message
+        for when, messages in self.frames:
+            for message in messages:
+                yield when, message
+
+    def message_count(self):
+        return sum(len(messages) for _, messages in self.frames)
+
+    def byte_count(self):
+        return sum(len(message) for _, message in self.events())
+
+    def play(self, pad, loops=1, speed=1.0):
+        """
+        Send the messages at the times they were baked with
+        :param pad: a Launchpad of the model the animation was baked for
+        :param loops: how many times to play it
+        :param speed: 2.0 plays twice as fast
+        :return:
+        """
+        if self.profile_key is not None and pad.profile.key != self.profile_key:
+            raise ValueError(f"Baked for {self.profile_key}, this is {pad.profile.name}")
+        send_message = pad.send_message
+        with pad.led_lock:
+            blank = self.blank if any(pad.led_shown[y][x] != 0 for x, y in pad.profile.pads) else []
+        start = time.perf_counter()
+        for message in blank:
+            send_message(message)
+        for loop in range(loops):
+            if loop:
+                start += self.loop_time / speed
+            for when, messages in self.frames if loop == 0 else self.repeat_frames:
+                wait_until(start + when / speed)
+                for message in messages:
+                    send_message(message)
+        wait_until(start + self.duration / speed)
+        # The pad's LED buffer didn't see any of that, tell it what is showing now
+        with pad.led_lock:
+            if self.final_state is None:
+                pad.clear_led_state()
+            else:
+                pad.led_buffer = [row[:] for row in self.final_state]
+                pad.led_shown = [row[:] for row in self.final_state]
+                pad.dirty_leds = {}
+
+    def save(self, filename):
+        """
+        :param filename: ending in .syx for just the sysex messages, anything else is a standard midi file
+        :return:
+        """
+        if filename.lower().endswith(".syx"):
+            self.save_syx(filename)
+        else:
+            self.save_midi(filename)
+
+    def save_syx(self, filename):
+        """
+        Write the sysex messages one after the other, as sysex librarians expect. There's no timing in
+        a .syx file, so this is only any use for a still picture
+        :param filename:
+        :return:
+        :raises: ValueError if there are notes or controllers, which can't go in a .syx file
+        """
+        if any(message[0] != 0xF0 for _, message in self.events()):
+            raise ValueError(f"{filename} can only hold sysex messages, try a .mid file")
+        with open(filename, 'wb') as syx:
+            for _, message in self.events():
+                syx.write(bytes(message))
+
+    def save_midi(self, filename):
+        """
+        Write a type 0 standard midi file, at one tick per millisecond
+        :param filename:
+        :return:
+        """
+        track = bytearray()
+        track += variable_length(0) + bytes((0xFF, 0x51, 3)) + TEMPO.to_bytes(3, 'big')
+        if self.profile_key is not None:
+            text = (TEXT_PREFIX + self.profile_key).encode('ascii')
+            track += variable_length(0) + bytes((0xFF, 0x01)) + variable_length(len(text)) + text
+        events = list(self.events())
+        if self.loop_from is not None:
+            # Where the first frame ends, and what to send in its place on the loops after the first
+            events.insert(len(self.blank) + self.loop_from, (self.seam_time, lpmidi_data('loop', self.seam)))
+        # Where the blank ends, so it is only sent before the first loop
+        events.insert(len(self.blank), (0.0, lpmidi_data('frames')))
+        if self.final_state is not None:
+            events.insert(0, (0.0, lpmidi_data('state', self.final_state)))
+        tick = 0
+        for when, message in events:
+            event_tick = int(round(when * 1000))
+            track += variable_length(event_tick - tick)
+            tick = event_tick
+            if isinstance(message, bytes):
+                # Sequencer specific, players skip it
+                track += bytes((0xFF, 0x7F)) + variable_length(len(message)) + message
+            elif message[0] == 0xF0:
+                # The length covers everything after the F0, including the F7
+                track += bytes((0xF0,)) + variable_length(len(message) - 1) + bytes(message[1:])
+            else:
+                track += bytes(message)
+        track += variable_length(max(int(round(self.duration * 1000)) - tick, 0)) + bytes((0xFF, 0x2F, 0))
+        with open(filename, 'wb') as midi_file:
+            midi_file.write(b'MThd' + struct.pack('>IHHH', 6, 0, 1, TICKS_PER_QUARTER))
+            midi_file.write(b'MTrk' + struct.pack('>I', len(track)) + track)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Read a bake back from a midi file, or a .syx file whose messages are all sent at once
+        :param filename:
+        :return: a BakedAnimation
+        """
+        with open(filename, 'rb') as baked_file:
+            data = baked_file.read()
+        if filename.lower().endswith(".syx"):
+            events = []
+            start = data.find(0xF0)
+            while start >= 0:
+                end = data.index(0xF7, start)
+                events.append((0.0, list(data[start:end + 1])))
+                start = data.find(0xF0, end)
+            return cls(events)
+        events, duration, profile_key, notes = read_midi_file(data)
+        final_state, blank_end, seam, seam_time, loop_from = None, 0, None, 0.0, None
+        for when, position, text in notes:
+            kind, _, value = text.partition(" ")
+            if kind == 'state':
+                # JSON has no tuples, RGB values come back as lists
+                final_state = [[tuple(led) if isinstance(led, list) else led for led in row]
+                               for row in json.loads(value)]
+            elif kind == 'frames':
+                blank_end = position
+            elif kind == 'loop':
+                seam, seam_time, loop_from = json.loads(value), when, position - blank_end
+        blank = [message for _, message in events[:blank_end]]
+        return cls(events[blank_end:], duration, profile_key, final_state, blank, seam, seam_time, loop_from)
+
+
+def lpmidi_data(kind, value=None):
+    """
+    What goes in a sequencer specific event that only LPMidi reads, see read_midi_file()
+    :param kind: a word saying what it is
+    :param value: anything json can write, or None
+    :return: bytes
+    """
+    text = TEXT_PREFIX + kind
+    if value is not None:
+        text += " " + json.dumps(value, separators=(',', ':'))
+    return text.encode('ascii')
+
+
+def group_events(events):
+    """
+    :param events: list of (time, message), in time order
+    :return: list of (time, list of the messages sent at that time)
+    """
+    frames = []
+    for when, message in events:
+        if frames and frames[-1][0] == when:
+            frames[-1][1].append(message)
+        else:
+            frames.append((when, [message]))
+    return frames
+
+
+def variable_length(value):
+    """
+    A midi file variable length number, 7 bits per byte with the top bit set on all but the last
+    :param value:
+    :return: bytes
+    """
+    encoded = bytearray((value & 0x7F,))
+    value >>= 7
+    while value:
+        encoded.insert(0, (value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(encoded)
+
+
+def read_variable_length(data, position):
+    """
+    :return: (value, position after it)
+    """
+    value = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, position
+
+
+def read_midi_file(data):
+    """
+    Read the events from a standard midi file, all tracks are merged
+    :param data: the bytes of the file
+    :return: (list of (seconds, message), duration in seconds, the profile key if LPMidi baked the file,
+    list of (seconds, how many messages come before it, text) for LPMidi's sequencer specific events)
+    :raises: ValueError if it isn't a midi file we can read
+    """
+    if data[:4] != b'MThd':
+        raise ValueError("Not a midi file")
+    header_length, _, track_count, division = struct.unpack_from('>IHHH', data, 4)
+    if division & 0x8000:
+        raise ValueError("SMPTE timed midi files aren't supported")
+    position = 8 + header_length
+    events = []
+    tempo_changes = [(0, TEMPO)]  # (tick, microseconds per quarter note), shared by all the tracks
+    profile_key = None
+    end_tick = 0
+    for _ in range(track_count):
+        if data[position:position + 4] != b'MTrk':
+            raise ValueError("Midi track missing")
+        track_length, = struct.unpack_from('>I', data, position + 4)
+        position += 8
+        track_end = position + track_length
+        tick = 0
+        status = None
+        while position < track_end:
+            delta, position = read_variable_length(data, position)
+            tick += delta
+            if data[position] & 0x80:
+                status = data[position]
+                position += 1
+            elif status is None:
+                # Running status, but there's no earlier status byte for it to carry on from
+                raise ValueError("Midi data byte with no status byte before it")
+            if status == 0xFF:
+                meta_type = data[position]
+                length, position = read_variable_length(data, position + 1)
+                meta = data[position:position + length]
+                position += length
+                if meta_type == 0x51:
+                    tempo_changes.append((tick, int.from_bytes(meta, 'big')))
+                elif meta_type == 0x01 and meta.startswith(TEXT_PREFIX.encode('ascii')):
+                    profile_key = meta[len(TEXT_PREFIX):].decode('ascii')
+                elif meta_type == 0x7F and meta.startswith(TEXT_PREFIX.encode('ascii')):
+                    # Kept in with the messages for now, so it stays in the same place once they're sorted
+                    events.append((tick, meta[len(TEXT_PREFIX):].decode('ascii')))
+                status = None
+            elif status in (0xF0, 0xF7):
+                length, position = read_variable_length(data, position)
+                body = list(data[position:position + length])
+                position += length
+                # F7 is a sysex continuation or escape, the bytes are sent as they are
+                events.append((tick, [0xF0] + body if status == 0xF0 else body))
+                status = None
+            else:
+                size = 1 if status & 0xF0 in (0xC0, 0xD0) else 2
+                events.append((tick, [status] + list(data[position:position + size])))
+                position += size
+        end_tick = max(end_tick, tick)
+        position = track_end
+    tempo_changes.sort(key=lambda change: change[0])
+    events.sort(key=lambda event: event[0])
+    messages = []
+    notes = []
+    for tick, message in events:
+        seconds = ticks_to_seconds(tick, tempo_changes, division)
+        if isinstance(message, str):
+            notes.append((seconds, len(messages), message))
+        else:
+            messages.append((seconds, message))
+    return messages, ticks_to_seconds(end_tick, tempo_changes, division), profile_key, notes
+
+
+def ticks_to_seconds(tick, tempo_changes, division):
+    seconds = 0.0
+    last_tick, tempo = 0, TEMPO
+    for change_tick, change_tempo in tempo_changes:
+        if change_tick >= tick:
+            break
+        seconds += (change_tick - last_tick) * tempo / (division * 1000000.0)
+        last_tick, tempo = change_tick, change_tempo
+    return seconds + (tick - last_tick) * tempo / (division * 1000000.0)
@@ -0,0 +1,338 @@
+"""
+Measure how much work the drawing, scrolling and pattern playback code does, without a Launchpad.
+Each benchmark runs against a MockMidiBackend for every Launchpad model and reports
+Python CPU time, midi messages and bytes per frame of animation, plus peak memory.
+Results can be saved as a JSON baseline and compared against later, so we have numbers before and after
+any optimisation rather than eyeballing LEDs.
+
+python benchmarks.py                          # Run everything and print a table
+python benchmarks.py --save baseline.json     # Keep the results
+python benchmarks.py --compare baseline.json  # Show the change from a saved baseline
+python benchmarks.py --imports                # How long importing pylaunchpad takes, and what takes the time
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import arduinoPort
+import baked
+import bitmaps as bmp
+import midi_backend
+import narrow_letters as nl
+import pattern_file
+import pylaunchpad as pylp
+import show_patterns
+
+PATTERN_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "patterns", "fireworks.csv")
+# The same pattern converted to a binary pattern file, made the first time it is needed
+BINARY_PATTERN_FILE = os.path.join(tempfile.gettempdir(), "pylaunchpad_benchmark_fireworks.lpat")
+binary_pattern_made = False
+
+# Most milliseconds importing pylaunchpad should take, on top of starting Python. A program that only
+# flashes a colour shouldn't wait for fonts, NumPy or a GUI toolkit it never uses
+IMPORT_BUDGET_MS = 15
+
+# Launchpad class and mock port name for each device we measure
+DEVICES = {'LaunchpadMk2': (pylp.LaunchpadMk2, midi_backend.MOCK_PORT_NAMES['mk2']),
+           'LaunchpadMiniMk3': (pylp.LaunchpadMiniMk3, midi_backend.MOCK_PORT_NAMES['minimk3']),
+           'LaunchpadPro': (pylp.LaunchpadPro, midi_backend.MOCK_PORT_NAMES['pro']),
+           'LpMini': (pylp.LpMini, midi_backend.MOCK_MINI_PORT_NAME)}
+
+
+def make_pad(device):
+    """
+    Make a Launchpad object connected to a mock backend, reset and ready to draw
+    :param device: a key of DEVICES
+    :return: the pad and its backend
+    """
+    pad_class, port_name = DEVICES[device]
+    backend = midi_backend.MockMidiBackend(port_names=[port_name], keep_messages=False)
+    pad = pad_class(port_name, 0, 0, backend)
+    pad.open()
+    pad.programmer_mode()
+    pad.reset()
+    pad.draw_colour = pad.colours['red']
+    pad.delay_time = 0  # No waiting between frames, we only want the cost of the work
+    pylp.draw_cache.clear()  # Every run starts with nothing cached
+    backend.clear()
+    return pad, backend
+
+
+# Each benchmark takes a pad and returns how many frames of animation it drew
+
+def bench_draw_char(pad):
+    message = "The quick brown fox jumps over the lazy dog"
+    for char in message:
+        pad.draw_char(nl.letters[char])
+    return len(message)
+
+
+def bench_flash_heart(pad):
+    # A sign loop, the same two bitmaps over and over, which draw_char's cache should make cheap
+    frames = 100
+    for _ in range(frames // 2):
+        pad.draw_char(bmp.heart_1)
+        pad.draw_char(bmp.heart_1f)
+    return frames
+
+
+def bench_scroll_message(pad):
+    pad.scroll_message("Hello World")
+    return pad.frame_clock.frames
+
+
+def bench_scroll_frames_right(pad):
+    pad.scroll_frames_right([bmp.invader_one, bmp.invader_two])
+    return pad.frame_clock.frames
+
+
+def bench_set_all_on(pad):
+    frames = 64
+    for level in range(frames):
+        pad.set_all_on(level, 63 - level, level // 2)
+    return frames
+
+
+def bench_read_file(pad):
+    # Only parses the file, nothing is sent
+    frames = 0
+    for _ in range(10):
+        frames += len(show_patterns.read_file(PATTERN_FILE))
+    return frames
+
+
+def bench_show_frames(pad):
+    frame_data = show_patterns.read_file(PATTERN_FILE)
+    show_patterns.show_frames(pad, frame_data, frame_time=0)
+    return len(frame_data)
+
+
+def bench_stream_frames(pad):
+    # The same as show_frames, but the file is read as it is played
+    return show_patterns.show_frames(pad, show_patterns.stream_frames(PATTERN_FILE), frame_time=0)
+
+
+def bench_show_frames_palette(pad):
+    # The same frames sent as the nearest palette colours
+    pad.palette_mode = True
+    return bench_show_frames(pad)
+
+
+def bench_load_frames(pad):
+    # Only decodes the file, with NumPy if it is installed, nothing is sent
+    frames = 0
+    for _ in range(10):
+        frames += len(show_patterns.load_frames(PATTERN_FILE))
+    return frames
+
+
+def bench_pattern_file(pad):
+    global binary_pattern_made
+    if not binary_pattern_made:
+        # Converted once per run, so a file left by an older version is never used
+        pattern_file.convert_csv(PATTERN_FILE, BINARY_PATTERN_FILE)
+        binary_pattern_made = True
+    with pattern_file.PatternFile(BINARY_PATTERN_FILE) as pattern:
+        pattern.play(pad, frame_time=0)
+        return len(pattern)
+
+
+def bench_baked_replay(pad):
+    # The pattern is baked once, the three loops only send the stored messages
+    frames = []
+    animation = baked.bake(pad, lambda clock: frames.append(show_patterns.show_frames(
+        pad, show_patterns.stream_frames(PATTERN_FILE), clock=clock)), frame_time=0)
+    animation.play(pad, loops=3)
+    return frames[0] * 3
+
+
+def bench_rainbow_cycle(pad):
+    arduinoPort.rainbow_cycle(pad)
+    return 128 * 2
+
+
+BENCHMARKS = {'draw_char': bench_draw_char,
+              'flash_heart': bench_flash_heart,
+              'scroll_message': bench_scroll_message,
+              'scroll_frames_right': bench_scroll_frames_right,
+              'set_all_on': bench_set_all_on,
+              'read_file': bench_read_file,
+              'load_frames': bench_load_frames,
+              'show_frames': bench_show_frames,
+              'show_frames_palette': bench_show_frames_palette,
+              'stream_frames': bench_stream_frames,
+              'pattern_file': bench_pattern_file,
+              'baked_replay': bench_baked_replay,
+              'rainbow_cycle': bench_rainbow_cycle}
+
+
+def run_one(name, device, repeat=3):
+    """
+    Run a single benchmark on a single device
+    :param name: key of BENCHMARKS
+    :param device: key of DEVICES
+    :param repeat: how many times to time it, the fastest run is kept
+    :return: dictionary of results, or None if the device can't run this benchmark
+    """
+    bench = BENCHMARKS[name]
+    best_cpu = None
+    frames = 0
+    messages = 0
+    byte_count = 0
+    for _ in range(repeat):
+        pad, backend = make_pad(device)
+        if name == 'set_all_on' and not hasattr(pad, 'set_all_on'):
+            return None
+        start = time.process_time()
+        frames = bench(pad)
+        cpu = time.process_time() - start
+        if best_cpu is None or cpu < best_cpu:
+            best_cpu = cpu
+        messages = backend.message_count()
+        byte_count = backend.byte_count()
+
+    # Memory is measured in a separate run as tracemalloc slows everything down
+    pad, backend = make_pad(device)
+    tracemalloc.start()
+    bench(pad)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    frames = max(frames, 1)
+    return {'frames': frames,
+            'cpu_ms_per_frame': 1000.0 * best_cpu / frames,
+            'messages_per_frame': messages / frames,
+            'bytes_per_frame': byte_count / frames,
+            'usb_fps_estimate': backend.estimate_fps(frames),
+            'peak_memory_kb': peak / 1024.0}
+
+
+def run_all(names=None, devices=None, repeat=3):
+    """
+    :return: nested dictionary of results[benchmark][device]
+    """
+    names = names or list(BENCHMARKS)
+    devices = devices or list(DEVICES)
+    results = {}
+    for name in names:
+        results[name] = {}
+        for device in devices:
+            result = run_one(name, device, repeat)
+            if result is not None:
+                results[name][device] = result
+    return results
+
+
+def print_results(results, baseline=None):
+    """
+    Print a table of results, with the percentage change from the baseline if given
+    :param results:
+    :param baseline:
+    :return:
+    """
+    columns = ['cpu_ms_per_frame', 'messages_per_frame', 'bytes_per_frame', 'peak_memory_kb']
+    print(f"{'benchmark':20} {'device':17}" + "".join(f"{column:>22}" for column in columns))
+    for name, devices in results.items():
+        for device, result in devices.items():
+            line = f"{name:20} {device:17}"
+            for column in columns:
+                value = f"{result[column]:.3f}"
+                old = baseline.get(name, {}).get(device, {}).get(column) if baseline else None
+                if old:
+                    value += f" ({100.0 * (result[column] - old) / old:+.0f}%)"
+                line += f"{value:>22}"
+            print(line)
+
+
+def measure_import(module='pylaunchpad', repeat=10):
+    """
+    Import a module in a new Python with -X importtime, the fastest of several runs as the first
+    may be writing .pyc files. They are always written, as they would be for anyone using the library
+    :param module: what to import
+    :param repeat: how many times to run it
+    :return: (milliseconds for the whole import, list of (module, self ms, total ms) for everything it imported)
+    """
+    best = None
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    for _ in range(repeat):
+        run = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             cwd=os.path.dirname(os.path.realpath(__file__)), env=env, capture_output=True, text=True)
+        if run.returncode:
+            raise RuntimeError(f"Couldn't import {module}: {run.stderr.strip().splitlines()[-1]}")
+        modules = []
+        for line in run.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package, indented under the module that imported it
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            self_us, total_us, name = line[len("import time:"):].split("|")
+            top_level = not name[1:].startswith(" ")
+            if top_level and name.strip() != module:
+                # Loaded by Python at start up, not by this import
+                modules = []
+                continue
+            modules.append((name.strip(), int(self_us) / 1000.0, int(total_us) / 1000.0))
+            if top_level:
+                break
+        total = modules[-1][2]
+        if best is None or total < best[0]:
+            best = total, modules
+    return best
+
+
+def print_imports(module='pylaunchpad', budget=IMPORT_BUDGET_MS, top=10):
+    """
+    Print how long a module takes to import and the slowest modules it brings in
+    :return: True if it was within the budget
+    """
+    total, modules = measure_import(module)
+    print(f"import {module}: {total:.1f}ms, budget {budget}ms")
+    print(f"{'module':30}{'self ms':>10}{'total ms':>10}")
+    for name, self_ms, total_ms in sorted(modules, key=lambda entry: -entry[1])[:top]:
+        print(f"{name:30}{self_ms:10.2f}{total_ms:10.2f}")
+    if total > budget:
+        print(f"Over budget by {total - budget:.1f}ms")
+        return False
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pylaunchpad without a Launchpad")
+    parser.add_argument("--benchmark", action="append", choices=list(BENCHMARKS),
+                        help="only run this benchmark, can be given more than once")
+    parser.add_argument("--device", action="append", choices=list(DEVICES),
+                        help="only run on this device, can be given more than once")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per benchmark, the fastest is kept")
+    parser.add_argument("--save", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare against a JSON file saved earlier with --save")
+    parser.add_argument("--imports", action="store_true", help="only time importing pylaunchpad")
+    args = parser.parse_args(argv)
+    if args.imports:
+        sys.exit(0 if print_imports() else 1)
+
+    # Keep the chatter from show_patterns and the Pro out of the results table
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        results = run_all(args.benchmark, args.device, args.repeat)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_results(results, baseline)
+    if args.save:
+        with open(args.save, "w") as results_file:
+            json.dump(results, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
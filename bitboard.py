@@ -0,0 +1,206 @@
+"""
+An 8 * 8 monochrome bitmap packed into one 64 bit number.
+The bitmaps and fonts are lists of 8 numbers, one per row with the left most pixel in bit 7. A Bitboard keeps
+the same rows, row 0 in the lowest byte, so moving, scrolling, rotating and combining whole bitmaps are a few
+integer operations rather than a loop over every row and column.
+A Bitboard can be used anywhere a list of rows is, e.g. pad.draw_char(board), and board.rows() gives the list.
+e.g.
+ghost = Bitboard.from_rows(bitmaps.ghost_one)
+pad.draw_char(ghost.rotate())
+pad.draw_char(ghost.shift(2, 0) | Bitboard.from_rows(bitmaps.heart_2))
+"""
+
+FULL = 0xFFFFFFFFFFFFFFFF
+EVERY_BYTE = 0x0101010101010101  # Multiply a byte by this to copy it into every row
+
+# What is left of each row after shifting n columns right or left, so bits don't carry into the next row
+RIGHT_KEEP = [(0xFF >> n) * EVERY_BYTE for n in range(9)]
+LEFT_KEEP = [((0xFF << n) & 0xFF) * EVERY_BYTE for n in range(9)]
+
+COLUMNS = [(128 >> x) * EVERY_BYTE for x in range(8)]  # COLUMNS[x] has every pixel in column x set
+
+# Each byte with its bits the other way round, to mirror all 8 rows with one bytes.translate()
+REVERSE_BITS = bytes(int(f"{value:08b}"[::-1], 2) for value in range(256))
+
+
+def transpose_bits(bits):
+    """
+    Swap rows and columns, pixel x, y moves to y, x. Three rounds of swapping blocks of bits across the
+    diagonal, 4 * 4 blocks, then 2 * 2, then single pixels
+    :param bits: a 64 bit bitmap as in Bitboard
+    :return: the transposed bitmap
+    """
+    t = bits ^ (bits << 36)
+    bits ^= 0xF0F0F0F00F0F0F0F & (t ^ (bits >> 36))
+    t = 0xCCCC0000CCCC0000 & (bits ^ (bits << 18))
+    bits ^= t ^ (t >> 18)
+    t = 0xAA00AA00AA00AA00 & (bits ^ (bits << 9))
+    bits ^= t ^ (t >> 9)
+    return bits & FULL
+
+
+class Bitboard(object):
+    """
+    An 8 * 8 bitmap, each method returns a new Bitboard and leaves this one alone
+    """
+
+    def __init__(self, bits=0):
+        """
+        :param bits: pixel x, y is bit 8 * y + 7 - x, so the low byte is the top row as it is in the row lists
+        """
+        self.bits = bits & FULL
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        :param rows: 8 numbers, one per row, the left most pixel is bit 7, e.g. from bitmaps.py or a font.
+        Anything above bit 7 is ignored, as draw_char() does
+        :return: a Bitboard
+        """
+        return cls(int.from_bytes(bytes([int(row) & 0xFF for row in rows[:8]]), 'little'))
+
+    def rows(self):
+        """
+        :return: list of 8 numbers, one per row, as used by draw_char()
+        """
+        return list(self.bits.to_bytes(8, 'little'))
+
+    # Enough of a list of rows for draw_char()
+    def __len__(self):
+        return 8
+
+    def __getitem__(self, y):
+        return self.rows()[y]
+
+    def __iter__(self):
+        return iter(self.rows())
+
+    def __eq__(self, other):
+        return isinstance(other, Bitboard) and other.bits == self.bits
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __repr__(self):
+        return f"Bitboard(0x{self.bits:016X})"
+
+    def __or__(self, other):
+        return Bitboard(self.bits | other.bits)
+
+    def __and__(self, other):
+        return Bitboard(self.bits & other.bits)
+
+    def __xor__(self, other):
+        return Bitboard(self.bits ^ other.bits)
+
+    def __invert__(self):
+        return Bitboard(~self.bits)
+
+    def get_pixel(self, x, y):
+        if not (0 <= x < 8 and 0 <= y < 8):
+            return False
+        return bool(self.bits >> (8 * y + 7 - x) & 1)
+
+    def set_pixel(self, x, y, on=True):
+        """
+        :return: a copy with the pixel at x, y turned on or off, pixels off the grid are ignored
+        """
+        if not (0 <= x < 8 and 0 <= y < 8):
+            return self
+        bit = 1 << (8 * y + 7 - x)
+        return Bitboard(self.bits | bit if on else self.bits & ~bit)
+
+    def pixels(self):
+        """
+        :return: a generator of (x, y) for every pixel that is on, top row first
+        """
+        bits = self.bits
+        while bits:
+            lowest = bits & -bits
+            bit = lowest.bit_length() - 1
+            yield 7 - (bit & 7), bit >> 3
+            bits ^= lowest
+
+    def count(self):
+        """
+        :return: how many pixels are on
+        """
+        return bin(self.bits).count("1")
+
+    def column(self, x):
+        """
+        :return: a Bitboard with only column x
+        """
+        return Bitboard(self.bits & COLUMNS[x])
+
+    def shift(self, dx=0, dy=0):
+        """
+        Move the whole bitmap, pixels moved off the edge are lost and the space left behind is empty
+        :param dx: columns to move right, negative to move left
+        :param dy: rows to move down, negative to move up
+        :return: a Bitboard
+        """
+        bits = self.bits
+        if dx >= 8 or dx <= -8 or dy >= 8 or dy <= -8:
+            return Bitboard()
+        if dx > 0:
+            bits = (bits >> dx) & RIGHT_KEEP[dx]
+        elif dx < 0:
+            bits = (bits << -dx) & LEFT_KEEP[-dx]
+        if dy > 0:
+            bits <<= 8 * dy
+        elif dy < 0:
+            bits >>= -8 * dy
+        return Bitboard(bits)
+
+    def scroll(self, dx=0, dy=0):
+        """
+        Move the whole bitmap, pixels moved off one edge come back on at the other
+        :param dx: columns to move right, negative to move left
+        :param dy: rows to move down, negative to move up
+        :return: a Bitboard
+        """
+        bits = self.bits
+        dx %= 8
+        dy %= 8
+        if dx:
+            bits = ((bits >> dx) & RIGHT_KEEP[dx]) | ((bits << (8 - dx)) & LEFT_KEEP[8 - dx])
+        if dy:
+            bits = (bits << 8 * dy) | (bits >> (64 - 8 * dy))
+        return Bitboard(bits)
+
+    def flip_horizontal(self):
+        """
+        Mirror left to right
+        """
+        return Bitboard(int.from_bytes(self.bits.to_bytes(8, 'little').translate(REVERSE_BITS), 'little'))
+
+    def flip_vertical(self):
+        """
+        Mirror top to bottom, the rows in the opposite order
+        """
+        return Bitboard(int.from_bytes(self.bits.to_bytes(8, 'little'), 'big'))
+
+    def transpose(self):
+        """
+        Mirror across the diagonal from the top left to the bottom right
+        """
+        return Bitboard(transpose_bits(self.bits))
+
+    def rotate(self, amount=1):
+        """
+        Turn the bitmap clockwise
+        :param amount: how many quarter turns, negative to turn anticlockwise
+        :return: a Bitboard
+        """
+        amount %= 4
+        if amount == 1:
+            return self.transpose().flip_horizontal()
+        if amount == 2:
+            return self.flip_vertical().flip_horizontal()
+        if amount == 3:
+            return self.transpose().flip_vertical()
+        return self
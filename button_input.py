@@ -0,0 +1,187 @@
+"""
+Event driven button input for a Launchpad.
+The midi callback only decodes the message, updates a matrix of which buttons are held and queues an event,
+so it returns straight away and never misses a press. Code that wants to know about presses either waits on
+the queue with wait_for_press() / events(), or registers a handler that is run on a separate thread, so a
+slow handler (one that scrolls a message, say) can't hold up the midi input.
+e.g.
+buttons = ButtonInput(pad)
+buttons.start()
+event = buttons.wait_for_press(timeout=5)
+if event:
+    print(event.x, event.y, event.velocity)
+buttons.stop()
+"""
+import queue
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+# velocity is how hard the pad was hit on the Pro, other models send 127, and 0 on release.
+# time is time.perf_counter() when the message arrived
+ButtonEvent = namedtuple('ButtonEvent', ['x', 'y', 'pressed', 'velocity', 'time'])
+
+
+class ButtonInput(object):
+    """
+    Keep track of the Launchpad's buttons from its midi input callback
+    """
+
+    def __init__(self, pad, max_events=1000):
+        """
+        :param pad: an open Launchpad object
+        :param max_events: the most events to queue before new ones are thrown away, 0 for no limit
+        """
+        self.pad = pad
+        size = pad.grid_size
+        self.lock = threading.Lock()
+        self.held = [[False] * size for _ in range(size)]
+        self.press_time = [[None] * size for _ in range(size)]
+        self.velocity = [[0] * size for _ in range(size)]
+        self.event_queue = queue.Queue(max_events)
+        self.dropped_events = 0  # Events thrown away because nobody was reading the queue
+        self.handlers = []
+        self.handler_queue = queue.Queue()
+        self.handler_thread = None
+        self.handler_errors = 0  # Exceptions raised by handlers, each is printed and the rest carry on
+        self.running = False
+
+    def start(self):
+        """
+        Start listening to the Launchpad, this replaces any callback already set on pad.in_ports
+        :return:
+        """
+        self.running = True
+        self.pad.in_ports.set_callback(self.midi_callback)
+
+    def stop(self):
+        """
+        Stop listening and wait for any handlers that are still running
+        :return:
+        """
+        self.pad.in_ports.cancel_callback()
+        self.running = False
+        if self.handler_thread is not None:
+            self.handler_queue.put(None)
+            self.handler_thread.join()
+            self.handler_thread = None
+
+    def add_handler(self, handler):
+        """
+        Call handler(event) for every button event, from a separate thread to the midi input
+        :param handler: function that takes a ButtonEvent
+        :return:
+        """
+        self.handlers.append(handler)
+        if self.handler_thread is None:
+            self.handler_thread = threading.Thread(target=self.run_handlers, name="LaunchpadButtonHandlers",
+                                                   daemon=True)
+            self.handler_thread.start()
+
+    def run_handlers(self):
+        while True:
+            event = self.handler_queue.get()
+            if event is None:
+                return
+            for handler in list(self.handlers):
+                try:
+                    handler(event)
+                except Exception as error:
+                    # One broken handler mustn't stop every other button press being handled
+                    self.handler_errors += 1
+                    print(f"Button handler {getattr(handler, '__name__', handler)} failed on {event}: {error!r}")
+                    traceback.print_exc()
+
+    def midi_callback(self, msg, data):
+        """
+        Called by rtmidi on its own thread for every message from the Launchpad, keep this quick
+        :param msg: A tuple of midi message and time since the last message
+        :param data: Not used
+        :return:
+        """
+        now = time.perf_counter()
+        msg = msg[0]
+        xy = self.pad.button_xy(msg)
+        if xy is None:
+            return
+        x, y = xy
+        if not self.pad.is_pad(x, y):
+            return
+        velocity = msg[2] if msg[0] != 128 else 0
+        pressed = velocity > 0
+        with self.lock:
+            self.held[y][x] = pressed
+            self.velocity[y][x] = velocity
+            if pressed:
+                self.press_time[y][x] = now
+        event = ButtonEvent(x, y, pressed, velocity, now)
+        try:
+            self.event_queue.put_nowait(event)
+        except queue.Full:
+            self.dropped_events += 1
+        if self.handlers:
+            self.handler_queue.put(event)
+
+    def is_held(self, x, y):
+        """
+        :return: True if the button at x, y is being held down
+        """
+        return self.held[y][x]
+
+    def held_buttons(self):
+        """
+        :return: list of (x, y) of every button being held down
+        """
+        with self.lock:
+            return [(x, y) for y, row in enumerate(self.held) for x, held in enumerate(row) if held]
+
+    def held_for(self, x, y):
+        """
+        :return: how many seconds the button at x, y has been held, or None if it isn't held
+        """
+        with self.lock:
+            if not self.held[y][x]:
+                return None
+            return time.perf_counter() - self.press_time[y][x]
+
+    def get_event(self, timeout=None):
+        """
+        Wait for the next press or release
+        :param timeout: seconds to wait, None to wait forever
+        :return: a ButtonEvent or None if nothing happened in time
+        """
+        try:
+            return self.event_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def wait_for_press(self, timeout=None):
+        """
+        Wait for a button to be pressed, releases are skipped
+        :param timeout: seconds to wait, None to wait forever
+        :return: a ButtonEvent or None if nothing was pressed in time
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            event = self.get_event(remaining)
+            if event is None or event.pressed:
+                return event
+
+    def events(self, timeout=None):
+        """
+        Iterate over button events as they happen
+        for event in buttons.events(timeout=10):
+            ...
+        :param timeout: stop if nothing happens for this many seconds, None to carry on forever
+        :return: a generator of ButtonEvents
+        """
+        while True:
+            event = self.get_event(timeout)
+            if event is None:
+                return
+            yield event
+
+    def __iter__(self):
+        return self.events()
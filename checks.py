@@ -0,0 +1,453 @@
+"""
+Check the drawing code against simple, obviously right versions of the same thing, without a Launchpad.
+Each check drives a Launchpad object on a MockMidiBackend, decodes the midi messages it was sent back into
+what every LED would be showing, and compares that with what the slow version says it should show.
+Run it after changing how LEDs are encoded, so a cleverer message that sets the wrong pad is caught here
+rather than by squinting at the Launchpad.
+
+python checks.py                           # Every check on every model
+python checks.py --check encode --seed 7   # One check, with a different set of random changes
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+import baked
+import bitmaps as bmp
+import compositor
+import frame_clock
+import midi_backend
+import pylaunchpad as pylp
+import show_patterns
+import snow_tree
+from text_strip import TextStrip, get_font
+from benchmarks import DEVICES, PATTERN_FILE
+
+
+class WireState(object):
+    """
+    What every LED on a pretend Launchpad is showing, worked out only from the midi messages sent to it
+    """
+
+    def __init__(self, profile):
+        """
+        :param profile: the device_profiles.DeviceProfile of the Launchpad the messages are for
+        """
+        self.profile = profile
+        self.leds = [[None] * profile.grid_size for _ in range(profile.grid_size)]
+        self.notes = {}  # (status, note) of a single LED message to x, y
+        self.sysex_leds = {}  # LED number in a multi LED sysex to x, y
+        for y, row in enumerate(profile.note_table):
+            for x, entry in enumerate(row):
+                if entry is not None:
+                    self.notes[entry] = (x, y)
+                    self.sysex_leds[entry[1]] = (x, y)
+        self.unknown = []  # Messages that didn't set any LEDs and aren't mode changes we know about
+
+    def set(self, x, y, value):
+        self.leds[y][x] = 0 if value == (0, 0, 0) else value
+
+    def fill(self, value):
+        for x, y in self.profile.pads:
+            self.set(x, y, value)
+
+    def apply(self, message):
+        """
+        Update the LEDs from one midi message
+        :param message: list of bytes
+        :return:
+        """
+        if message[0] == 0xF0:
+            self.apply_sysex(message)
+        elif self.profile.key == 'mini' and message == [176, 0, 0]:
+            self.fill(0)  # The original Mini's reset
+        elif tuple(message[:2]) in self.notes and len(message) == 3:
+            x, y = self.notes[tuple(message[:2])]
+            self.set(x, y, message[2])
+        else:
+            self.unknown.append(message)
+
+    def apply_sysex(self, message):
+        profile = self.profile
+        prefix = profile.sysex_prefix
+        if prefix is None or message[:len(prefix)] != prefix or message[-1] != 0xF7:
+            self.unknown.append(message)
+            return
+        command = message[len(prefix)]
+        body = message[len(prefix) + 1:-1]
+        rgb_command = profile.rgb_sysex_header[-1] if profile.rgb_sysex_header else None
+        palette_command = profile.palette_sysex_header[-1] if profile.palette_sysex_header else None
+        if command == rgb_command and command == palette_command:
+            # Mini MK3 and X, each LED has its lighting type first, 0 for a palette colour and 3 for RGB
+            i = 0
+            while i < len(body):
+                x, y = self.sysex_leds[body[i + 1]]
+                if body[i] == 3:
+                    self.set(x, y, tuple(body[i + 2:i + 5]))
+                    i += 5
+                else:
+                    self.set(x, y, body[i + 2])
+                    i += 3
+        elif command == rgb_command:
+            for i in range(0, len(body), 4):
+                x, y = self.sysex_leds[body[i]]
+                self.set(x, y, tuple(body[i + 1:i + 4]))
+        elif command == palette_command:
+            for i in range(0, len(body), 2):
+                x, y = self.sysex_leds[body[i]]
+                self.set(x, y, body[i + 1])
+        elif profile.protocol in ('mk2', 'pro') and command == 14:
+            self.fill(body[0])  # Every LED to one palette colour
+        elif profile.protocol == 'pro' and command == 15:
+            self.fill(tuple(body[1:4]))  # Every LED to one RGB colour
+        elif (profile.protocol, command) not in (('mk2', 34), ('minimk3', 14)):
+            # Those two are the layout and programmer mode messages, see programmer_mode()
+            self.unknown.append(message)
+
+
+def make_pad(device):
+    """
+    A Launchpad object on a mock backend that keeps the messages, in programmer mode with every LED off
+    :param device: key of benchmarks.DEVICES
+    :return: (pad, backend, wire state)
+    """
+    pad_class, port_name = DEVICES[device]
+    backend = midi_backend.MockMidiBackend(port_names=[port_name])
+    pad = pad_class(port_name, 0, 0, backend)
+    pad.open()
+    pad.programmer_mode()
+    pad.reset()
+    wire = WireState(pad.profile)
+    return pad, backend, wire
+
+
+def catch_up(wire, backend, sent):
+    """
+    Decode the messages sent since the last call
+    :param sent: how many messages had already been decoded
+    :return: (how many have been now, the new messages)
+    """
+    messages = backend.messages()[sent:]
+    for message in messages:
+        wire.apply(message)
+    return sent + len(messages), messages
+
+
+def compare(wire, pad, expected=None):
+    """
+    :param expected: function(x, y) giving what the LED should show, defaults to the pad's LED buffer
+    :return: list of (x, y, showing, expected) for the pads that are wrong
+    """
+    wrong = []
+    for x, y in pad.profile.pads:
+        want = pad.led_buffer[y][x] if expected is None else expected(x, y)
+        if wire.leds[y][x] != want:
+            wrong.append((x, y, wire.leds[y][x], want))
+    return wrong
+
+
+def random_colour(pad, rng):
+    """
+    A palette number, a colour name or an RGB tuple, as set_leds() takes
+    """
+    kind = rng.randrange(4)
+    if kind == 0:
+        return rng.choice(list(pad.colours))
+    if kind == 1:
+        return rng.randrange(128)
+    if kind == 2:
+        return rng.choice([(0, 0, 0), (63, 63, 63), (63, 0, 0)])
+    return rng.randrange(64), rng.randrange(64), rng.randrange(64)
+
+
+def check_encode(device, rng, rounds=300):
+    """
+    Random batches of pad changes, blits and fills, in RGB and palette mode. After each one what the
+    messages set has to match the LED buffer, and the messages can't be longer than sending each changed
+    pad on its own with encode_led()
+    :return: list of problems, empty if it passed
+    """
+    problems = []
+    for palette_mode in (False, True):
+        pad, backend, wire = make_pad(device)
+        pad.palette_mode = palette_mode
+        sent, _ = catch_up(wire, backend, 0)
+        for step in range(rounds):
+            before = [row[:] for row in pad.led_buffer]
+            kind = rng.randrange(5)
+            if kind == 0:
+                pad.set_leds((rng.randrange(pad.grid_size), rng.randrange(pad.grid_size), random_colour(pad, rng))
+                             for _ in range(rng.randrange(1, 12)))
+            elif kind == 1:
+                # Mostly one colour with a few others, where an "all LEDs" message should pay off
+                base = random_colour(pad, rng)
+                pad.set_leds((x, y, base if rng.random() < 0.9 else random_colour(pad, rng))
+                             for x, y in pad.profile.pads)
+            elif kind == 2:
+                width = rng.choice([8, pad.grid_size])
+                pad.blit_rgb(bytes(rng.randrange(64) if rng.random() < 0.5 else 0 for _ in range(width * width * 3)))
+            elif kind == 3:
+                pad.fill_leds(random_colour(pad, rng))
+            else:
+                with pad.batch_updates():
+                    for _ in range(rng.randrange(1, 30)):
+                        x, y = rng.choice(pad.profile.pads)
+                        pad.set_leds([(x, y, random_colour(pad, rng))])
+            sent, messages = catch_up(wire, backend, sent)
+            where = f"{device} palette_mode={palette_mode} step {step}"
+            wrong = compare(wire, pad)
+            if wrong:
+                problems.append(f"{where}: {len(wrong)} pads wrong, e.g. {wrong[0]}")
+            single = 0
+            for x, y in pad.profile.pads:
+                if pad.led_buffer[y][x] != before[y][x]:
+                    single += len(pad.encode_led(x, y, pad.led_buffer[y][x]) or [])
+            if pylp.message_bytes(messages) > single:
+                problems.append(f"{where}: sent {pylp.message_bytes(messages)} bytes, one pad at a time is {single}")
+        if wire.unknown:
+            problems.append(f"{device}: messages that set nothing, e.g. {wire.unknown[0]}")
+    return problems
+
+
+def pattern_frames(pad, frame_count=12):
+    """
+    The first frames of a pattern. show_frames() waits for each frame's time and then draws it
+    :return: (what each frame shows as a dictionary of x, y to LED value, function(clock) that draws them,
+    the tick the first frame is drawn on)
+    """
+    frames = list(itertools.islice(show_patterns.stream_frames(PATTERN_FILE), frame_count))
+    red_scale, green_scale, blue_scale = pylp.channel_tables(1.0, pylp.RGB565)
+    expected = []
+    for frame in frames:
+        # What show_frames() puts on the square pads for each frame
+        shown = {}
+        for i, packed in enumerate(frame):
+            value = pad.rgb_value(red_scale[packed >> 16], green_scale[(packed >> 8) & 0xFF], blue_scale[packed & 0xFF])
+            shown[(i % 8, i // 8 + 1)] = 0 if value == (0, 0, 0) else value
+        expected.append(shown)
+    return expected, lambda clock: show_patterns.show_frames(pad, frames, clock=clock), 1
+
+
+def scroll_frames(pad, message="Hi!"):
+    """
+    Scrolling text. scroll_message() draws each frame and then waits, on a clock of its own
+    :return: as pattern_frames()
+    """
+    pad.draw_colour = pad.colours['red']
+    lit = pad.led_value(pad.draw_colour)
+    expected = []
+    for rows in TextStrip(message, get_font()).frames():
+        expected.append({(x, y + 1): lit if int(row) & (0x80 >> x) else 0
+                         for y, row in enumerate(rows) for x in range(8)})
+    return expected, lambda clock: pad.scroll_message(message), 0
+
+
+def check_baked(device, rng, loops=3, frame_time=0.05, speed=5.0):
+    """
+    Bake a pattern and some scrolling text and play each a few times, straight from the bake and after saving
+    it as a midi file and loading it back. Every frame has to show, each for one frame time, with no black
+    between the loops and none skipped, the last one has to be held for a frame time before play() returns,
+    and afterwards the pad's LED buffer has to match what is showing. play()'s waits are noted rather than
+    waited for, and each message is put down to the frame time play() last waited for, so a busy machine
+    can't make it look late
+    :return: list of problems, empty if it passed
+    """
+    problems = []
+    for make_frames, saved in itertools.product((pattern_frames, scroll_frames), (False, True)):
+        pad, backend, wire = make_pad(device)
+        pad.delay_time = frame_time
+        expected, draw, first_tick = make_frames(pad)
+        animation = baked.bake(pad, draw, frame_time)
+        if saved:
+            with tempfile.TemporaryDirectory() as directory:
+                filename = os.path.join(directory, "baked.mid")
+                animation.save(filename)
+                animation = baked.BakedAnimation.load(filename)
+        pad.set_leds([(0, 1, 'red')])  # So the blank before the first loop is needed
+        sent, _ = catch_up(wire, backend, 0)
+        waits = []  # (deadline, how many messages had been sent before it)
+        baked.wait_until = lambda deadline, spin_time=0: waits.append((deadline, len(backend.sent)))
+        try:
+            start = time.perf_counter()
+            animation.play(pad, loops=loops, speed=speed)
+        finally:
+            baked.wait_until = frame_clock.wait_until
+        step = frame_time / speed
+        # The last wait is the end of the last frame, nothing is sent after it
+        groups = {0: backend.messages()[sent:waits[0][1]]}
+        for (deadline, first), (_, last) in zip(waits, waits[1:]):
+            groups.setdefault(int(round((deadline - start) / step)), []).extend(backend.messages()[first:last])
+        where = f"{device} {make_frames.__name__}{' saved' if saved else ''}"
+        # Every frame time, not just those something was sent at, so a frame that was left out is noticed
+        for tick in range(max(list(groups) + [loops * len(expected) + first_tick - 1]) + 1):
+            for message in groups.get(tick, []):
+                wire.apply(message)
+            if tick < first_tick:
+                continue  # The blank before the first frame
+            frame = expected[(tick - first_tick) % len(expected)]
+            wrong = compare(wire, pad, lambda x, y: frame.get((x, y), 0))
+            if wrong:
+                problems.append(f"{where} frame {tick}: {len(wrong)} pads wrong, e.g. {wrong[0]}")
+        held = (waits[-1][0] - start) / step - (loops * len(expected) + first_tick - 1)
+        if not 0.5 < held < 1.5:
+            problems.append(f"{where}: play() returned {held:.2f} frames after the last one, not 1")
+        wrong = compare(wire, pad)
+        if wrong:
+            problems.append(f"{where}: {len(wrong)} pads differ from the LED buffer after playing, e.g. {wrong[0]}")
+    return problems
+
+
+def layer_pixel(layer, x, y):
+    """
+    :return: True if a layer has a lit pixel on pad x, y, worked out the long way
+    """
+    column, row = x - layer.x, y - layer.y
+    return layer.visible and 0 <= column < 8 and 0 <= row < len(layer.rows) and \
+        bool(int(layer.rows[row]) & (0x80 >> column))
+
+
+def check_compositor(device, rng, rounds=300):
+    """
+    Random layers added, moved, redrawn, recoloured, restacked, hidden and removed. After each show() every
+    pad has to be the colour of the top layer lit there, or the background, looking at every layer in turn
+    :return: list of problems, empty if it passed
+    """
+    problems = []
+    pad, backend, wire = make_pad(device)
+    sent, _ = catch_up(wire, backend, 0)
+    background = rng.choice([0, 'blue', (0, 0, 20)])
+    scene = compositor.Compositor(pad, background)
+    bitmaps = [bmp.tree, bmp.ghost_one, [0xFF], [0x81] * 10, []]
+
+    def random_rows():
+        if rng.random() < 0.5:
+            return rng.choice(bitmaps)
+        return [rng.randrange(256) for _ in range(rng.randrange(11))]
+
+    def random_position():
+        return rng.randrange(-9, pad.grid_size + 1), rng.randrange(-2, pad.grid_size + 1)
+
+    for step in range(rounds):
+        for _ in range(rng.randrange(1, 4)):
+            kind = rng.randrange(8)
+            if kind == 0 or len(scene.layers) < 2:
+                x, y = random_position()
+                scene.add_layer(random_rows(), random_colour(pad, rng), x, y, rng.randrange(3), rng.random() < 0.9)
+                continue
+            layer = rng.choice(scene.layers)
+            if kind == 1:
+                layer.move_to(*random_position())
+            elif kind == 2:
+                layer.move(rng.randrange(-1, 2), rng.randrange(-1, 2))
+            elif kind == 3:
+                layer.set_bitmap(random_rows())
+            elif kind == 4:
+                layer.set_colour(random_colour(pad, rng))
+            elif kind == 5:
+                layer.set_z(rng.randrange(3))
+            elif kind == 6 and layer.visible:
+                layer.hide()
+            elif kind == 6:
+                layer.show()
+            elif len(scene.layers) > 6 or rng.random() < 0.3:
+                layer.remove()
+        scene.show()
+        sent, _ = catch_up(wire, backend, sent)
+        # Top layer first, the newest of those with the same z on top
+        order = sorted(enumerate(scene.layers), key=lambda item: (item[1].z, item[0]), reverse=True)
+
+        def expected(x, y):
+            colour = next((layer.colour for _, layer in order if layer_pixel(layer, x, y)), background)
+            value = pad.led_value(colour)
+            return 0 if value == (0, 0, 0) else value
+
+        for what, wrong in (('buffer', compare(wire, pad)), ('scene', compare(wire, pad, expected))):
+            if wrong:
+                problems.append(f"{device} step {step}: {len(wrong)} pads differ from the {what}, e.g. {wrong[0]}")
+    if wire.unknown:
+        problems.append(f"{device}: messages that set nothing, e.g. {wire.unknown[0]}")
+    return problems
+
+
+def check_snow(device, rng, frame_time=0.05):
+    """
+    snow_tree() with the random module seeded, against what the snow used to draw before it was made of
+    compositor layers: each snow row white where there's a flake, otherwise green where the tree is
+    :return: list of problems, empty if it passed
+    """
+    problems = []
+    pad, backend, wire = make_pad(device)
+    seed = rng.randrange(2 ** 32)
+    random.seed(seed)
+    sent, _ = catch_up(wire, backend, 0)
+    start = time.perf_counter()
+    snow_tree.snow_tree(pad, frame_time=frame_time)
+    frames = {}
+    for when, _, message in backend.sent[sent:]:
+        frames.setdefault(int(round((when - start) / frame_time)), []).append(message)
+    # The same flakes again, snow_tree() takes one per frame with random.choice()
+    random.seed(seed)
+    snow_flakes = [0x1, 0x2, 0x4, 0x8, 0x10, 0x20, 0x00, 0x40, 0x00, 0x80, 0x00]
+    white, green = pad.led_value('white'), pad.led_value('green')
+    snow_rows = []
+    for frame in range(10):
+        snow_rows.insert(0, random.choice(snow_flakes))
+        for message in frames.get(frame, []):
+            wire.apply(message)
+
+        def expected(x, y):
+            if x > 7 or y > 8:
+                return 0
+            mask = 128 >> x
+            if y < len(snow_rows) and snow_rows[y] & mask:
+                return white
+            tree_row = bmp.tree[y - 1] if y > 0 else 0
+            return green if tree_row & mask else 0
+
+        wrong = compare(wire, pad, expected)
+        if wrong:
+            problems.append(f"{device} seed {seed} frame {frame}: {len(wrong)} pads wrong, e.g. {wrong[0]}")
+        if len(snow_rows) == 9:
+            snow_rows.pop(8)
+    if sorted(frames) != sorted(set(frames) & set(range(10))):
+        problems.append(f"{device}: messages sent outside the 10 frames, at frames {sorted(frames)}")
+    return problems
+
+
+CHECKS = {'encode': check_encode, 'baked': check_baked, 'compositor': check_compositor, 'snow': check_snow}
+
+
+def run_checks(names=None, devices=None, seed=1):
+    """
+    :return: True if everything passed
+    """
+    passed = True
+    for name in names or list(CHECKS):
+        for device in devices or list(DEVICES):
+            # Keep the Pro's start up chatter out of the results
+            with contextlib.redirect_stdout(io.StringIO()):
+                problems = CHECKS[name](device, random.Random(seed))
+            print(f"{name:12} {device:17} {'ok' if not problems else f'{len(problems)} problems'}")
+            for problem in problems[:5]:
+                print(f"    {problem}")
+            passed = passed and not problems
+    return passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check pylaunchpad's output against simple references")
+    parser.add_argument("--check", action="append", choices=list(CHECKS), help="only run this check")
+    parser.add_argument("--device", action="append", choices=list(DEVICES), help="only check this device")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the random changes")
+    args = parser.parse_args(argv)
+    sys.exit(0 if run_checks(args.check, args.device, args.seed) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,9 @@
-import PySimpleGUI as PyGui
 import pylaunchpad as pylp
 
 
 def set_wash(pad, r, g, b):
-    for x in range(9):
-        for y in range(9):
-            pad.set_led_xy(x, y, r, g, b)
+    # Only the pads that change are sent, in the fewest bytes the Launchpad allows
+    pad.fill_leds((int(r), int(g), int(b)))
 
 
 def set_wash_fast(pad, r, g, b):
@@ -13,9 +11,7 @@ def set_wash_fast(pad, r, g, b):
 
 
 def set_wash_single(pad, colour):
-    for x in range(9):
-        for y in range(9):
-            pad.set_led_xy_by_colour(x, y, colour)
+    pad.fill_leds(colour)
 
 
 def colour_mix(pad):
@@ -25,6 +21,8 @@ def colour_mix(pad):
     Only update the launchpad colour when a slider changes
     :return:
     """
+    # The GUI toolkit is only loaded when the window is opened, so set_wash() etc. can be used without it
+    import PySimpleGUI as PyGui
     layout = [[PyGui.Text('Adjust the sliders for Red, Green & Blue levels. Click Cancel to exit.')],
 
               [PyGui.Slider(range=(0, 63), orientation='v', size=(12, 20), default_value=0),
@@ -0,0 +1,258 @@
+"""
+Draw a scene in layers, a background, sprites moving over it and overlays on top, and only work out the pads
+that something has happened to.
+Each layer is a one colour bitmap at a position. Pixels that are off are see through, so whatever is under
+them shows. When a layer moves or changes, the pads it covered and the pads it covers now are marked, and
+show() only works out those pads, top layer first, so a ghost moving across a busy background costs the
+ghost's pixels rather than the whole grid. The pads are then sent as one batch, and only the ones that
+actually change colour are sent at all, see LaunchpadBase.flush().
+Layer positions are pad coordinates, the same as draw_char(), so by default a layer covers the square pads.
+e.g.
+scene = Compositor(pad)
+scene.add_layer(bitmaps.tree, 'green')
+ghost = scene.add_layer(bitmaps.ghost_one, 'red', x=-8, z=1)
+for x in range(-8, 9):
+    ghost.move_to(x, 1)
+    scene.show()
+"""
+import bitmaps as bmp
+import pylaunchpad as pylp
+from bitboard import Bitboard, REVERSE_BITS
+
+# Bits per row of a scene mask, enough that a row moved right off the grid can't spill into the next row.
+# Pad x, y is bit y * STRIDE + x, the other way round to a Bitboard, so the pads come out left to right
+STRIDE = 32
+
+
+class Layer(object):
+    """
+    A one colour bitmap in a Compositor, made by Compositor.add_layer(). Use the methods to change it,
+    so the compositor knows which pads to work out again
+    """
+
+    def __init__(self, compositor, rows, colour, x, y, z, visible=True):
+        self.compositor = compositor
+        self.rows = list(rows)
+        self.colour = colour
+        self.x = x
+        self.y = y
+        self.z = z
+        self.visible = visible
+        self.mask = 0  # The pads this layer covers, see Compositor.layer_mask()
+
+    def move_to(self, x, y):
+        if (x, y) != (self.x, self.y):
+            self.compositor.change(self, x=x, y=y)
+
+    def move(self, dx=0, dy=0):
+        self.move_to(self.x + dx, self.y + dy)
+
+    def set_bitmap(self, rows):
+        """
+        :param rows: list of numbers, one per row, left most pixel in bit 7, e.g. from bitmaps.py or a Bitboard.
+        There can be more or fewer than 8 rows
+        """
+        self.compositor.change(self, rows=list(rows))
+
+    def set_colour(self, colour):
+        """
+        :param colour: a palette number, a colour name or an (r, g, b) tuple of 0 - 63 values
+        """
+        if colour != self.colour:
+            self.colour = colour
+            self.compositor.dirty |= self.mask
+
+    def set_z(self, z):
+        """
+        :param z: layers with a higher z are drawn over those with a lower one
+        """
+        if z != self.z:
+            self.z = z
+            self.compositor.dirty |= self.mask
+            self.compositor.sort_layers()
+
+    def show(self):
+        if not self.visible:
+            self.compositor.change(self, visible=True)
+
+    def hide(self):
+        if self.visible:
+            self.compositor.change(self, visible=False)
+
+    def remove(self):
+        self.compositor.remove_layer(self)
+
+
+class Compositor(object):
+    """
+    Layers of bitmaps drawn over each other on one Launchpad
+    """
+
+    def __init__(self, pad, background=0):
+        """
+        :param pad: a Launchpad object
+        :param background: the colour of pads no layer covers
+        """
+        self.pad = pad
+        self.background = background
+        self.layers = []  # In the order they were added
+        self.order = []  # Top layer first
+        # The pads that have LEDs, so layers hanging off the edge of the grid are clipped to it
+        self.grid = 0
+        for x, y in pad.profile.pads:
+            self.grid |= 1 << (y * STRIDE + x)
+        # Pads to work out again at the next show(), all of them the first time so the background is everywhere
+        self.dirty = self.grid
+        self.frames = 0
+        self.composited = 0  # Pads worked out, over all the frames
+
+    def add_layer(self, rows, colour, x=0, y=1, z=0, visible=True):
+        """
+        :param rows: list of numbers, one per row, left most pixel in bit 7, e.g. from bitmaps.py or a Bitboard
+        :param colour: a palette number, a colour name or an (r, g, b) tuple of 0 - 63 values
+        :param x: pad x of the bitmap's left column
+        :param y: pad y of the bitmap's top row, 1 is the top of the square pads
+        :param z: layers with a higher z are drawn over those with a lower one, the newest on top if they match
+        :param visible:
+        :return: the Layer
+        """
+        layer = Layer(self, rows, colour, x, y, z, visible)
+        layer.mask = self.layer_mask(layer)
+        self.dirty |= layer.mask
+        self.layers.append(layer)
+        self.sort_layers()
+        return layer
+
+    def remove_layer(self, layer):
+        self.dirty |= layer.mask
+        self.layers.remove(layer)
+        self.sort_layers()
+
+    def sort_layers(self):
+        # The sort keeps the order of layers with the same z, so the newest of them is on top
+        self.order = sorted(reversed(self.layers), key=lambda layer: layer.z, reverse=True)
+
+    def change(self, layer, **changes):
+        """
+        Change a layer, marking the pads it covered before and after
+        :param layer:
+        :param changes: new values for any of rows, x, y and visible
+        :return:
+        """
+        self.dirty |= layer.mask
+        for name, value in changes.items():
+            setattr(layer, name, value)
+        layer.mask = self.layer_mask(layer)
+        self.dirty |= layer.mask
+
+    def layer_mask(self, layer):
+        """
+        :return: the pads a layer's lit pixels cover, one bit per pad as in STRIDE, clipped to the grid
+        """
+        if not layer.visible or not -8 < layer.x < self.pad.grid_size:
+            return 0
+        mask = 0
+        shift = layer.y * STRIDE + layer.x
+        for row in layer.rows:
+            # Reversed so the left most pixel is the lowest bit, as x counts up
+            bits = REVERSE_BITS[int(row) & 0xFF]
+            if bits:
+                if shift >= 0:
+                    mask |= bits << shift
+                elif shift > -STRIDE:
+                    mask |= bits >> -shift
+            shift += STRIDE
+        # Pixels hanging off the left end up at the far end of the row above, well off the grid
+        return mask & self.grid
+
+    def redraw(self):
+        """
+        Work out every pad again at the next show(), e.g. after something else has drawn on the Launchpad
+        :return:
+        """
+        self.dirty = self.grid
+
+    def show(self):
+        """
+        Work out the pads that have changed since the last show() and send them
+        :return: how many pads were worked out
+        """
+        remaining = self.dirty & self.grid
+        self.dirty = 0
+        if not remaining:
+            return 0
+        pad = self.pad
+        count = 0
+        with pad.batch_updates():
+            for layer in self.order:
+                hit = layer.mask & remaining
+                if hit:
+                    count += self.fill(hit, pad.led_value(layer.colour))
+                    remaining &= ~hit
+                    if not remaining:
+                        break
+            if remaining:
+                count += self.fill(remaining, pad.led_value(self.background))
+        self.frames += 1
+        self.composited += count
+        return count
+
+    def fill(self, mask, value):
+        """
+        Set every pad in a mask to one LED value
+        :return: how many pads were set
+        """
+        store_led = self.pad.store_led
+        count = 0
+        while mask:
+            lowest = mask & -mask
+            bit = lowest.bit_length() - 1
+            store_led(bit % STRIDE, bit // STRIDE, value)
+            mask ^= lowest
+            count += 1
+        return count
+
+    def stats(self):
+        """
+        :return: dictionary of layers, frames shown and the average pads worked out per frame
+        """
+        return {'layers': len(self.layers),
+                'frames': self.frames,
+                'pads_per_frame': self.composited / self.frames if self.frames else 0.0}
+
+
+def chase(pad, loops=2):
+    """
+    Pac-Man chased across the tree by a ghost, with an invader flying over the top of them both
+    :param pad: a Launchpad object
+    :param loops: how many times across
+    :return:
+    """
+    scene = Compositor(pad)
+    scene.add_layer(bmp.tree, 'green')
+    pac_frames = [Bitboard.from_rows(bmp.pac_one), Bitboard.from_rows(bmp.pac_two)]
+    ghost_frames = [Bitboard.from_rows(bmp.ghost_one), Bitboard.from_rows(bmp.ghost_two)]
+    pac_man = scene.add_layer(pac_frames[0], 'yellow', x=-8, z=1)
+    ghost = scene.add_layer(ghost_frames[0], 'red', x=-17, z=1)
+    invader = scene.add_layer(bmp.invader_one, 'purple', x=8, z=2)  # Flies over the top of the other two
+    clock = pad.new_frame_clock()
+    draw = True
+    for _ in range(loops):
+        for step in range(27):
+            pac_man.set_bitmap(pac_frames[step % 2])
+            pac_man.move_to(step - 8, 1)
+            ghost.set_bitmap(ghost_frames[step % 2])
+            ghost.move_to(step - 17, 1)
+            invader.move(-1, 0)
+            if invader.x < -8:
+                invader.move_to(8, 1)
+            if draw:
+                scene.show()
+            draw = clock.tick()
+    print(scene.stats())
+
+
+if __name__ == "__main__":
+    launchpad = pylp.get_me_a_pad()
+    launchpad.reset()
+    chase(launchpad)
@@ -69,11 +69,13 @@ def draw_binary(pad, decimal):
 
 
 def draw_8_bits(pad, row, blocks):
+    updates = []
     for x, digit in enumerate(blocks):
         if digit == "1":
-            pad.set_led_xy_by_colour(x, row, pad.colours['green'])
+            updates.append((x, row, pad.colours['green']))
         else:
-            pad.set_led_xy_by_colour(x, row, pad.colours['black'])
+            updates.append((x, row, pad.colours['black']))
+    pad.set_leds(updates)
 
 
 if __name__ == "__main__":
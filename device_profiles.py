@@ -0,0 +1,261 @@
+"""
+Everything pylaunchpad needs to know about each Launchpad model, in one table.
+A profile holds the midi port names to look for, the size of the grid, the colour names, the sysex
+headers and how many LEDs fit in one sysex message. The mapping between x, y coordinates and midi
+notes is worked out once, when the profile is made, into a pair of lookup tables, so drawing a pixel
+or decoding a button press is a list index or a dictionary lookup rather than a pile of ifs.
+
+Adding a model that talks the same protocol as one we already support is a new entry in PROFILES,
+e.g. the Launchpad X is a Mini MK3 with a different sysex device number and port name.
+"""
+from palette import PALETTE_63
+
+# Colour names for the RGB models, these are palette numbers
+RGB_COLOURS = {'black': 0, 'off': 0, 'white': 119, 'red': 5, 'green': 17, 'blue': 44,
+               'orange': 84, 'purple': 55, 'brown': 105, 'lime': 75,
+               'pink': 56, 'yellow': 108, 'grey': 117}
+
+# The original Mini only has red and green LEDs, see LpMini.get_led_color()
+RED_GREEN_COLOURS = {'black': 0, 'off': 0, 'red': 3, 'yellow': 49, 'green': 48, 'orange': 51}
+
+NOTE_ON = 144
+NOTE_OFF = 128
+CONTROLLER = 176
+
+# Midi universal identity request, to every device on the port. The reply is
+# F0 7E <device> 06 02 <manufacturer> <family, 2 bytes> <model, 2 bytes> <firmware version, 4 bytes> F7
+IDENTITY_REQUEST = [240, 126, 127, 6, 1, 247]
+NOVATION_ID = (0, 32, 41)
+
+
+def mk2_layout(x, y):
+    """
+    MK2, top row are controllers 104 - 111, the rest are notes 11 - 89 counting up from the bottom left
+    :return: (midi status, note) or None if there is no LED at x, y
+    """
+    if y == 0:
+        if x > 7:
+            return None
+        return CONTROLLER, 104 + x
+    return NOTE_ON, 91 - (10 * y) + x
+
+
+def mk3_layout(x, y):
+    """
+    Mini MK3 and Launchpad X, one grid of notes 11 - 99, the top row and the logo LED in the corner are controllers
+    """
+    led = (9 - y) * 10 + x + 1
+    if led < 90:
+        return NOTE_ON, led
+    return CONTROLLER, led
+
+
+def pro_layout(x, y):
+    """
+    Pro, a 10 * 10 grid with no LEDs in the corners. The top row starts at 91 on the left,
+    the bottom row of round buttons are 1 - 8 under the square pads
+    """
+    if y == 0:
+        if x > 7:
+            return None
+        return NOTE_ON, 91 + x
+    if y == 9:
+        if x < 1 or x > 8:
+            return None
+        return NOTE_ON, x
+    return NOTE_ON, 90 - (10 * y) + x
+
+
+def mini_layout(x, y):
+    """
+    Original Mini, top 4 bits of the note are the row and the bottom 4 bits the column,
+    the top row are controllers 104 - 111, which are also note numbers in the grid
+    """
+    if y == 0:
+        if x > 7:
+            return None
+        return CONTROLLER, 104 + x
+    return NOTE_ON, ((y - 1) << 4) | x
+
+
+class DeviceProfile(object):
+    """
+    What we know about one Launchpad model
+    """
+
+    def __init__(self, key, name, protocol, port_patterns, layout, grid_size=9, colours=None,
+                 mac_port_patterns=None, sysex_device=None, rgb_sysex_command=None, rgb_sysex_chunk=0,
+                 palette_sysex_command=None, palette_sysex_chunk=0, cc_buttons=False, palette=None,
+                 identity=None):
+        """
+        :param key: short name used to look the profile up, e.g. 'mk2'
+        :param name: the name people know the Launchpad by
+        :param protocol: which pylaunchpad class talks to it, one of the keys of pylaunchpad.PAD_CLASSES
+        :param port_patterns: text to look for in the midi port names, in order of preference
+        :param layout: function(x, y) returning the (status, note) for a pad or None if there is no pad there
+        :param grid_size: 9 for a 9 * 9 grid of buttons, 10 on the Pro
+        :param colours: dictionary of colour names to palette numbers
+        :param mac_port_patterns: port names are different on a Mac, if not given port_patterns is used
+        :param sysex_device: Novation's device number in the sysex header, None if the model has no sysex
+        :param rgb_sysex_command: sysex command that sets LEDs to RGB colours
+        :param rgb_sysex_chunk: most LEDs we can safely put in one RGB sysex message
+        :param palette_sysex_command: sysex command that sets LEDs to palette colours
+        :param palette_sysex_chunk: most LEDs we can safely put in one palette sysex message
+        :param cc_buttons: True if some buttons send controllers even though their LEDs are set with notes,
+        so any button may arrive as either
+        :param palette: the (r, g, b) colour, 0 - 63, of each palette number, for models with RGB LEDs.
+        Used to find the nearest palette colour in palette mode, see palette.py
+        :param identity: the 2 family and 2 model bytes the Launchpad gives in its identity reply, None if it doesn't
+        answer. The bootloader gives different bytes, so a Launchpad being updated isn't mistaken for this model
+        """
+        self.key = key
+        self.name = name
+        self.protocol = protocol
+        self.port_patterns = list(port_patterns)
+        self.mac_port_patterns = list(mac_port_patterns if mac_port_patterns is not None else port_patterns)
+        self.grid_size = grid_size
+        self.colours = dict(colours or {})
+        self.sysex_device = sysex_device
+        if sysex_device is None:
+            self.sysex_prefix = None
+        else:
+            self.sysex_prefix = [240, 0, 32, 41, 2, sysex_device]
+        self.rgb_sysex_header = self.sysex_header(rgb_sysex_command)
+        self.rgb_sysex_chunk = rgb_sysex_chunk
+        self.palette_sysex_header = self.sysex_header(palette_sysex_command)
+        self.palette_sysex_chunk = palette_sysex_chunk
+        self.palette = palette
+        self.identity = identity
+
+        # note_table[y][x] is the (status, note) that sets the LED at x, y, or None if there isn't one.
+        # button_table maps the (status, note) of a button message back to x, y
+        self.note_table = [[layout(x, y) for x in range(grid_size)] for y in range(grid_size)]
+        self.button_table = {}
+        self.pads = []  # (x, y) of every LED, in the order they are sent when the whole grid changes
+        for y, row in enumerate(self.note_table):
+            for x, entry in enumerate(row):
+                if entry is None:
+                    continue
+                status, note = entry
+                self.pads.append((x, y))
+                self.button_table[(status, note)] = (x, y)
+                if status == NOTE_ON:
+                    self.button_table[(NOTE_OFF, note)] = (x, y)
+                    if cc_buttons:
+                        self.button_table[(CONTROLLER, note)] = (x, y)
+
+    def sysex_header(self, command):
+        if command is None or self.sysex_prefix is None:
+            return None
+        return self.sysex_prefix + [command]
+
+    def patterns(self, system):
+        """
+        :param system: platform.system()
+        :return: the port name patterns to look for on this operating system
+        """
+        if system == "Darwin":
+            return self.mac_port_patterns
+        return self.port_patterns
+
+    def is_pad(self, x, y):
+        return 0 <= x < self.grid_size and 0 <= y < self.grid_size and self.note_table[y][x] is not None
+
+    def __repr__(self):
+        return f"DeviceProfile({self.key!r}, {self.name!r})"
+
+
+# In the order LPMidi looks for them, the first pattern found in a port name wins.
+# Each RGB entry in a sysex message is led, red, green, blue and each palette entry is led, colour.
+# If both commands are the same the entries share a message, see LaunchpadMiniMk3.encode_sysex_entry()
+PROFILES = [
+    DeviceProfile('minimk3', 'Launchpad Mini MK3', 'minimk3',
+                  # "Launchpad MK3" catches the other MK3 family ports, the identity reply says which model it is
+                  port_patterns=['(LPMiniMK3', 'Launchpad MK3'],
+                  mac_port_patterns=['Launchpad Mini MK3 LPMiniMK3 MIDI', 'Launchpad MK3'],
+                  layout=mk3_layout, colours=RGB_COLOURS, sysex_device=13,
+                  rgb_sysex_command=3, rgb_sysex_chunk=81, palette_sysex_command=3, palette_sysex_chunk=81,
+                  cc_buttons=True, palette=PALETTE_63, identity=(0x13, 0x01, 0, 0)),
+    # Same chunking as set_all_on, the MK2 drops very long sysex messages
+    DeviceProfile('mk2', 'Launchpad MK2', 'mk2', port_patterns=['MK2'],
+                  layout=mk2_layout, colours=RGB_COLOURS, sysex_device=24,
+                  rgb_sysex_command=11, rgb_sysex_chunk=60, palette_sysex_command=10, palette_sysex_chunk=80,
+                  palette=PALETTE_63, identity=(0x69, 0, 0, 0)),
+    DeviceProfile('pro', 'Launchpad Pro', 'pro', port_patterns=['Launchpad Pro'],
+                  layout=pro_layout, grid_size=10, colours=RGB_COLOURS, sysex_device=16,
+                  rgb_sysex_command=11, rgb_sysex_chunk=78, palette_sysex_command=10, palette_sysex_chunk=97,
+                  cc_buttons=True, palette=PALETTE_63, identity=(0x51, 0, 0, 0)),
+    # Untested, from Novation's programmer's reference the X talks the same protocol as the Mini MK3
+    DeviceProfile('x', 'Launchpad X', 'minimk3',
+                  port_patterns=['(LPX MIDI'], mac_port_patterns=['Launchpad X LPX MIDI'],
+                  layout=mk3_layout, colours=RGB_COLOURS, sysex_device=12,
+                  rgb_sysex_command=3, rgb_sysex_chunk=81, palette_sysex_command=3, palette_sysex_chunk=81,
+                  cc_buttons=True, palette=PALETTE_63, identity=(0x03, 0x01, 0, 0)),
+    # The original Mini's port name is part of the Mini MK3's on a Mac, so it isn't looked for by name,
+    # and it doesn't answer identity requests
+    DeviceProfile('mini', 'Launchpad Mini', 'mini', port_patterns=[],
+                  layout=mini_layout, colours=RED_GREEN_COLOURS),
+]
+
+PROFILES_BY_KEY = {profile.key: profile for profile in PROFILES}
+PROFILES_BY_IDENTITY = {profile.identity: profile for profile in PROFILES if profile.identity is not None}
+
+
+def get_profile(key):
+    """
+    :param key: e.g. 'mk2'
+    :return: the DeviceProfile
+    :raises: KeyError if there is no profile with that key
+    """
+    return PROFILES_BY_KEY[key]
+
+
+def find_profile(port_name, system):
+    """
+    Find the profile for a midi port
+    :param port_name: the name of the midi port
+    :param system: platform.system()
+    :return: (profile, pattern that matched) or (None, None) if the port isn't a Launchpad we know
+    """
+    for profile in PROFILES:
+        for pattern in profile.patterns(system):
+            if pattern in port_name:
+                return profile, pattern
+    return None, None
+
+
+def parse_identity(message):
+    """
+    Read an identity reply
+    :param message: list of bytes from the midi input
+    :return: (manufacturer, family and model, firmware version) or None if the message isn't an identity reply.
+    Each is a tuple of bytes, the family and model are 4 bytes as in DeviceProfile.identity and the firmware version
+    is 4 numbers, e.g. (0, 1, 5, 7)
+    """
+    if len(message) < 17 or message[:2] != [240, 126] or message[3:5] != [6, 2] or message[-1] != 247:
+        return None
+    if message[5] == 0:
+        manufacturer, position = tuple(message[5:8]), 8
+    else:
+        manufacturer, position = (message[5],), 6
+    if len(message) < position + 9:
+        return None
+    return manufacturer, tuple(message[position:position + 4]), tuple(message[position + 4:position + 8])
+
+
+def find_profile_by_identity(message):
+    """
+    Find the profile for a Launchpad from its identity reply
+    :param message: list of bytes from the midi input
+    :return: (profile, firmware version) or (None, None) if it isn't a Launchpad we know
+    """
+    identity = parse_identity(message)
+    if identity is None:
+        return None, None
+    manufacturer, family_model, firmware = identity
+    if manufacturer != NOVATION_ID:
+        return None, None
+    profile = PROFILES_BY_IDENTITY.get(family_model)
+    if profile is None:
+        return None, None
+    return profile, firmware
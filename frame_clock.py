@@ -0,0 +1,126 @@
+"""
+Keep animations running at a steady frame rate, whatever the Launchpad model.
+Rather than sleeping for a fixed time after drawing, which makes the frame rate depend on how long
+the drawing took, each frame is given an absolute deadline and we wait until that deadline.
+time.sleep() is only accurate to a millisecond or so (much worse on Windows), so we sleep until just
+before the deadline and then spin for the last little bit.
+"""
+import time
+
+SPIN_TIME = 0.002
+
+
+def wait_until(deadline, spin_time=SPIN_TIME):
+    """
+    Sleep until just before a time.perf_counter() deadline, then spin for the rest
+    :param deadline:
+    :param spin_time: how long before the deadline to stop sleeping and start spinning
+    :return: time.perf_counter() when we woke up
+    """
+    now = time.perf_counter()
+    if now < deadline:
+        remaining = deadline - now
+        if remaining > spin_time:
+            time.sleep(remaining - spin_time)
+        while time.perf_counter() < deadline:
+            pass
+        now = time.perf_counter()
+    return now
+
+
+class FrameClock(object):
+    """
+    Wait for a series of evenly spaced frame deadlines
+    e.g.
+    clock = FrameClock(0.05)
+    draw = True
+    for frame in frames:
+        if draw:
+            pad.blit_rgb(frame)
+        draw = clock.tick()
+    print(clock.stats())
+    """
+
+    def __init__(self, frame_time=0.1, drop_frames=False, spin_time=SPIN_TIME):
+        """
+        :param frame_time: seconds per frame, 0 means don't wait at all
+        :param drop_frames: if True, when we are more than a whole frame behind tick() returns False
+        so the caller can skip drawing and catch up, rather than running late frames back to back
+        :param spin_time: how long before the deadline to stop sleeping and start spinning
+        """
+        self.frame_time = frame_time
+        self.drop_frames = drop_frames
+        self.spin_time = spin_time
+        self.start_time = None
+        self.next_deadline = None
+        self.frames = 0
+        self.dropped = 0
+        # Running totals of how far past the deadline we woke up, for the jitter figure
+        self.late_total = 0.0
+        self.late_squared = 0.0
+        self.max_late = 0.0
+
+    def start(self):
+        """
+        Start timing from now, called by the first tick() if not called before
+        :return:
+        """
+        self.start_time = time.perf_counter()
+        self.next_deadline = self.start_time
+        self.frames = 0
+        self.dropped = 0
+        self.late_total = 0.0
+        self.late_squared = 0.0
+        self.max_late = 0.0
+
+    def tick(self):
+        """
+        Wait until the end of the current frame
+        :return: True if the next frame should be drawn, False if we are behind and it should be dropped
+        """
+        if self.next_deadline is None:
+            self.start()
+        self.frames += 1
+        self.next_deadline += self.frame_time
+        deadline = self.next_deadline
+        now = time.perf_counter()
+        if now < deadline:
+            now = wait_until(deadline, self.spin_time)
+        elif self.drop_frames and now - deadline > self.frame_time:
+            # We've missed at least one whole frame, skip the next one to get back on schedule
+            self.dropped += 1
+            self.record(now - deadline)
+            return False
+        self.record(now - deadline)
+        return True
+
+    def record(self, late):
+        self.late_total += late
+        self.late_squared += late * late
+        self.max_late = max(self.max_late, late)
+
+    def fps(self):
+        """
+        :return: the frame rate actually achieved since start()
+        """
+        if self.start_time is None:
+            return 0.0
+        elapsed = time.perf_counter() - self.start_time
+        if elapsed <= 0:
+            return 0.0
+        return self.frames / elapsed
+
+    def stats(self):
+        """
+        :return: dictionary with the target and achieved frame rate, dropped frames and
+        the mean, standard deviation (jitter) and worst case of how late each frame was, in seconds
+        """
+        mean = self.late_total / self.frames if self.frames else 0.0
+        variance = self.late_squared / self.frames - mean * mean if self.frames else 0.0
+        return {'target_fps': 1.0 / self.frame_time if self.frame_time else 0.0,
+                'fps': self.fps(),
+                'frames': self.frames,
+                'dropped': self.dropped,
+                'mean_late': mean,
+                'jitter': max(variance, 0.0) ** 0.5,
+                'max_late': self.max_late}
@@ -0,0 +1,149 @@
+"""
+Carry on when a Launchpad is unplugged and plugged back in.
+A HotplugWatcher checks a few times a second, from its own thread, that the Launchpad's port is still there.
+Only the one port number is checked, the ports are only all looked through while the Launchpad is missing.
+While it is missing nothing is sent, drawing carries on into the LED buffer as normal, and when it comes
+back the ports are opened again, it is put back into programmer mode and everything in the LED buffer is
+sent in one go.
+e.g.
+watcher = HotplugWatcher(pad, on_reconnect=buttons.start)
+watcher.start()
+... draw as normal ...
+watcher.stop()
+"""
+import threading
+import time
+
+
+class HotplugWatcher(object):
+    """
+    Watch for the Launchpad going away and coming back
+    """
+
+    def __init__(self, pad, interval=0.2, on_disconnect=None, on_reconnect=None):
+        """
+        :param pad: an open Launchpad object
+        :param interval: seconds between checks
+        :param on_disconnect: function() called when the Launchpad goes away
+        :param on_reconnect: function() called when it is back and the LEDs have been sent, e.g. ButtonInput.start
+        so button presses are heard again, as the midi input is a new port
+        """
+        self.pad = pad
+        self.interval = interval
+        self.on_disconnect = on_disconnect
+        self.on_reconnect = on_reconnect
+        # Our own rtmidi objects to look at the ports with, the pad's are left alone
+        self.probe_out = pad.backend.midi_out()
+        self.probe_in = pad.backend.midi_in()
+        self.thread = None
+        self.running = False
+        self.stop_event = threading.Event()
+        self.disconnects = 0
+        self.reconnects = 0
+        self.lost_at = None
+        self.last_outage = None  # Seconds from noticing the Launchpad had gone to its LEDs being sent again
+        self.max_outage = 0.0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.stop_event.clear()
+        self.pad.watcher = self
+        self.thread = threading.Thread(target=self.run, name="LaunchpadHotplugWatcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self.stop_event.set()
+        self.thread.join()
+        self.thread = None
+        self.pad.watcher = None
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.check()
+
+    def port_present(self):
+        """
+        Cheap check that the pad's output port is still where it was opened
+        :return: True if it is
+        """
+        try:
+            return self.probe_out.get_port_name(self.pad.out_port_num) == self.pad.out_port_name
+        except Exception:
+            # rtmidi raises for a port number that no longer exists on some systems
+            return False
+
+    def check(self):
+        """
+        Look at the port once, and reconnect if the Launchpad has come back
+        :return: True if the Launchpad is connected
+        """
+        pad = self.pad
+        if pad.connected:
+            if self.port_present():
+                return True
+            # Gone, stop sending until it comes back
+            with pad.send_lock:
+                pad.connected = False
+        if self.lost_at is None:
+            self.lost_at = time.perf_counter()
+            self.disconnects += 1
+            if self.on_disconnect is not None:
+                self.on_disconnect()
+        return self.reconnect()
+
+    def reconnect(self):
+        """
+        Find the Launchpad's ports by name, they may have new numbers, then open them and send the LEDs
+        :return: True if it is back
+        """
+        pad = self.pad
+        out_ports = self.probe_out.get_ports()
+        if pad.out_port_name not in out_ports:
+            return False
+        in_ports = self.probe_in.get_ports()
+        if pad.in_port_name is not None and pad.in_port_name not in in_ports:
+            return False
+        with pad.led_lock:
+            self.close_ports()
+            pad.out_port_num = out_ports.index(pad.out_port_name)
+            if pad.in_port_name is not None:
+                pad.in_port_num = in_ports.index(pad.in_port_name)
+            try:
+                pad.open()
+            except Exception as error:
+                # Still settling down, try again next time
+                print(f"Couldn't reopen {pad.out_port_name}: {error}")
+                pad.connected = False
+                return False
+            pad.programmer_mode()
+            pad.resend_leds()
+        self.reconnects += 1
+        self.last_outage = time.perf_counter() - self.lost_at
+        self.max_outage = max(self.max_outage, self.last_outage)
+        self.lost_at = None
+        if self.on_reconnect is not None:
+            self.on_reconnect()
+        return True
+
+    def close_ports(self):
+        # The old ports are dead, but close them so rtmidi lets go of them
+        for port in (self.pad.lp_midi_out_port, self.pad.lp_midi_in_port):
+            try:
+                port.close_port()
+            except Exception:
+                pass
+
+    def stats(self):
+        """
+        :return: dictionary of connected, disconnects, reconnects, last_outage and max_outage in seconds
+        """
+        return {'connected': self.pad.connected,
+                'disconnects': self.disconnects,
+                'reconnects': self.reconnects,
+                'last_outage': self.last_outage,
+                'max_outage': self.max_outage}
@@ -110,8 +110,9 @@ def main():
     # frames = [smiley]
     for _ in range(20):
         for frame in frames:
-            for y, row in enumerate(frame, 1):
-                for x, col in enumerate(row):
+            rgb_frame = []
+            for row in frame:
+                for col in row:
                     color = int(col)
 
                     b = (color & 0xF00) >> 8
@@ -122,7 +123,9 @@ def main():
                     g = arduino_map(g, 0, 15, 0, 63)
                     r = arduino_map(r, 0, 15, 0, 63)
 
-                    pad.set_led_xy(x, y, r, g, b)
+                    rgb_frame += [r, g, b]
+            # Draw from row 1, the square pads, in as few messages as possible
+            pad.blit_rgb(rgb_frame)
             time.sleep(.02)
 
 if __name__ == "__main__":
@@ -0,0 +1,112 @@
+"""
+A cache of the midi messages draw_char has already worked out.
+Demos and signs tend to draw the same few bitmaps in the same colour over and over, a flashing heart or a
+countdown for instance, and each time the masks are worked out again and the same messages rebuilt.
+The cache remembers, for each bitmap, colour and position, which value every pad ends up with, and for the
+last few things the grid was showing before, the exact messages that take the grid from there to the bitmap.
+So drawing the second heart of a flashing heart is a lookup and one send.
+The least recently used entries are thrown away when the cache is full, use stats() to see how well it is doing.
+"""
+import threading
+from collections import OrderedDict
+
+# How many "what was showing before" states to keep messages for, per entry
+MAX_TRANSITIONS = 4
+
+
+class CompiledDraw(object):
+    """
+    The result of one draw_char call, which pads it sets and the value each one gets
+    """
+
+    def __init__(self, pads, values):
+        """
+        :param pads: list of (x, y) the draw sets
+        :param values: the value each pad is set to, in the same order
+        """
+        self.pads = pads
+        self.values = values
+        self.transitions = OrderedDict()  # Pads showing before -> (messages, number of pads that change)
+        self.lock = threading.Lock()  # Launchpads of the same model share entries
+
+    def messages_from(self, shown, encode_leds):
+        """
+        The messages that change the pads from what they are showing to this draw
+        :param shown: tuple of what each pad in self.pads is showing now
+        :param encode_leds: the pad's encode_leds method, used the first time we see shown
+        :return: (list of messages, number of pads that change)
+        """
+        with self.lock:
+            transition = self.transitions.get(shown)
+            if transition is not None:
+                self.transitions.move_to_end(shown)
+                return transition
+            changes = [(x, y, value) for (x, y), value, before in zip(self.pads, self.values, shown)
+                       if value != before]
+            transition = (encode_leds(changes), len(changes))
+            self.transitions[shown] = transition
+            if len(self.transitions) > MAX_TRANSITIONS:
+                self.transitions.popitem(last=False)
+            return transition
+
+
+class MessageCache(object):
+    """
+    Least recently used cache of CompiledDraw objects, safe to share between Launchpads and threads
+    """
+
+    def __init__(self, max_size=256):
+        """
+        :param max_size: most entries to keep, 0 to turn the cache off
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        :param key: anything hashable that identifies a draw, see LaunchpadBase.draw_char
+        :return: the CompiledDraw or None
+        """
+        with self.lock:
+            compiled = self.entries.get(key)
+            if compiled is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return compiled
+
+    def put(self, key, compiled):
+        with self.lock:
+            if self.max_size <= 0:
+                return
+            self.entries[key] = compiled
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Forget everything, the stats are kept
+        :return:
+        """
+        with self.lock:
+            self.entries = OrderedDict()
+
+    def stats(self):
+        """
+        :return: dictionary of size, max_size, hits, misses, evictions and hit_rate
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self.entries),
+                    'max_size': self.max_size,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
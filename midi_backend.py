@@ -0,0 +1,328 @@
+"""
+Where pylaunchpad gets its midi ports from.
+RtMidiBackend talks to real hardware through python-rtmidi.
+MockMidiBackend pretends to be a Launchpad, recording everything sent to it so that drawing code can be
+measured and tested without a Launchpad plugged in, on a machine with no midi hardware at all.
+Both hand out objects with the same methods as rtmidi.MidiOut and rtmidi.MidiIn that pylaunchpad uses.
+"""
+import math
+import time
+
+# Port names that pylaunchpad's LPMidi will recognise, the Mini MK3 name matches both the Windows and Mac patterns.
+# The original Mini isn't looked for by name, see device_profiles.PROFILES, so to pretend to be one pass
+# port_names=[MOCK_MINI_PORT_NAME] and make the LpMini yourself
+MOCK_PORT_NAMES = {'minimk3': 'Launchpad Mini MK3 LPMiniMK3 MIDI (LPMiniMK3 MIDI)',
+                   'mk2': 'Launchpad MK2',
+                   'pro': 'Launchpad Pro'}
+MOCK_MINI_PORT_NAME = 'Launchpad Mini'
+
+# What each pretend Launchpad says in its identity reply, the family and model bytes then the firmware version.
+# The original Mini doesn't answer
+MOCK_IDENTITIES = {'minimk3': [0x13, 0x01, 0, 0, 0, 4, 5, 3],
+                   'mk2': [0x69, 0, 0, 0, 0, 1, 7, 8],
+                   'pro': [0x51, 0, 0, 0, 0, 1, 8, 2]}
+IDENTITY_REQUEST = [240, 126, 127, 6, 1, 247]
+
+# Rough link speeds in bytes per second, for the bandwidth model.
+# Full speed USB moves one 64 byte packet per 1ms frame on a bulk endpoint, a 5 pin DIN midi cable
+# runs at 31250 baud with 10 bits per byte
+USB_FULL_SPEED = 64000
+DIN_MIDI = 3125
+
+
+def usb_midi_bytes(msg):
+    """
+    How many bytes a message takes on the USB link. USB midi sends 4 byte event packets,
+    each carrying up to 3 bytes of midi data
+    :param msg: list of bytes
+    :return:
+    """
+    return 4 * math.ceil(len(msg) / 3)
+
+
+class RtMidiBackend(object):
+    """
+    Real midi ports, using python-rtmidi. rtmidi is only imported when the first port is made
+    """
+
+    def __init__(self):
+        self.rtmidi = None
+
+    def load(self):
+        if self.rtmidi is None:
+            import rtmidi  # This is met by python-rtmidi
+            self.rtmidi = rtmidi
+        return self.rtmidi
+
+    def midi_out(self):
+        return self.load().MidiOut()
+
+    def midi_in(self):
+        return self.load().MidiIn()
+
+
+class MockMidiOut(object):
+    """
+    Stands in for rtmidi.MidiOut, every message sent is passed to the backend to record
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.port_num = None
+        self.unplug_count = None
+
+    def get_ports(self):
+        return list(self.backend.out_ports)
+
+    def get_port_count(self):
+        return len(self.backend.out_ports)
+
+    def get_port_name(self, port_num):
+        if port_num < len(self.backend.out_ports):
+            return self.backend.out_ports[port_num]
+        return None
+
+    def open_port(self, port_num=0, name=None):
+        if port_num >= len(self.backend.out_ports):
+            raise IOError(f"No midi output port {port_num}")
+        self.port_num = port_num
+        self.unplug_count = self.backend.unplug_count
+        return self
+
+    def is_port_open(self):
+        return self.port_num is not None
+
+    def close_port(self):
+        self.port_num = None
+
+    def send_message(self, message):
+        if self.port_num is None:
+            raise IOError("Midi output port is not open")
+        if self.unplug_count != self.backend.unplug_count:
+            # Like a real port, once the Launchpad has been unplugged this one is dead even if it comes back
+            raise IOError("Midi output port has gone")
+        self.backend.record(self.port_num, message)
+        if list(message) == IDENTITY_REQUEST:
+            self.backend.answer_identity()
+
+
+class MockMidiIn(object):
+    """
+    Stands in for rtmidi.MidiIn, messages injected by the backend go to the callback if one is set,
+    otherwise they wait to be read by get_message()
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.port_num = None
+        self.callback = None
+        self.callback_data = None
+        self.pending = []
+        self.last_time = None
+
+    def get_ports(self):
+        return list(self.backend.in_ports)
+
+    def get_port_count(self):
+        return len(self.backend.in_ports)
+
+    def get_port_name(self, port_num):
+        if port_num < len(self.backend.in_ports):
+            return self.backend.in_ports[port_num]
+        return None
+
+    def open_port(self, port_num=0, name=None):
+        if port_num >= len(self.backend.in_ports):
+            raise IOError(f"No midi input port {port_num}")
+        self.port_num = port_num
+        self.backend.open_inputs.append(self)
+        return self
+
+    def is_port_open(self):
+        return self.port_num is not None
+
+    def close_port(self):
+        if self in self.backend.open_inputs:
+            self.backend.open_inputs.remove(self)
+        self.port_num = None
+
+    def ignore_types(self, sysex=True, timing=True, active_sense=True):
+        pass
+
+    def set_callback(self, func, data=None):
+        self.callback = func
+        self.callback_data = data
+
+    def cancel_callback(self):
+        self.callback = None
+        self.callback_data = None
+
+    def get_message(self):
+        if self.pending:
+            return self.pending.pop(0)
+        return None
+
+    def receive(self, message):
+        # rtmidi gives the time since the previous message along with the message
+        now = time.perf_counter()
+        delta = 0.0 if self.last_time is None else now - self.last_time
+        self.last_time = now
+        if self.callback is not None:
+            self.callback((list(message), delta), self.callback_data)
+        else:
+            self.pending.append((list(message), delta))
+
+
+class MockMidiBackend(object):
+    """
+    A pretend Launchpad. Records every message sent with a time stamp, can press buttons,
+    and can model a slow link to estimate the frame rate real hardware could manage
+    e.g.
+    backend = MockMidiBackend('minimk3')
+    pad = pylp.get_me_a_pad(backend)
+    pad.draw_char(nl.letters['A'])
+    print(backend.message_count(), backend.byte_count())
+    """
+
+    def __init__(self, model='minimk3', port_names=None, bytes_per_second=None, simulate_delay=False,
+                 keep_messages=True, identity=None):
+        """
+        :param model: one of MOCK_PORT_NAMES, used if port_names isn't given
+        :param port_names: list of port names to pretend are connected, the same for input and output,
+        e.g. [MOCK_MINI_PORT_NAME] for an original Mini
+        :param bytes_per_second: speed of the pretend link, None for infinitely fast. Try USB_FULL_SPEED
+        :param simulate_delay: if True, send_message sleeps as long as the message would take on the link
+        :param keep_messages: set to False to only count messages and bytes, e.g. when measuring memory use
+        :param identity: the family, model and firmware bytes to answer identity requests with, see MOCK_IDENTITIES.
+        Defaults to the model's if port_names isn't given, otherwise identity requests aren't answered
+        """
+        if port_names is None:
+            port_names = [MOCK_PORT_NAMES[model]]
+            if identity is None:
+                identity = MOCK_IDENTITIES.get(model)
+        self.identity = identity
+        self.identity_requests = 0
+        self.out_ports = list(port_names)
+        self.in_ports = list(port_names)
+        self.port_names = list(port_names)
+        self.unplug_count = 0  # Ports opened before the last unplug() are dead
+        self.bytes_per_second = bytes_per_second
+        self.simulate_delay = simulate_delay
+        self.open_inputs = []
+        self.keep_messages = keep_messages
+        self.sent = []  # (time stamp, output port number, message)
+        self.sent_count = 0
+        self.sent_bytes = 0
+        self.sent_usb_bytes = 0
+        self.link_busy_until = 0.0  # When the pretend link finishes sending what it has been given
+        self.link_time = 0.0  # Total seconds of link time used
+
+    def midi_out(self):
+        return MockMidiOut(self)
+
+    def midi_in(self):
+        return MockMidiIn(self)
+
+    def record(self, port_num, message):
+        now = time.perf_counter()
+        message = list(message)
+        usb_bytes = usb_midi_bytes(message)
+        self.sent_count += 1
+        self.sent_bytes += len(message)
+        self.sent_usb_bytes += usb_bytes
+        if self.bytes_per_second:
+            duration = usb_bytes / self.bytes_per_second
+            self.link_time += duration
+            self.link_busy_until = max(self.link_busy_until, now) + duration
+            if self.simulate_delay:
+                # The port blocks until the link has room, as a real one does when it is saturated
+                while time.perf_counter() < self.link_busy_until:
+                    time.sleep(0)
+        if self.keep_messages:
+            self.sent.append((now, port_num, message))
+
+    def clear(self):
+        """
+        Forget everything that has been sent so far
+        :return:
+        """
+        self.sent = []
+        self.sent_count = 0
+        self.sent_bytes = 0
+        self.sent_usb_bytes = 0
+        self.link_time = 0.0
+
+    def messages(self):
+        """
+        :return: list of the messages sent so far
+        """
+        return [message for _, _, message in self.sent]
+
+    def message_count(self):
+        return self.sent_count
+
+    def byte_count(self):
+        return self.sent_bytes
+
+    def usb_byte_count(self):
+        return self.sent_usb_bytes
+
+    def inject(self, message):
+        """
+        Pretend the Launchpad sent a message, e.g. a button press
+        :param message: list of bytes
+        :return:
+        """
+        for midi_in in list(self.open_inputs):
+            midi_in.receive(message)
+
+    def answer_identity(self):
+        """
+        Reply to an identity request, as a Launchpad does, if this one answers
+        :return:
+        """
+        self.identity_requests += 1
+        if self.identity is not None:
+            self.inject([240, 126, 0, 6, 2, 0, 32, 41] + list(self.identity) + [247])
+
+    def press(self, note, velocity=127, status=144):
+        """
+        Press a button, use status 176 for the top row on the MK2 and LP Mini
+        :param note: the button number in the Launchpad's own layout
+        :param velocity: 127 for most models, the Pro sends how hard the pad was hit
+        :param status: 144 note on or 176 controller
+        :return:
+        """
+        self.inject([status, note, velocity])
+
+    def release(self, note, status=144):
+        self.inject([status, note, 0])
+
+    def unplug(self):
+        """
+        Pretend the Launchpad has been unplugged, the ports disappear
+        :return:
+        """
+        self.unplug_count += 1
+        self.out_ports = []
+        self.in_ports = []
+
+    def plug_in(self):
+        """
+        Plug the Launchpad back in after unplug(), ports opened before it was unplugged stay dead
+        :return:
+        """
+        self.out_ports = list(self.port_names)
+        self.in_ports = list(self.port_names)
+
+    def estimate_fps(self, frames, bytes_per_second=USB_FULL_SPEED):
+        """
+        Estimate the best frame rate the link could manage for what has been sent so far
+        :param frames: how many frames of animation were sent
+        :param bytes_per_second: speed of the link
+        :return: frames per second, or None if nothing was sent
+        """
+        usb_bytes = self.usb_byte_count()
+        if not usb_bytes:
+            return None
+        return frames * bytes_per_second / usb_bytes
@@ -0,0 +1,233 @@
+"""
+Drive a wall of Launchpads as one big canvas.
+Each Launchpad's 8 * 8 square pads are a tile of the canvas. Tiles can go anywhere in a grid of tiles
+and each Launchpad can be turned round, so the cables can come out whichever side suits.
+Drawing only changes the LED buffers, show() then sends every tile at once, each through its own
+midi port on its own thread, and waits for them all so the tiles change together.
+e.g.
+group = PadGroup.discover(columns=2)
+with group:
+    group.fill((0, 0, 63))
+    group.set_pixel(10, 3, 'red')
+    group.show()
+"""
+import threading
+
+import pylaunchpad as pylp
+
+TILE_SIZE = 8
+ROTATIONS = (0, 90, 180, 270)
+
+
+class Tile(object):
+    """
+    One Launchpad's place in the canvas
+    """
+
+    def __init__(self, pad, column, row, rotation=0):
+        """
+        :param pad: a Launchpad object
+        :param column: which column of tiles it is in, 0 is the left
+        :param row: which row of tiles it is in, 0 is the top
+        :param rotation: how far the Launchpad is turned clockwise, 0, 90, 180 or 270 degrees
+        """
+        if rotation not in ROTATIONS:
+            raise ValueError(f"Rotation must be one of {ROTATIONS}, not {rotation}")
+        self.pad = pad
+        self.column = column
+        self.row = row
+        self.rotation = rotation
+        self.sent = 0  # Pads sent by the last show()
+        self.error = None  # Anything the sending thread raised, show() raises it again
+        # The square pads start at 0, 1, except on the Pro where there are buttons all the way round
+        x_origin = 1 if pad.grid_size == 10 else 0
+        y_origin = 1
+        # pad_xy[v * 8 + u] is the pad x, y for pixel u, v of the tile
+        self.pad_xy = []
+        last = TILE_SIZE - 1
+        for v in range(TILE_SIZE):
+            for u in range(TILE_SIZE):
+                if rotation == 0:
+                    x, y = u, v
+                elif rotation == 90:
+                    x, y = v, last - u
+                elif rotation == 180:
+                    x, y = last - u, last - v
+                else:
+                    x, y = last - v, u
+                self.pad_xy.append((x_origin + x, y_origin + y))
+
+
+class PadGroup(object):
+    """
+    Several Launchpads as one canvas, (0, 0) is the top left pixel
+    """
+
+    def __init__(self, pads, layout=None, columns=None):
+        """
+        :param pads: list of Launchpad objects
+        :param layout: list of (column, row, rotation) for each pad, in tiles, rotation is clockwise degrees.
+        Defaults to the pads left to right in one row, or in rows of columns
+        :param columns: tiles per row for the default layout
+        """
+        if not pads:
+            raise ValueError("A PadGroup needs at least one Launchpad")
+        if layout is None:
+            columns = columns or len(pads)
+            layout = [(i % columns, i // columns, 0) for i in range(len(pads))]
+        if len(layout) != len(pads):
+            raise ValueError(f"{len(pads)} Launchpads but the layout has {len(layout)} tiles")
+        self.tiles = [Tile(pad, column, row, rotation) for pad, (column, row, rotation) in zip(pads, layout)]
+        self.tile_at = {}
+        for tile in self.tiles:
+            if (tile.column, tile.row) in self.tile_at:
+                raise ValueError(f"Two Launchpads at tile {tile.column}, {tile.row}")
+            self.tile_at[(tile.column, tile.row)] = tile
+        self.width = (max(tile.column for tile in self.tiles) + 1) * TILE_SIZE
+        self.height = (max(tile.row for tile in self.tiles) + 1) * TILE_SIZE
+        # Nothing is sent until show()
+        self.previous_auto_flush = [tile.pad.auto_flush for tile in self.tiles]
+        for tile in self.tiles:
+            tile.pad.auto_flush = False
+        self.threads = []
+        self.running = False
+        self.start_barrier = None
+        self.done_barrier = None
+        self.frames = 0
+
+    @classmethod
+    def discover(cls, backend=None, layout=None, columns=None):
+        """
+        Make a group of every connected Launchpad we support
+        :param backend: where to get midi ports from, defaults to real hardware via rtmidi
+        :param layout: see __init__
+        :param columns: see __init__
+        :return: a PadGroup
+        :raises: IOError if there aren't any Launchpads
+        """
+        pads = pylp.get_all_pads(backend)
+        if not pads:
+            raise IOError("No Launchpads found")
+        return cls(pads, layout, columns)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """
+        Start a sending thread for each tile, without them show() sends the tiles one after the other
+        :return:
+        """
+        if self.running:
+            return
+        self.running = True
+        # The main thread waits at the barriers too, to start a frame and to know it has all been sent
+        self.start_barrier = threading.Barrier(len(self.tiles) + 1)
+        self.done_barrier = threading.Barrier(len(self.tiles) + 1)
+        self.threads = [threading.Thread(target=self.run, args=(tile,), name=f"PadGroupTile{i}", daemon=True)
+                        for i, tile in enumerate(self.tiles)]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        """
+        Stop the sending threads, anything not yet shown is sent, and put auto_flush back how it was
+        :return:
+        """
+        if self.running:
+            self.show()
+            self.running = False
+            self.start_barrier.wait()  # Lets the threads see running is False
+            for thread in self.threads:
+                thread.join()
+            self.threads = []
+        for tile, auto_flush in zip(self.tiles, self.previous_auto_flush):
+            tile.pad.auto_flush = auto_flush
+
+    def run(self, tile):
+        while True:
+            self.start_barrier.wait()
+            if not self.running:
+                return
+            try:
+                tile.sent = tile.pad.flush()
+            except Exception as error:
+                # Keep going so the barriers still line up, show() passes the error on
+                tile.error = error
+            self.done_barrier.wait()
+
+    def show(self):
+        """
+        Send what has changed on every tile, and wait until it has all gone
+        :return: the number of pads sent
+        """
+        if self.running:
+            self.start_barrier.wait()
+            self.done_barrier.wait()
+            for tile in self.tiles:
+                if tile.error is not None:
+                    error, tile.error = tile.error, None
+                    raise error
+        else:
+            for tile in self.tiles:
+                tile.sent = tile.pad.flush()
+        self.frames += 1
+        return sum(tile.sent for tile in self.tiles)
+
+    def set_pixel(self, x, y, colour):
+        """
+        :param x: 0 is the left of the canvas
+        :param y: 0 is the top of the canvas
+        :param colour: a palette number, a colour name or an (r, g, b) tuple of 0 - 63 values.
+        Colour names and palette numbers are the Launchpad's own, so may look different on different models
+        :return:
+        """
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return
+        tile = self.tile_at.get((x // TILE_SIZE, y // TILE_SIZE))
+        if tile is None:
+            return
+        pad_x, pad_y = tile.pad_xy[(y % TILE_SIZE) * TILE_SIZE + x % TILE_SIZE]
+        tile.pad.set_leds([(pad_x, pad_y, colour)])
+
+    def fill(self, colour):
+        """
+        Set every pixel of the canvas to the same colour
+        :param colour: see set_pixel()
+        :return:
+        """
+        for tile in self.tiles:
+            tile.pad.set_leds((x, y, colour) for x, y in tile.pad_xy)
+
+    def clear(self):
+        self.fill(0)
+
+    def blit_rgb(self, frame):
+        """
+        Draw a whole canvas of RGB data
+        :param frame: width * height pixels of red, green, blue values 0 - 63, as bytes, a flat list or
+        a NumPy array of height rows of width pixels. Values above 63 are limited to 63
+        :return:
+        """
+        if hasattr(frame, "reshape"):
+            data = frame.reshape(-1).tobytes()
+        else:
+            data = bytes(frame)
+        if len(data) != self.width * self.height * 3:
+            raise ValueError(f"The canvas needs {self.width}*{self.height} RGB values, not {len(data)} bytes")
+        data = data.translate(pylp.LIMIT_63)
+        for tile in self.tiles:
+            updates = []
+            left = tile.column * TILE_SIZE
+            top = tile.row * TILE_SIZE
+            for v in range(TILE_SIZE):
+                i = ((top + v) * self.width + left) * 3
+                for u in range(TILE_SIZE):
+                    x, y = tile.pad_xy[v * TILE_SIZE + u]
+                    updates.append((x, y, (data[i], data[i + 1], data[i + 2])))
+                    i += 3
+            tile.pad.set_leds(updates)
@@ -0,0 +1,148 @@
+"""
+Find the nearest palette colour for an RGB colour.
+Setting a pad to an RGB colour needs a sysex message, 12 or 13 bytes for a single pad, where a palette colour
+is a three byte note. The RGB Launchpads all share Novation's 128 colour palette, so if a pattern's colours are
+close to palette colours it can be sent as palette numbers for a fraction of the bytes.
+The nearest palette colour for every one of the 64 * 64 * 64 RGB colours the Launchpad can show is kept in a
+lookup table. With NumPy the whole table is worked out the first time it is needed, without NumPy each entry
+is worked out the first time that colour is asked for.
+e.g.
+quantizer = get_quantizer()
+pad.set_led_xy_by_colour(0, 1, quantizer.quantize(63, 20, 0))
+or pad.palette_mode = True and blit_rgb() / set_leds() do it for you
+"""
+
+# Novation's default palette, as 8 bit RGB. These are approximate, the LEDs don't look quite like a screen
+NOVATION_PALETTE = [
+    0x000000, 0x1E1E1E, 0x7F7F7F, 0xFFFFFF, 0xFF4C4C, 0xFF0000, 0x590000, 0x190000,
+    0xFFBD6C, 0xFF5400, 0x591D00, 0x271B00, 0xFFFF4C, 0xFFFF00, 0x595900, 0x191900,
+    0x88FF4C, 0x54FF00, 0x1D5900, 0x142B00, 0x4CFF4C, 0x00FF00, 0x005900, 0x001900,
+    0x4CFF5E, 0x00FF19, 0x00590D, 0x001902, 0x4CFF88, 0x00FF55, 0x00591D, 0x001F12,
+    0x4CFFB7, 0x00FF99, 0x005935, 0x001912, 0x4CC3FF, 0x00A9FF, 0x004152, 0x001019,
+    0x4C88FF, 0x0055FF, 0x001D59, 0x000819, 0x4C4CFF, 0x0000FF, 0x000059, 0x000019,
+    0x874CFF, 0x5400FF, 0x190064, 0x0F0030, 0xFF4CFF, 0xFF00FF, 0x590059, 0x190019,
+    0xFF4C87, 0xFF0054, 0x59001D, 0x220013, 0xFF1500, 0x993500, 0x795100, 0x436400,
+    0x033900, 0x005735, 0x00547F, 0x0000FF, 0x00454F, 0x2500CC, 0x7F7F7F, 0x202020,
+    0xFF0000, 0xBDFF2D, 0xAFED06, 0x64FF09, 0x108B00, 0x00FF87, 0x00A9FF, 0x002AFF,
+    0x3F00FF, 0x7A00FF, 0xB21A7D, 0x402100, 0xFF4A00, 0x88E106, 0x72FF15, 0x00FF00,
+    0x3BFF26, 0x59FF71, 0x38FFCC, 0x5B8AFF, 0x3151C6, 0x877FE9, 0xD31DFF, 0xFF005D,
+    0xFF7F00, 0xB9B000, 0x90FF00, 0x835D07, 0x392B00, 0x144C10, 0x0D5038, 0x15152A,
+    0x16205A, 0x693C1C, 0xA8000A, 0xDE513D, 0xD86A1C, 0xFFE126, 0x9EE12F, 0x67B50F,
+    0x1E1E30, 0xDCFF6B, 0x80FFBD, 0x9A99FF, 0x8E66FF, 0x404040, 0x757575, 0xE0FFFF,
+    0xA00000, 0x350000, 0x1AD000, 0x074200, 0xB9B000, 0x3F3100, 0xB35F00, 0x4B1502,
+]
+
+# The same palette in the Launchpad's 0 - 63 RGB range
+PALETTE_63 = [((rgb >> 18) & 63, (rgb >> 10) & 63, (rgb >> 2) & 63) for rgb in NOVATION_PALETTE]
+
+UNKNOWN = 255  # Table entry not worked out yet, palette numbers only go up to 127
+
+# The original Launchpad Mini has 4 levels of red and green, nearest level for each 0 - 63 value
+RED_GREEN_LEVELS = bytes((value * 3 + 31) // 63 for value in range(64))
+
+
+def red_green_value(red, green, blue=0):
+    """
+    The nearest of the original Launchpad Mini's 16 red and green colours, blue is ignored
+    :param red: 0 - 63
+    :param green: 0 - 63
+    :param blue: ignored
+    :return: a colour for LpMini, see LpMini.get_led_color()
+    """
+    return RED_GREEN_LEVELS[red] | (RED_GREEN_LEVELS[green] << 4)
+
+
+def nearest_colour(red, green, blue, palette=PALETTE_63):
+    """
+    Search the palette for the nearest colour, the lookup table in PaletteQuantizer is much quicker
+    :return: the palette number
+    """
+    best = 0
+    best_distance = None
+    for number, (palette_red, palette_green, palette_blue) in enumerate(palette):
+        distance = (red - palette_red) ** 2 + (green - palette_green) ** 2 + (blue - palette_blue) ** 2
+        if best_distance is None or distance < best_distance:
+            best = number
+            best_distance = distance
+    return best
+
+
+class PaletteQuantizer(object):
+    """
+    Nearest palette colour for any 0 - 63 RGB colour, from a 64 * 64 * 64 lookup table
+    """
+
+    def __init__(self, palette=PALETTE_63):
+        """
+        :param palette: list of up to 128 (r, g, b) colours, 0 - 63
+        """
+        self.palette = list(palette)
+        self.table = None
+
+    def build_table(self):
+        """
+        Work out the lookup table, all of it if NumPy is installed
+        :return:
+        """
+        try:
+            import numpy
+        except ImportError:
+            self.table = bytearray([UNKNOWN]) * (64 * 64 * 64)
+            return
+        palette = numpy.array(self.palette, dtype=numpy.int32)
+        levels = numpy.arange(64, dtype=numpy.int32)
+        green, blue = numpy.meshgrid(levels, levels, indexing='ij')
+        green = green.reshape(-1, 1)
+        blue = blue.reshape(-1, 1)
+        table = numpy.empty(64 * 64 * 64, dtype=numpy.uint8)
+        # One red level at a time keeps the distance array small, 4096 colours by the palette size
+        for red in range(64):
+            distance = (red - palette[:, 0]) ** 2 + (green - palette[:, 1]) ** 2 + (blue - palette[:, 2]) ** 2
+            table[red * 4096:(red + 1) * 4096] = distance.argmin(axis=1)
+        self.table = bytearray(table.tobytes())
+
+    def quantize(self, red, green, blue):
+        """
+        :param red: 0 - 63
+        :param green: 0 - 63
+        :param blue: 0 - 63
+        :return: the number of the nearest palette colour
+        """
+        if self.table is None:
+            self.build_table()
+        index = (red << 12) | (green << 6) | blue
+        number = self.table[index]
+        if number == UNKNOWN:
+            number = nearest_colour(red, green, blue, self.palette)
+            self.table[index] = number
+        return number
+
+    def quantize_frame(self, data):
+        """
+        :param data: red, green, blue values 0 - 63 for each pixel, e.g. from pylaunchpad.rgb_frame_bytes()
+        :return: list of palette numbers, one per pixel
+        """
+        return [self.quantize(data[i], data[i + 1], data[i + 2]) for i in range(0, len(data), 3)]
+
+    def error(self, red, green, blue):
+        """
+        How far the nearest palette colour is from the colour asked for, to see if palette mode will look right
+        :return: the distance between the colours, 0 - 63 scale
+        """
+        palette_red, palette_green, palette_blue = self.palette[self.quantize(red, green, blue)]
+        return ((red - palette_red) ** 2 + (green - palette_green) ** 2 + (blue - palette_blue) ** 2) ** 0.5
+
+
+quantizers = {}
+
+
+def get_quantizer(palette=PALETTE_63):
+    """
+    The quantizer for a palette, made the first time it is asked for and shared after that
+    :param palette: list of (r, g, b) colours, 0 - 63
+    :return: a PaletteQuantizer
+    """
+    key = tuple(palette)
+    if key not in quantizers:
+        quantizers[key] = PaletteQuantizer(palette)
+    return quantizers[key]
@@ -0,0 +1,497 @@
+"""
+A compact binary file for pattern animations, that can be played without loading it all into memory.
+The CSV files in patterns/ hold one frame per line as 64 text numbers, which have to be read and
+converted with int() before the first frame can be shown. In a pattern file each pixel is three 6 bit
+values, the most the Launchpad can show, packed four to three bytes, so a frame is 144 bytes, or less
+if it is run length encoded. An index at the end of the file says where each frame starts, so the file
+is memory mapped and any frame can be fetched straight away, only the frames played are ever read.
+Most animations only change a few pixels from one frame to the next, so by default a frame is stored as just
+the pixels that changed, with a whole keyframe every so often. Playing sends only the changed pixels and
+fetching a frame starts from the keyframe before it.
+
+File layout, all numbers little endian
+    header       magic b'LPAT', version, width, height, flags, frame count, frame time in ms,
+                 keyframe interval (0 if there are no delta frames), offset of the index
+    frames       each is an encoding byte, 0 = packed, 1 = run length encoded, 2 = delta, followed by the data.
+                 A delta frame is pixel number, red, green, blue for each changed pixel, packed like the channels
+    index        frame count + 1 offsets from the start of the file, the last one is the end of the frames
+
+python pattern_file.py patterns/*.csv            # Write a .lpat file next to each CSV file
+python pattern_file.py --keyframes 0 patterns/*.csv  # Every frame whole, as version 1 files were
+python pattern_file.py --play patterns/fly.lpat  # Play one on the first Launchpad found
+"""
+import argparse
+import mmap
+import os
+import struct
+from array import array
+
+from frame_clock import FrameClock
+from pylaunchpad import RGB565, channel_tables, colour_bits
+
+MAGIC = b'LPAT'
+VERSION = 2
+READ_VERSIONS = (1, 2)  # Version 1 files have no delta frames, otherwise they are the same
+HEADER = struct.Struct('<4sBBBBIHHI')
+OFFSET = struct.Struct('<I')
+FLAG_RLE = 1  # Frames were run length encoded where it made them smaller
+FLAG_DELTA = 2  # Frames were stored as changes from the previous frame where it made them smaller
+KEYFRAME_INTERVAL = 32  # Most frames from one keyframe to the next, so seeking never has far to go
+
+ENCODING_PACKED = 0
+ENCODING_RLE = 1
+ENCODING_DELTA = 2
+
+
+def pack_channels(channels):
+    """
+    Pack 6 bit channel values four to three bytes
+    :param channels: sequence of values 0 - 63. If it isn't a multiple of 4 long, e.g. a 9 * 9 frame,
+    the last group is padded with 0s, which unpack_channels() gives back
+    :return: bytes
+    """
+    extra = len(channels) % 4
+    if extra:
+        channels = list(channels) + [0] * (4 - extra)
+    packed = bytearray()
+    for i in range(0, len(channels), 4):
+        bits = (channels[i] << 18) | (channels[i + 1] << 12) | (channels[i + 2] << 6) | channels[i + 3]
+        packed += bits.to_bytes(3, 'big')
+    return bytes(packed)
+
+
+def unpack_channels(packed):
+    """
+    The reverse of pack_channels
+    :param packed: bytes from pack_channels
+    :return: bytes of 6 bit channel values, ready for pad.blit_rgb(), including any padding pack_channels() added
+    """
+    channels = bytearray()
+    for i in range(0, len(packed), 3):
+        bits = int.from_bytes(packed[i:i + 3], 'big')
+        channels += bytes((bits >> 18, (bits >> 12) & 63, (bits >> 6) & 63, bits & 63))
+    return bytes(channels)
+
+
+def rle_encode(data):
+    """
+    PackBits style run length encoding. A count byte of 0 - 127 is followed by that many + 1 literal bytes,
+    129 - 255 is followed by one byte to repeat 257 - count times
+    :param data: bytes
+    :return: bytes
+    """
+    encoded = bytearray()
+    i = 0
+    size = len(data)
+    while i < size:
+        run = 1
+        while i + run < size and run < 128 and data[i + run] == data[i]:
+            run += 1
+        if run > 1:
+            encoded += bytes((257 - run, data[i]))
+            i += run
+            continue
+        # Collect literal bytes until the next run starts
+        start = i
+        i += 1
+        while i < size and i - start < 128 and (i + 1 >= size or data[i] != data[i + 1]):
+            i += 1
+        encoded.append(i - start - 1)
+        encoded += data[start:i]
+    return bytes(encoded)
+
+
+def rle_decode(data):
+    decoded = bytearray()
+    i = 0
+    size = len(data)
+    while i < size:
+        count = data[i]
+        i += 1
+        if count < 128:
+            decoded += data[i:i + count + 1]
+            i += count + 1
+        else:
+            decoded += bytes((data[i],)) * (257 - count)
+            i += 1
+    return bytes(decoded)
+
+
+def encode_frame(channels, rle=True):
+    """
+    :param channels: 6 bit channel values, red, green, blue for each pixel
+    :param rle: use run length encoding if it makes the frame smaller
+    :return: bytes to store in the file
+    """
+    packed = pack_channels(channels)
+    if rle:
+        encoded = rle_encode(packed)
+        if len(encoded) < len(packed):
+            return bytes((ENCODING_RLE,)) + encoded
+    return bytes((ENCODING_PACKED,)) + packed
+
+
+def frame_changes(previous, channels):
+    """
+    :param previous: channel values of the frame before
+    :param channels: channel values of this frame
+    :return: list of (pixel number, red, green, blue) for the pixels that are different
+    """
+    changes = []
+    for pixel, i in enumerate(range(0, len(channels), 3)):
+        if channels[i] != previous[i] or channels[i + 1] != previous[i + 1] or channels[i + 2] != previous[i + 2]:
+            changes.append((pixel, channels[i], channels[i + 1], channels[i + 2]))
+    return changes
+
+
+def encode_delta(changes):
+    """
+    Pixel numbers are 6 bits like the colours, so each change packs into 3 bytes
+    :param changes: list of (pixel number, red, green, blue) from frame_changes()
+    :return: bytes to store in the file
+    """
+    channels = []
+    for change in changes:
+        channels += change
+    return bytes((ENCODING_DELTA,)) + pack_channels(channels)
+
+
+def decode_delta(data):
+    """
+    :param data: a delta frame without its encoding byte
+    :return: list of (pixel number, red, green, blue)
+    """
+    channels = unpack_channels(data)
+    return [tuple(channels[i:i + 4]) for i in range(0, len(channels), 4)]
+
+
+def apply_changes(channels, changes):
+    """
+    :param channels: bytearray of channel values, changed in place
+    :param changes: list of (pixel number, red, green, blue)
+    :return:
+    """
+    for pixel, red, green, blue in changes:
+        channels[pixel * 3:pixel * 3 + 3] = bytes((red, green, blue))
+
+
+def csv_bits(csv_filename):
+    """
+    Find out how many bits a CSV pattern's colours have, RGB565 for the files in patterns/
+    :param csv_filename:
+    :return: 6, 8 or RGB565, see pylaunchpad.colour_bits()
+    """
+    red = green = blue = 0
+    with open(csv_filename) as csv_file:
+        for line in csv_file:
+            for value in line.strip().split(","):
+                if value:
+                    packed = int(value)
+                    red = max(red, (packed >> 16) & 0xFF)
+                    green = max(green, (packed >> 8) & 0xFF)
+                    blue = max(blue, packed & 0xFF)
+    return colour_bits(red, green, blue)
+
+
+def csv_frames(csv_filename, gamma=1.0, bits=RGB565):
+    """
+    Read a CSV pattern a line at a time
+    :param csv_filename: file of rows of 64 packed 24 bit RGB values
+    :param gamma: see pylaunchpad.gamma_table()
+    :param bits: RGB565 for the files in patterns/, 6 if the colours are already 0 - 63, 8 for 0 - 255
+    :return: a generator of lists of 192 channel values 0 - 63
+    """
+    red_scale, green_scale, blue_scale = channel_tables(gamma, bits)
+    with open(csv_filename) as csv_file:
+        for line in csv_file:
+            line = line.strip()
+            if not line:
+                continue
+            channels = []
+            for value in line.split(","):
+                packed = int(value)
+                channels += [red_scale[(packed >> 16) & 0xFF], green_scale[(packed >> 8) & 0xFF],
+                             blue_scale[packed & 0xFF]]
+            yield channels
+
+
+def write_pattern(filename, frames, width=8, height=8, frame_time=0.05, rle=True,
+                  keyframe_interval=KEYFRAME_INTERVAL):
+    """
+    Write a pattern file, the frames are written as they arrive so any number can be written
+    :param filename: the file to write
+    :param frames: iterable of frames, each a sequence of width * height * 3 channel values 0 - 63
+    :param width:
+    :param height:
+    :param frame_time: seconds per frame when played
+    :param rle: run length encode frames where it helps
+    :param keyframe_interval: store frames as the pixels that changed where that is smaller, with a whole frame
+    at least this often. 0 to store every frame whole. Pixel numbers have to fit in 6 bits, so patterns bigger
+    than 8 * 8 are always stored whole
+    :return: the number of frames written
+    """
+    if width * height > 64:
+        keyframe_interval = 0
+    offsets = array('I')
+    with open(filename, 'wb') as pattern:
+        pattern.write(bytes(HEADER.size))  # Filled in when we know how many frames there are
+        offset = HEADER.size
+        previous = None
+        deltas = 0  # Delta frames since the last keyframe
+        for channels in frames:
+            data = encode_frame(channels, rle)
+            if previous is not None and deltas < keyframe_interval - 1:
+                delta = encode_delta(frame_changes(previous, channels))
+                if len(delta) < len(data):
+                    data = delta
+                    deltas += 1
+                else:
+                    deltas = 0
+            else:
+                deltas = 0
+            previous = channels
+            offsets.append(offset)
+            pattern.write(data)
+            offset += len(data)
+        offsets.append(offset)
+        index_offset = offset
+        for offset in offsets:
+            pattern.write(OFFSET.pack(offset))
+        frame_count = len(offsets) - 1
+        pattern.seek(0)
+        flags = (FLAG_RLE if rle else 0) | (FLAG_DELTA if keyframe_interval else 0)
+        pattern.write(HEADER.pack(MAGIC, VERSION, width, height, flags, frame_count,
+                                  int(round(frame_time * 1000)), keyframe_interval, index_offset))
+    return frame_count
+
+
+def convert_csv(csv_filename, pattern_filename=None, frame_time=0.05, rle=True, gamma=1.0, bits=None,
+                keyframe_interval=KEYFRAME_INTERVAL):
+    """
+    Convert a CSV pattern from patterns/ into a pattern file
+    :param csv_filename:
+    :param pattern_filename: defaults to the CSV file name ending in .lpat
+    :param frame_time: seconds per frame
+    :param rle: run length encode frames where it helps
+    :param keyframe_interval: see write_pattern()
+    :param gamma: see pylaunchpad.gamma_table()
+    :param bits: RGB565, 6 if the colours are 0 - 63 or 8 if they are 0 - 255, None to look through the file
+    :return: the name of the pattern file
+    """
+    if pattern_filename is None:
+        pattern_filename = os.path.splitext(csv_filename)[0] + ".lpat"
+    if bits is None:
+        bits = csv_bits(csv_filename)
+    write_pattern(pattern_filename, csv_frames(csv_filename, gamma, bits), frame_time=frame_time, rle=rle,
+                  keyframe_interval=keyframe_interval)
+    return pattern_filename
+
+
+class PatternFile(object):
+    """
+    A memory mapped pattern file, frames are read from disk as they are asked for
+    e.g.
+    with PatternFile("patterns/fly.lpat") as pattern:
+        pad.blit_rgb(pattern[10])
+        pattern.play(pad)
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.width, self.height, self.flags, self.frame_count, frame_ms, \
+                self.keyframe_interval, self.index_offset = HEADER.unpack_from(self.map, 0)
+        except (ValueError, struct.error):
+            self.file.close()
+            raise ValueError(f"{filename} is not a pattern file")
+        if magic != MAGIC or version not in READ_VERSIONS:
+            self.close()
+            raise ValueError(f"{filename} is not a version {VERSION} pattern file")
+        self.frame_time = frame_ms / 1000.0
+
+    def __len__(self):
+        return self.frame_count
+
+    def __getitem__(self, frame):
+        return self.frame(frame)
+
+    def __iter__(self):
+        for channels, _ in self.frames():
+            yield channels
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def frame_data(self, frame):
+        """
+        :param frame: frame number
+        :return: (encoding, data) as stored in the file
+        """
+        start, = OFFSET.unpack_from(self.map, self.index_offset + frame * OFFSET.size)
+        end, = OFFSET.unpack_from(self.map, self.index_offset + (frame + 1) * OFFSET.size)
+        return self.map[start], self.map[start + 1:end]
+
+    def is_keyframe(self, frame):
+        """
+        :param frame: frame number
+        :return: True if the frame is stored whole, rather than as changes from the frame before
+        """
+        start, = OFFSET.unpack_from(self.map, self.index_offset + frame * OFFSET.size)
+        return self.map[start] != ENCODING_DELTA
+
+    def keyframe_before(self, frame):
+        """
+        :param frame: frame number
+        :return: the number of the nearest keyframe at or before frame
+        """
+        while frame > 0 and not self.is_keyframe(frame):
+            frame -= 1
+        return frame
+
+    def changes(self, frame):
+        """
+        The pixels a frame changes
+        :param frame: frame number
+        :return: list of (pixel number, red, green, blue), or None for a keyframe, where every pixel is set
+        """
+        encoding, data = self.frame_data(frame)
+        if encoding != ENCODING_DELTA:
+            return None
+        return decode_delta(data)
+
+    def whole_frame(self, frame):
+        # Only for keyframes. Frames that aren't a multiple of 4 channels have padding on the end to cut off
+        encoding, data = self.frame_data(frame)
+        if encoding == ENCODING_RLE:
+            data = rle_decode(data)
+        return unpack_channels(data)[:self.width * self.height * 3]
+
+    def frame(self, frame):
+        """
+        Fetch a single frame, for a delta frame this starts from the keyframe before it
+        :param frame: frame number, negative numbers count from the end
+        :return: bytes of red, green, blue values 0 - 63 for each pixel, ready for pad.blit_rgb()
+        """
+        if frame < 0:
+            frame += self.frame_count
+        if not 0 <= frame < self.frame_count:
+            raise IndexError(f"Frame {frame} is not in {self.filename}")
+        keyframe = self.keyframe_before(frame)
+        if keyframe == frame:
+            return self.whole_frame(frame)
+        channels = bytearray(self.whole_frame(keyframe))
+        for delta in range(keyframe + 1, frame + 1):
+            apply_changes(channels, self.changes(delta))
+        return bytes(channels)
+
+    def frames(self, start=0, stop=None):
+        """
+        Fetch frames in order, each delta frame is applied to the one before rather than going back to a keyframe
+        :param start: first frame
+        :param stop: frame to stop before, defaults to the end
+        :return: a generator of (frame bytes, changes), changes is None if every pixel may have changed
+        """
+        if stop is None:
+            stop = self.frame_count
+        if start >= stop:
+            return
+        channels = bytearray(self.frame(start))
+        yield bytes(channels), None
+        for frame in range(start + 1, stop):
+            changes = self.changes(frame)
+            if changes is None:
+                channels = bytearray(self.whole_frame(frame))
+            else:
+                apply_changes(channels, changes)
+            yield bytes(channels), changes
+
+    def stats(self):
+        """
+        How much the delta frames save, without decoding any pixels
+        :return: dictionary of frames, keyframes, pixels (per frame) and pixels_sent, the pixels play() draws
+        for the whole file, where a keyframe draws them all
+        """
+        pixels = self.width * self.height
+        keyframes = 0
+        pixels_sent = 0
+        for frame in range(self.frame_count):
+            encoding, data = self.frame_data(frame)
+            if encoding == ENCODING_DELTA:
+                pixels_sent += len(data) // 3
+            else:
+                keyframes += 1
+                pixels_sent += pixels
+        return {'frames': self.frame_count, 'keyframes': keyframes, 'pixels': pixels, 'pixels_sent': pixels_sent}
+
+    def play(self, pad, start=0, stop=None, loops=1, frame_time=None, clock=None):
+        """
+        Show frames on the Launchpad, for delta frames only the pixels that changed are drawn
+        :param pad: a Launchpad object
+        :param start: first frame to show
+        :param stop: frame to stop before, defaults to the end
+        :param loops: how many times to play
+        :param frame_time: seconds per frame, defaults to the time saved in the file
+        :param clock: a FrameClock, to keep several calls on the same schedule
+        :return:
+        """
+        if clock is None:
+            clock = FrameClock(self.frame_time if frame_time is None else frame_time)
+        # Where blit_rgb() puts the frame
+        y_offset = 1 if self.width == 8 else 0
+        for _ in range(loops):
+            for channels, changes in self.frames(start, stop):
+                clock.tick()
+                if changes is None:
+                    pad.blit_rgb(channels)
+                else:
+                    pad.set_leds((pixel % self.width, pixel // self.width + y_offset, (red, green, blue))
+                                 for pixel, red, green, blue in changes)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert CSV patterns to pattern files, or play one")
+    parser.add_argument("files", nargs="+", help="CSV files to convert, or pattern files to play with --play")
+    parser.add_argument("--play", action="store_true", help="play the pattern files on a Launchpad")
+    parser.add_argument("--frame-time", type=float, default=None,
+                        help="seconds per frame, defaults to 0.05 when converting and the file's own when playing")
+    parser.add_argument("--no-rle", action="store_true", help="don't run length encode the frames")
+    parser.add_argument("--keyframes", type=int, default=KEYFRAME_INTERVAL,
+                        help="most frames between whole frames, 0 to store every frame whole")
+    args = parser.parse_args(argv)
+
+    if args.play:
+        import pylaunchpad as pylp
+        pad = pylp.get_me_a_pad()
+        for filename in args.files:
+            with PatternFile(filename) as pattern:
+                pattern.play(pad, frame_time=args.frame_time)
+        return
+
+    for filename in args.files:
+        frame_time = 0.05 if args.frame_time is None else args.frame_time
+        pattern_filename = convert_csv(filename, frame_time=frame_time, rle=not args.no_rle,
+                                       keyframe_interval=args.keyframes)
+        csv_size = os.path.getsize(filename)
+        pattern_size = os.path.getsize(pattern_filename)
+        with PatternFile(pattern_filename) as pattern:
+            stats = pattern.stats()
+        # Pixels play() draws per frame, against drawing every pixel of every frame
+        per_frame = stats['pixels_sent'] / max(stats['frames'], 1)
+        print(f"{filename} ({csv_size} bytes) -> {pattern_filename} ({pattern_size} bytes, "
+              f"{csv_size / pattern_size:.1f}x smaller), {stats['keyframes']} of {stats['frames']} frames whole, "
+              f"{per_frame:.1f} of {stats['pixels']} pixels drawn per frame")
+
+
+if __name__ == "__main__":
+    main()
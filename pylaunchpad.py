@@ -4,126 +4,324 @@ Re-written to use rtmidi instead of pygame, different bit twiddling for scrollin
 Limited to Launchpad Mini and MK2
 Spaces not tabs and more functionality in the base class to reuse methods
 """
-import random
+# csv, json, platform and random are imported where they are used, between them they took longer to import than
+# the rest of the library. The fonts and rtmidi are only loaded when they are first needed too
 import sys
 import time
-import csv
-import rtmidi  # This is met by python-rtmidi
-import narrow_letters as nl
-import wide_font as wf
-import platform
+import threading
+from contextlib import contextmanager
+import device_profiles
+import palette
+from frame_clock import FrameClock
+from text_strip import TextStrip, get_font
+from bitboard import Bitboard, COLUMNS, LEFT_KEEP, RIGHT_KEEP
+from message_cache import MessageCache, CompiledDraw
+from midi_backend import RtMidiBackend
+import os
+
+
+# Translation table used to clamp a whole frame of 8 bit channel values to the Launchpad's 0-63 range
+LIMIT_63 = bytes(min(value, 63) for value in range(256))
+
+
+# Bits in each of red, green and blue for 565 colours, e.g. the patterns/ files from Blinkinlabs PatternPaint,
+# which keep each channel in its own byte of a 24 bit number
+RGB565 = (5, 6, 5)
+
+
+def gamma_table(gamma=1.0, bits=8):
+    """
+    A table to scale colour values to the Launchpad's 0 - 63 range, for bytes.translate() or as a NumPy lookup.
+    A higher gamma makes the dim colours dimmer, which can look more natural as LEDs are much brighter at low
+    levels than a screen
+    :param gamma: 1.0 for a straight scale
+    :param bits: how many bits the values being scaled have, 8 for 0 - 255, 6 if they are already 0 - 63.
+    Values too big for that many bits are limited to the top value
+    :return: 256 bytes
+    """
+    top = (1 << bits) - 1
+    return bytes(int(round(63 * (min(value, top) / top) ** gamma)) for value in range(256))
+
+
+def channel_tables(gamma=1.0, bits=8):
+    """
+    A gamma_table() for each of red, green and blue, for colours that don't have the same bits in every channel
+    :param gamma: see gamma_table()
+    :param bits: bits in every channel, or (red, green, blue) bits, e.g. RGB565
+    :return: (red table, green table, blue table)
+    """
+    if isinstance(bits, int):
+        bits = (bits, bits, bits)
+    return tuple(gamma_table(gamma, channel_bits) for channel_bits in bits)
+
+
+def colour_bits(red, green, blue):
+    """
+    Guess how many bits a pattern's colours have from the biggest value in each channel
+    :return: 8 if any are over 63, RGB565 if red and blue fit in 5 bits, otherwise 6
+    """
+    if max(red, green, blue) > 63:
+        return 8
+    if red < 32 and blue < 32:
+        return RGB565
+    return 6
+
+# draw_char results shared by every Launchpad, see message_cache.py
+draw_cache = MessageCache(256)
+
+# Where midi ports come from unless told otherwise, see set_backend()
+default_backend = RtMidiBackend()
+
+# A good place for LPMidi to keep the midi ports it found, e.g. get_me_a_pad(cache_file=pylp.PORT_CACHE_FILE)
+PORT_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".lpmidi_ports.json")
+
+# Seconds to wait for a Launchpad to answer an identity request, they answer in a few milliseconds
+IDENTITY_TIMEOUT = 0.25
+
+# What each midi output port said it was, by port name, (profile, firmware version) or None if it didn't answer.
+# Shared by every LPMidi so a port is only asked once, e.g. when get_all_pads() is called again
+identity_cache = {}
+
+
+def set_backend(backend):
+    """
+    Change where midi ports come from, e.g. midi_backend.MockMidiBackend() to run without a Launchpad
+    :param backend: an object with midi_out() and midi_in() methods
+    :return:
+    """
+    global default_backend
+    default_backend = backend
 
 
 class LPMidi(object):
     """
     Try and find a Launchpad MK2 or Mini on the list of Midi ports
+    The ports are looked through once, the first time anything is asked for, and the rtmidi objects used
+    to look are kept and handed to the first Launchpad opened rather than making new ones.
+    With a cache_file the ports found are saved, and next time we only check the list of ports is the same
+    rather than looking through every port, which is most of the start up time.
+    The port names only say which ports to look at. Each one is sent a midi identity request and the reply
+    says which model it really is and what firmware it runs, the name is only used if it doesn't answer
     """
 
-    def __init__(self):
-        if platform.system() =="Darwin":
-            self.launchpads = ['Launchpad Mini MK3 LPMiniMK3 MIDI', 'MK2', 'Launchpad MK3', 'Launchpad Pro']
-        else:
-            self.launchpads = ['(LPMiniMK3', 'MK2',  'Launchpad MK3', 'Launchpad Pro']
+    def __init__(self, backend=None, cache_file=None, identify_timeout=IDENTITY_TIMEOUT):
+        """
+        :param backend: where to get midi ports from, defaults to real hardware via rtmidi
+        :param cache_file: JSON file to keep the ports found in, e.g. PORT_CACHE_FILE, None to always look
+        :param identify_timeout: seconds to wait for an identity reply, None to go by the port names alone
+        """
+        self.backend = backend if backend is not None else default_backend
+        import platform
+        self.system = platform.system()
+        self.cache_file = cache_file
+        # Every port name pattern we know, see device_profiles.PROFILES
+        self.launchpads = [pattern for profile in device_profiles.PROFILES
+                           for pattern in profile.patterns(self.system)]
         self.midi_out_port = None
         self.out_port_num = None
         self.midi_in_port = None
         self.in_port_num = None
         self.name = None
+        self.profile = None
+        self.midi_out = None  # The rtmidi objects used to look at the ports, see take_handles()
+        self.midi_in = None
+        self.found = None  # (profile, name, out port, in port) for each Launchpad, once scan() has run
+        self.used_cache = False
+        self.identify_timeout = identify_timeout
+        self.firmware = {}  # Firmware version by output port number, for the Launchpads that answered
+
+    def scan(self):
+        """
+        Look through the midi ports, only the first time it is called
+        :return: list of (profile, name that matched, output port number, input port number or None)
+        """
+        if self.found is not None:
+            return self.found
+        self.midi_out = self.backend.midi_out()
+        self.midi_in = self.backend.midi_in()
+        if self.cache_file is not None and self.load_cache():
+            self.used_cache = True
+            return self.found
+        out_ports = self.midi_out.get_ports()
+        in_ports = self.midi_in.get_ports()
+        inputs = [(port_num, device_profiles.find_profile(port, self.system)) for port_num, port in enumerate(in_ports)]
+        self.found = []
+        for out_port_num, port in enumerate(out_ports):
+            profile, pad_name = device_profiles.find_profile(port, self.system)
+            if profile is None:
+                continue
+            in_port_num = None
+            for i, (port_num, (in_profile, in_name)) in enumerate(inputs):
+                if in_profile is profile and in_name == pad_name:
+                    in_port_num = port_num
+                    del inputs[i]
+                    break
+            identity = self.identify(port, out_port_num, in_port_num)
+            if identity is not None:
+                profile, self.firmware[out_port_num] = identity
+            self.found.append((profile, pad_name, out_port_num, in_port_num))
+        if self.cache_file is not None and self.found:
+            self.save_cache()
+        return self.found
+
+    def identify(self, port_name, out_port_num, in_port_num):
+        """
+        Ask the Launchpad on a port what it is, unless the port has been asked already
+        :param port_name: the output port's name, what the answer is remembered by
+        :param out_port_num:
+        :param in_port_num: None if there is no input port to hear the answer on
+        :return: (profile, firmware version) or None if it didn't answer or isn't a Launchpad we know
+        """
+        if port_name in identity_cache:
+            return identity_cache[port_name]
+        if in_port_num is None or self.identify_timeout is None:
+            return None
+        reply = self.identity_request(out_port_num, in_port_num)
+        identity = None
+        if reply is not None:
+            profile, firmware = device_profiles.find_profile_by_identity(reply)
+            if profile is not None:
+                identity = profile, firmware
+        identity_cache[port_name] = identity
+        return identity
+
+    def identity_request(self, out_port_num, in_port_num):
+        """
+        Send an identity request and wait for the reply. The ports are opened on the rtmidi objects scan()
+        uses and closed again afterwards, so the first Launchpad can still open them
+        :return: the reply, a list of bytes, or None if nothing answered in time
+        """
+        self.midi_out.open_port(out_port_num)
+        self.midi_in.open_port(in_port_num)
+        try:
+            # rtmidi throws sysex away unless told not to
+            self.midi_in.ignore_types(sysex=False)
+            while self.midi_in.get_message() is not None:
+                pass  # Anything already waiting, e.g. a button press
+            self.midi_out.send_message(device_profiles.IDENTITY_REQUEST)
+            deadline = time.perf_counter() + self.identify_timeout
+            while time.perf_counter() < deadline:
+                message = self.midi_in.get_message()
+                if message is None:
+                    time.sleep(0.001)
+                elif device_profiles.parse_identity(message[0]) is not None:
+                    return message[0]
+            return None
+        finally:
+            self.midi_in.ignore_types()
+            self.midi_in.close_port()
+            self.midi_out.close_port()
+
+    def load_cache(self):
+        """
+        Use the ports saved last time, if the list of ports hasn't changed since. A Launchpad plugged in
+        after the cache was saved adds a port, so that means looking through them all again
+        :return: True if the cache was used
+        """
+        try:
+            import json
+            with open(self.cache_file) as cache:
+                saved = json.load(cache)
+            if saved.get('system') != self.system:
+                return False
+            if saved.get('out_ports') != self.midi_out.get_ports() or saved.get('in_ports') != self.midi_in.get_ports():
+                return False
+            found = []
+            firmware = {}
+            for entry in saved['launchpads']:
+                if self.midi_out.get_port_name(entry['out_port']) != entry['out_name']:
+                    return False
+                in_port = entry['in_port']
+                if in_port is not None and self.midi_in.get_port_name(in_port) != entry['in_name']:
+                    return False
+                found.append((device_profiles.get_profile(entry['profile']), entry['name'], entry['out_port'],
+                              in_port))
+                if entry.get('firmware') is not None:
+                    firmware[entry['out_port']] = tuple(entry['firmware'])
+        except (OSError, ValueError, KeyError, TypeError):
+            # No cache yet, or one we can't read, look through the ports instead
+            return False
+        if not found:
+            return False
+        self.found = found
+        self.firmware = firmware
+        return True
+
+    def save_cache(self):
+        import json
+        launchpads = [{'profile': profile.key, 'name': name,
+                       'out_port': out_port, 'out_name': self.midi_out.get_port_name(out_port),
+                       'in_port': in_port,
+                       'in_name': self.midi_in.get_port_name(in_port) if in_port is not None else None,
+                       'firmware': self.firmware.get(out_port)}
+                      for profile, name, out_port, in_port in self.found]
+        try:
+            with open(self.cache_file, 'w') as cache:
+                json.dump({'system': self.system, 'launchpads': launchpads, 'out_ports': self.midi_out.get_ports(),
+                           'in_ports': self.midi_in.get_ports()}, cache, indent=2)
+        except OSError as error:
+            # Not being able to save the cache only makes the next start slower
+            print(f"Couldn't save the midi port cache {self.cache_file}: {error}")
+
+    def take_handles(self):
+        """
+        The rtmidi objects used by scan(), for the first Launchpad to open its ports on. Later calls get None,
+        as each rtmidi object can only open one port
+        :return: (midi out, midi in)
+        """
+        handles = self.midi_out, self.midi_in
+        self.midi_out = None
+        self.midi_in = None
+        return handles
 
     def find_connected_launchpad(self):
         """
-        TODO - Not yet fully working for MiniMk3
         First we have to check if there are any Launchpads connected.
         Only Launchpads in the list self.launchpads will be detected
-        Currently only the first launchpad detected will be used
+        Currently only the first launchpad detected will be used, see find_all_launchpads() for the rest
 
         :raises: IOError if we can't find a suitable launchpad
         :return:
         """
-        # TODO - Allow for multiple devices
-        # Start by getting a list of the Midi ports that rtmidi knows about
-        midi_out = rtmidi.MidiOut()
-        out_ports = midi_out.get_ports()
-        midi_in = rtmidi.MidiIn()
-        in_ports = midi_in.get_ports()
-
-        # Use a list comprehension to scan the list of launchpad names in the list of output ports
-        connected_pad = [port for port in out_ports if any(pad in port for pad in self.launchpads)]
-        if connected_pad:
-            self.name = connected_pad[0]
-            self.out_port_num = out_ports.index(connected_pad[0])
-            print(f"Found a {self.name} connected to output port {self.out_port_num}")
-            print("Now checking midi input ports...")
-            # We should always have a launchpad connected to midi in and out, it should be the same one
-            # but it is possible to have a different device on input and output, so although we
-            # could simply scan for the device name we just found, explicitly check again.
-            pad_input = [s for s in in_ports if any(pad in s for pad in self.launchpads)]
-            if pad_input:
-                self.in_port_num = in_ports.index(pad_input[0])
-                print(f"Found a {pad_input[0]} connected to input port {self.in_port_num}")
-            del midi_out
-        else:
+        if self.find_launchpad_out_port() is None:
             # No launchpad found
             print("I couldn't find any attached launchpads. Raising IOError")
-            del midi_out
             raise IOError
+        print(f"Found a {self.profile.name} ({self.name}) connected to output port {self.out_port_num}")
+        if self.find_launchpad_in_port() is not None:
+            print(f"Found a {self.name} connected to input port {self.in_port_num}")
         return self.out_port_num
 
     def find_launchpad_out_port(self):
         """
         Try and find a launchpad, if so set the midi out port and name
-        Although a list comp might seem obvious, there are issues in that Launchpads have several Midi ports
-        Need to figure out the canonical midi port to use, it appears to be different for MK3 / MK2  /Pro
+        Launchpads have several Midi ports, the patterns in device_profiles pick the one to use
         :return: The output port number the launchpad is connected to
         """
-        # BUGBUG - If a LP Pro is connected, this code chooses the wrong port
-        out_ports = rtmidi.MidiOut()
-        ports = out_ports.get_ports()
-        port_num = None
-        found = False
-        for (port_num, port) in enumerate(ports):
-            for pad_name in self.launchpads:
-                if pad_name in port:
-                    found = True
-                    self.name = pad_name
-                    break
-            if found:
-                break
-
-        if found:
-            self.out_port_num = port_num
-        else:
-            port_num = None
-        # Clean up as the Launchpad is going to need the midi port
-        del out_ports
-
-        return port_num
+        found = self.scan()
+        if not found:
+            return None
+        self.profile, self.name, self.out_port_num, _ = found[0]
+        return self.out_port_num
 
     def find_launchpad_in_port(self):
         """
-        Try and find the Launchpad midi input launchpad
+        Try and find the Launchpad midi input, the one that goes with the output port
         :return:
         """
-        in_ports = rtmidi.MidiIn()
-        ports = in_ports.get_ports()
-        port_num = None
-        found = False
-        for (port_num, port) in enumerate(ports):
-            for pad_name in self.launchpads:
-                if pad_name in port:
-                    found = True
+        found = self.scan()
+        if not found:
+            return None
+        self.in_port_num = found[0][3]
+        return self.in_port_num
 
-                    break
-            if found:
-                break
-        if found:
-            self.in_port_num = port_num
-
-        else:
-            port_num = None
-        # Clean up as the Launchpad is going to need the midi port
-        del in_ports
-        return port_num
+    def find_all_launchpads(self):
+        """
+        Find every Launchpad we support, not just the first. Each output port is paired with the first
+        input port not already taken that matches the same profile, so two of the same model pair up in order
+        :return: list of (profile, name that matched, output port number, input port number or None)
+        """
+        return list(self.scan())
 
 
 class LaunchpadBase(object):
@@ -132,8 +330,24 @@ class LaunchpadBase(object):
     Where devices differ, such as different button numbers or amount of colours supported
     Then the child objects will override the parent methods where necessary
     """
-
-    def __init__(self, name, out_port_num, in_port_num):
+    profile_key = None  # Which device_profiles entry the child class is for
+
+    def __init__(self, name, out_port_num, in_port_num, backend=None, profile=None):
+        """
+        :param name: the midi port name, or the part of it that was matched
+        :param out_port_num:
+        :param in_port_num:
+        :param backend: where to get midi ports from, defaults to real hardware via rtmidi
+        :param profile: a device_profiles.DeviceProfile, defaults to the one for this class
+        """
+        self.backend = backend if backend is not None else default_backend
+        if profile is None:
+            profile = device_profiles.get_profile(self.profile_key)
+        self.profile = profile
+        # Lookup tables from the profile, note_table[y][x] is the (status, note) for the LED at x, y
+        # and button_table maps the (status, note) of a button press back to x, y
+        self.note_table = profile.note_table
+        self.button_table = profile.button_table
         self.out_port_num = out_port_num
         self.in_port_num = in_port_num
         self.lp_midi_out_port = None
@@ -146,12 +360,16 @@ class LaunchpadBase(object):
         self.name = name
         self.draw_colour = None
         self.frame_buffer = [0] * 8
+        self.draw_cache = draw_cache  # Set to None to stop draw_char using the cache
         # Make a frame buffer for our painter code so we can save our drawings, up to 10 row of 10 pads for Pro
         self.painter_frame = [[0 for _ in range(9)] for _ in range(9)]  # Somewhere to store our painter picture
         self.SCROLL_NONE = 0
         self.SCROLL_LEFT = -1
         self.SCROLL_RIGHT = 1
-        self.delay_time = 0.1
+        self.delay_time = 0.1  # Seconds per frame when scrolling
+        self.drop_frames = False  # Skip drawing scroll frames if we fall behind, rather than running slow
+        self.frame_clock = None  # The clock used by the last scroll, for its stats()
+        self.clock_factory = FrameClock  # Makes the scroll clocks, baked.bake() swaps in one that doesn't wait
         self.set_colour_list()
         self.callback_count = 0
         self.last_x = None
@@ -159,6 +377,37 @@ class LaunchpadBase(object):
         self.max_x = 8  # Mini / MK2 have 9 leds, 0-8, Launchpad Pro has 10, 0-9
         self.painter_palette = [55, 55, 55], [55, 0, 0], [0, 55, 0], \
                                [0, 0, 55], [55, 55, 0], [0, 55, 55], [44, 33, 12], [0, 0, 0]
+        # Retained mode LED state. led_buffer is what we want each pad to show, led_shown is what we last
+        # sent to the Launchpad (None if we don't know). Each entry is a palette colour number or an (r, g, b) tuple
+        self.grid_size = profile.grid_size  # 9, the Pro has 10 rows of 10
+        # Multi LED sysex messages, for the models that support them. Each RGB entry is led, red, green, blue
+        # and each palette entry is led, colour. If both headers are the same the entries share a message
+        self.rgb_sysex_header = profile.rgb_sysex_header
+        self.rgb_sysex_chunk = profile.rgb_sysex_chunk  # Most LEDs we can safely put in one message
+        self.palette_sysex_header = profile.palette_sysex_header
+        self.palette_sysex_chunk = profile.palette_sysex_chunk
+        # Palette mode sends RGB colours given to blit_rgb() and set_leds() as the nearest palette colour,
+        # a lot fewer bytes per pad if the colours don't need to be exact. Ignored by models without a palette
+        self.palette_mode = False
+        self.palette_quantizer = palette.get_quantizer(profile.palette) if profile.palette else None
+        self.auto_flush = True  # Set to False to collect changes and only send them when flush() is called
+        self.led_buffer = None
+        self.led_shown = None
+        self.dirty_leds = {}
+        self.led_lock = threading.RLock()  # Held while the LED buffer is being changed or flushed
+        self.send_lock = threading.Lock()
+        self.dirty_since = 0  # When the oldest change waiting to be sent was made
+        self.write_count = 0  # Counters to see how much work flush() is saving
+        self.coalesced_count = 0
+        self.dropped_count = 0
+        # Set by a hotplug.HotplugWatcher. While the Launchpad is unplugged nothing is sent, drawing carries on
+        # in the LED buffer and is all sent when it comes back
+        self.watcher = None
+        self.connected = True
+        self.out_port_name = None  # Full port names, so the watcher can find the Launchpad again
+        self.in_port_name = None
+        self.firmware_version = None  # From the identity reply, e.g. (0, 1, 5, 7), None if it didn't answer
+        self.clear_led_state()
 
     def __delete__(self):
         self.close()
@@ -166,18 +415,353 @@ class LaunchpadBase(object):
     def clear_frame_buffer(self):
         self.frame_buffer = [0] * 8
 
+    def new_frame_clock(self):
+        """
+        Make a clock that paces frames at self.delay_time seconds, from now
+        :return: a FrameClock
+        """
+        self.frame_clock = self.clock_factory(self.delay_time, self.drop_frames)
+        self.frame_clock.start()
+        return self.frame_clock
+
+    def clear_led_state(self):
+        """
+        Forget everything we know about what the pads are showing, e.g. after the Launchpad has been power cycled
+        :return:
+        """
+        with self.led_lock:
+            self.led_buffer = [[0] * self.grid_size for _ in range(self.grid_size)]
+            self.led_shown = [[None] * self.grid_size for _ in range(self.grid_size)]
+            self.dirty_leds = {}
+
+    def fill_led_state(self, value):
+        """
+        Record that every pad has been set to the same value by one of the "all pads" messages
+        :param value: a palette colour number or an (r, g, b) tuple
+        :return:
+        """
+        if value == (0, 0, 0):
+            value = 0
+        with self.led_lock:
+            self.led_buffer = [[value] * self.grid_size for _ in range(self.grid_size)]
+            self.led_shown = [[value] * self.grid_size for _ in range(self.grid_size)]
+            self.dirty_leds = {}
+
+    def resend_leds(self):
+        """
+        Send every pad again from the LED buffer, e.g. when the Launchpad has been plugged back in
+        :return: the number of pads sent
+        """
+        with self.led_lock:
+            self.led_shown = [[None] * self.grid_size for _ in range(self.grid_size)]
+            self.dirty_leds = {xy: True for xy in self.profile.pads}
+            self.dirty_since = time.perf_counter()
+            return self.flush()
+
+    def store_led(self, x, y, value):
+        """
+        Record the value we want a pad to show. Nothing is sent until flush() unless auto_flush is set
+        Coordinates must already have been checked by the caller
+        :param x:
+        :param y:
+        :param value: a palette colour number or an (r, g, b) tuple
+        :return:
+        """
+        if value == (0, 0, 0):
+            # Black is black whichever way it is sent, and the palette message is the shorter one
+            value = 0
+        with self.led_lock:
+            self.write_count += 1
+            self.led_buffer[y][x] = value
+            if value != self.led_shown[y][x]:
+                if (x, y) in self.dirty_leds:
+                    # Latest value wins, the earlier write is never sent
+                    self.coalesced_count += 1
+                else:
+                    if not self.dirty_leds:
+                        self.dirty_since = time.perf_counter()
+                    self.dirty_leds[(x, y)] = True
+            elif self.dirty_leds.pop((x, y), None):
+                # A later write has put the pad back to what the Launchpad is already showing
+                self.coalesced_count += 1
+            else:
+                self.dropped_count += 1
+            if self.auto_flush:
+                self.flush()
+
+    def store_led_by_message(self, status, note, value):
+        """
+        Record the value for the LED a note or controller message would set, for the set_led_by_number() methods,
+        so it goes through the LED buffer like everything else. Numbers with no LED are ignored
+        :param status: 144 for a note or 176 for a controller
+        :param note: the LED number
+        :param value: a palette colour number, or the LED value on the original Mini
+        :return:
+        """
+        xy = self.profile.button_table.get((status, note))
+        if xy is not None:
+            self.store_led(xy[0], xy[1], value)
+
+    def flush(self):
+        """
+        Send only the pads whose value differs from what the Launchpad is already showing
+        :return: the number of pads sent
+        """
+        with self.led_lock:
+            if not self.dirty_leds:
+                return 0
+            changes = []
+            for x, y in self.dirty_leds:
+                value = self.led_buffer[y][x]
+                changes.append((x, y, value))
+                self.led_shown[y][x] = value
+            self.dirty_leds = {}
+            messages = self.encode_leds(changes)
+            fill = self.encode_fill_frame(len(changes), message_bytes(messages))
+            if fill is not None:
+                # Every pad was set by the fill, the ones that aren't the fill colour are in the overrides
+                messages = fill
+                for x, y in self.profile.pads:
+                    self.led_shown[y][x] = self.led_buffer[y][x]
+            for msg in messages:
+                self.send_message(msg)
+            return len(changes)
+
+    def send_message(self, msg):
+        """
+        Send a midi message to the Launchpad. Everything sent goes through here so that
+        drawing from the midi input callback and the main thread at the same time is safe
+        :param msg: list of bytes
+        :return:
+        """
+        with self.send_lock:
+            if not self.connected:
+                return
+            try:
+                self.lp_midi_out_port.send_message(msg)
+            except Exception:
+                if self.watcher is None:
+                    raise
+                # Most likely unplugged, the watcher will reopen the port and send everything again
+                self.connected = False
+
+    @contextmanager
+    def batch_updates(self):
+        """
+        Collect all the pad changes made inside a with block and send them in one go at the end
+        e.g.
+        with pad.batch_updates():
+            pad.set_led_xy(0, 1, 63, 0, 0)
+            pad.set_led_xy(1, 1, 0, 63, 0)
+        An OutputWriter won't send a half drawn batch, it waits until the with block has finished
+        :return:
+        """
+        with self.led_lock:
+            auto_flush = self.auto_flush
+            self.auto_flush = False
+            try:
+                yield self
+            finally:
+                self.auto_flush = auto_flush
+            if auto_flush:
+                self.flush()
+
+    def encode_led(self, x, y, value):
+        """
+        Build the midi message that sets a single pad, a three byte note or controller for a palette colour
+        or a sysex for RGB
+        :param x:
+        :param y:
+        :param value: a palette colour number or an (r, g, b) tuple
+        :return: a midi message, or None if there is no pad at x, y
+        """
+        entry = self.note_table[y][x]
+        if entry is None:
+            return None
+        if isinstance(value, tuple):
+            if self.rgb_sysex_header is None:
+                return None
+            # needs a sysex message , so wrap with byte_count 240 and 247
+            return self.rgb_sysex_header + self.encode_sysex_entry(x, y, value) + [247]
+        status, led = entry
+        return [status, led, value]
+
+    def encode_sysex_entry(self, x, y, value):
+        """
+        The bytes for one LED inside a multi LED sysex message
+        :param x:
+        :param y:
+        :param value: a palette colour number or an (r, g, b) tuple
+        :return: a list of bytes
+        """
+        led = self.note_table[y][x][1]
+        if isinstance(value, tuple):
+            red, green, blue = value
+            return [led, red, green, blue]
+        return [led, value]
+
+    def encode_leds(self, changes):
+        """
+        Build the midi messages for a list of pad changes. The changes are packed into as few sysex
+        messages as the model allows, anything the model has no multi LED message for is sent one pad at a time
+        :param changes: list of (x, y, value) tuples
+        :return: a list of midi messages
+        """
+        messages = []
+        # Group the changes by the sysex message that can carry them
+        groups = {}
+        for x, y, value in changes:
+            if isinstance(value, tuple):
+                header, chunk = self.rgb_sysex_header, self.rgb_sysex_chunk
+            else:
+                header, chunk = self.palette_sysex_header, self.palette_sysex_chunk
+            if not header:
+                msg = self.encode_led(x, y, value)
+                if msg is not None:
+                    messages.append(msg)
+                continue
+            key = tuple(header)
+            if key not in groups:
+                groups[key] = (chunk, [])
+            groups[key][1].append((x, y, value))
+
+        for header, (chunk, group) in groups.items():
+            entries = [self.encode_sysex_entry(x, y, value) for x, y, value in group]
+            # A multi LED message costs its header and end byte, so for a few palette colours the three byte
+            # notes can be shorter. Ties go to the sysex, it is fewer messages
+            packed_bytes = sum(len(entry) for entry in entries) + \
+                -(-len(entries) // chunk) * (len(header) + 1)
+            single_bytes = 0
+            for (x, y, value), entry in zip(group, entries):
+                single_bytes += len(self.rgb_sysex_header) + len(entry) + 1 if isinstance(value, tuple) else 3
+            if single_bytes < packed_bytes:
+                for x, y, value in group:
+                    messages.append(self.encode_led(x, y, value))
+                continue
+            messages += pack_sysex(header, entries, chunk)
+        return messages
+
+    def encode_fill(self, value):
+        """
+        The single message that sets every LED to the same colour, for the models that have one
+        :param value: a palette colour number or an (r, g, b) tuple
+        :return: a midi message, or None if the model can't fill with that value
+        """
+        return None
+
+    def encode_fill_frame(self, changed, budget):
+        """
+        When most of the pads are the same colour it can be shorter to fill every LED with that colour and
+        then send the pads that are different. Works out the cost of filling with the two commonest colours
+        :param changed: how many pads are being sent, a fill is only tried if it is at least a quarter of them
+        :param budget: bytes the changes take without a fill
+        :return: list of midi messages, the fill and then the overrides, or None if a fill isn't shorter
+        """
+        pads = self.profile.pads
+        if changed * 4 < len(pads):
+            return None
+        counts = {}
+        for x, y in pads:
+            value = self.led_buffer[y][x]
+            counts[value] = counts.get(value, 0) + 1
+        best = None
+        for value in sorted(counts, key=counts.get, reverse=True)[:2]:
+            fill = self.encode_fill(value)
+            if fill is None or len(fill) >= budget:
+                continue
+            messages = [fill] + self.encode_leds([(x, y, self.led_buffer[y][x]) for x, y in pads
+                                                  if self.led_buffer[y][x] != value])
+            cost = message_bytes(messages)
+            if cost < budget:
+                best, budget = messages, cost
+        return best
+
+    def fill_leds(self, colour):
+        """
+        Set every pad to the same colour, sent whichever way is shortest for the model
+        :param colour: a palette number, a name from self.colours or an (r, g, b) tuple of 0 - 63 values
+        :return:
+        """
+        self.set_leds((x, y, colour) for x, y in self.profile.pads)
+
+    def set_leds(self, updates):
+        """
+        Set a batch of pads in one go, the changes are sent in as few messages as the model allows
+        e.g. pad.set_leds([(0, 1, 'red'), (1, 1, 17), (2, 1, (63, 0, 32))])
+        :param updates: iterable of (x, y, colour), where colour is a palette number, a name from self.colours
+        or an (r, g, b) tuple of 0 - 63 values. Pads that don't exist are ignored
+        :return:
+        """
+        with self.batch_updates():
+            for x, y, colour in updates:
+                if not self.is_pad(x, y):
+                    continue
+                self.store_led(x, y, self.led_value(colour))
+
+    def led_value(self, colour):
+        """
+        What set_leds() stores in the LED buffer for a colour, to work it out once for a lot of pads
+        :param colour: a palette number, a name from self.colours or an (r, g, b) tuple of 0 - 63 values
+        :return: a value for store_led()
+        """
+        if isinstance(colour, (tuple, list)):
+            red, green, blue = colour
+            return self.rgb_value(min(max(int(red), 0), 63), min(max(int(green), 0), 63),
+                                  min(max(int(blue), 0), 63))
+        if isinstance(colour, str):
+            return self.colour_to_number(colour)
+        return min(max(int(colour), 0), 127)
+
+    def is_pad(self, x, y):
+        """
+        Check there is an LED at x, y
+        :param x:
+        :param y:
+        :return: True if there is
+        """
+        return 0 <= x < self.grid_size and 0 <= y < self.grid_size and self.note_table[y][x] is not None
+
+    def rgb_value(self, red, green, blue):
+        """
+        The value stored in the LED buffer for an RGB colour, models without RGB LEDs override this
+        :param red: 0 - 63
+        :param green: 0 - 63
+        :param blue: 0 - 63
+        :return: (r, g, b), or the nearest palette number in palette mode
+        """
+        if self.palette_mode and self.palette_quantizer is not None:
+            return self.palette_quantizer.quantize(red, green, blue)
+        return red, green, blue
+
+    def blit_rgb(self, frame, x_offset=0, y_offset=None):
+        """
+        Draw a whole frame of RGB data in one go, using as few midi messages as the model allows.
+        Only pads that have changed since the last frame are sent
+        :param frame: a 9*9 (10*10 on the Pro) or 8*8 frame of red, green, blue values 0 - 63.
+        Either a flat list, bytes or memoryview of channel values, a list of rows of (r, g, b) or
+        a NumPy uint8 array. Values above 63 are limited to 63
+        :param x_offset: where to draw the left hand column
+        :param y_offset: where to draw the top row, defaults to row 1 for an 8*8 frame, the square pads
+        :return:
+        """
+        data, width = rgb_frame_bytes(frame)
+        if y_offset is None:
+            y_offset = 1 if width == 8 else 0
+        i = 0
+        with self.batch_updates():
+            for y in range(y_offset, y_offset + width):
+                for x in range(x_offset, x_offset + width):
+                    if self.is_pad(x, y):
+                        self.store_led(x, y, self.rgb_value(data[i], data[i + 1], data[i + 2]))
+                    i += 3
+
     def set_colour_list(self):
         """
-        The MK2 has RGB, but the Mini only has RG, so more limited in what it can display
+        The MK2 has RGB, but the Mini only has RG, so more limited in what it can display.
+        The colour names come from the device profile, copied so they can be changed for this pad only
         :return:
         """
-        name = self.name.lower()
-        if "minimk3" in name or "mk2" in name or "pro" in name or "launchpad mk3" in name:
-            self.colours = {'black': 0, 'off': 0, 'white': 119, 'red': 5, 'green': 17, 'blue': 44,
-                            'orange': 84, 'purple': 55, 'brown': 105, 'lime': 75,
-                            'pink': 56, 'yellow': 108, 'grey': 117}
-        elif "mini" in self.name.lower():
-            self.colours = {'black': 0, 'off': 0, 'red': 3, 'yellow': 49, 'green': 48, 'orange': 51}
+        self.colours = dict(self.profile.colours)
 
     def colour_to_number(self, colour):
         colour = colour.lower()
@@ -187,16 +771,21 @@ class LaunchpadBase(object):
             print(f"I don't know how to show {colour} yet, please update set_colour() in  pylaunchpad.py")
             return 0
 
-    def open(self):
+    def open(self, midi_out=None, midi_in=None):
         """
         Try and open the midi port connected to the Launchpad
+        :param midi_out: an rtmidi MidiOut to open the port on, e.g. from LPMidi.take_handles(), or None for a new one
+        :param midi_in: an rtmidi MidiIn, likewise
         :return:
         """
         # TODO - Wrap this in a try catch
-        out_ports = rtmidi.MidiOut()
+        out_ports = midi_out if midi_out is not None else self.backend.midi_out()
         self.lp_midi_out_port = out_ports.open_port(self.out_port_num)
-        self.in_ports = rtmidi.MidiIn()
+        self.out_port_name = out_ports.get_port_name(self.out_port_num)
+        self.in_ports = midi_in if midi_in is not None else self.backend.midi_in()
         self.lp_midi_in_port = self.in_ports.open_port(self.in_port_num)
+        self.in_port_name = self.in_ports.get_port_name(self.in_port_num)
+        self.connected = True
 
     def close(self):
         # Release the midi port for other applications
@@ -228,11 +817,25 @@ class LaunchpadBase(object):
 
     def decode_button_message(self, msg):
         """
-        To be implemented by child classes, take a midi message and return the X and Y coordinates
+        Translate the midi message into X/Y coordinates and a button state
         :param msg:
-        :return: an X and a Y coordinate
+        :return: an X and a Y coordinate, 0, 0 if the message isn't from a button
         """
-        return 0, 0
+        x, y = self.button_xy(msg) or (0, 0)
+        pressed = len(msg) > 2 and msg[0] != 128 and msg[2] > 0
+        print(f"msg {msg[0]}, button {msg[1] if len(msg) > 1 else None}")
+        print(f"X: {x} Y: {y} Pressed = {pressed}")
+        return x, y
+
+    def button_xy(self, msg):
+        """
+        The same as decode_button_message but quiet, so it is safe to call for every message in a midi callback
+        :param msg: list of midi bytes
+        :return: an X and Y coordinate, or None if the message isn't from a button
+        """
+        if len(msg) < 3:
+            return None
+        return self.button_table.get((msg[0], msg[1]))
 
     def midi_in_cb(self, msg, data):
         """
@@ -252,19 +855,20 @@ class LaunchpadBase(object):
             x, y = self.decode_button_message(msg)
 
             number = str(x)
-            self.draw_char(nl.letters[number])
+            self.draw_char(get_font()[number])
             time.sleep(.3)
-            self.draw_char(nl.letters['.'])
+            self.draw_char(get_font()['.'])
             time.sleep(.3)
             number = str(y)
-            self.draw_char(nl.letters[number])
+            self.draw_char(get_font()[number])
             time.sleep(.3)
 
     def setup_painter_colours(self):
         self.reset()
-        for x, colour in enumerate(self.painter_palette):
-            r, g, b = colour
-            self.set_led_xy(x, 0, r, g, b)
+        with self.batch_updates():
+            for x, colour in enumerate(self.painter_palette):
+                r, g, b = colour
+                self.set_led_xy(x, 0, r, g, b)
         self.last_y = 0
         self.last_x = 0
         self.red, self.green, self.blue = self.painter_palette[0]
@@ -277,6 +881,7 @@ class LaunchpadBase(object):
             return
         state = msg[2]
         print(state)
+        import random
         colour = "off"
         while colour == "off" or colour == "black":  # We don't want an "off" colour
             colour = random.choice(list(self.colours.keys()))
@@ -308,9 +913,6 @@ class LaunchpadBase(object):
             x, y = self.decode_button_message(msg)
 
             if y == 0 and x < 8:
-                # Special case for PRO  as the top row starts at 1 as far as it is concerned:-(
-                if "Launchpad Pro" in self.name:
-                    x = x - 1
                 self.red, self.green, self.blue = self.painter_palette[x]
             elif x != 8 or y != 8:
                 self.set_led_xy(x, y, self.red, self.green, self.blue)
@@ -327,13 +929,14 @@ class LaunchpadBase(object):
         if ord(char) < 32 or ord(char) > 163:
             print("Sorry I don't know how to draw that character.")
             return
-        char_data = nl.letters[char]
+        char_data = get_font()[char]
         self.draw_char(char_data, x_start, y_start, columns, clear)
 
     def draw_char(self, char_data, x_start=0, y_start=1, columns=8, clear=True):
         """
         Draw and 8*8 character. The data is not checked, it must consist of 8 numbers between 0 & 255
         The character is drawn from row 1, the start of the square buttons
+        Drawing the same character in the same colour and place again uses the messages kept in self.draw_cache
         :param y_start:
         :param char_data: list of  byte_count of data, one per row
         :param x_start: X coordinate
@@ -341,35 +944,89 @@ class LaunchpadBase(object):
         :param columns: how many columns of the character to draw
         :return:
         """
-        # TODO - Consider using the faster sysex message with a series of byte_count
-        # Work our way from top left down to bottom right
-        for y in range(0, len(char_data)):
-            data = int(char_data[y])
-            if clear and x_start > 0:
-                data = data >> x_start
-                offset = 0
-            else:
-                offset = x_start
+        cache = self.draw_cache
+        if cache is None:
+            self.render_char(char_data, x_start, y_start, columns, clear)
+            return
+        try:
+            key = (self.profile.key, tuple(char_data), self.draw_colour, x_start, y_start, columns, clear)
+            compiled = cache.get(key)
+        except TypeError:
+            # Something in the key can't be hashed, e.g. a list as the colour
+            self.render_char(char_data, x_start, y_start, columns, clear)
+            return
+        if compiled is not None:
+            self.apply_compiled(compiled)
+            return
+        with self.led_lock:
+            pads = self.render_char(char_data, x_start, y_start, columns, clear)
+            values = tuple(self.led_buffer[y][x] for x, y in pads)
+        cache.put(key, CompiledDraw(pads, values))
+
+    def render_char(self, char_data, x_start=0, y_start=1, columns=8, clear=True):
+        """
+        The work behind draw_char, without the cache
+        :return: list of (x, y) of the pads that were set
+        """
+        pads = []
+        # Work our way from top left down to bottom right, only the pads that change are sent at the end
+        with self.batch_updates():
+            for y in range(0, len(char_data)):
+                data = int(char_data[y])
+                if clear and x_start > 0:
+                    data = data >> x_start
+                    offset = 0
+                else:
+                    offset = x_start
+
+                for x in range(columns - offset):
+                    if not self.is_pad(x + offset, y + y_start):
+                        continue
+                    pads.append((x + offset, y + y_start))
+                    # We have a decimal number that must be translated to binary.
+                    # Take our data and use a "AND" mask comparing a single bit at each of the 8 bits
+                    mask = 128 >> x
+                    if data & mask:
+                        self.set_led_xy_by_colour(x + offset, y + y_start, self.draw_colour)
+                    else:
+                        self.set_led_xy_by_colour(x + offset, y + y_start, 'off')
+        return pads
+
+    def apply_compiled(self, compiled):
+        """
+        Set the pads to a draw_char result from the cache. If nothing else is waiting to be sent the
+        messages that take the grid from what it shows now to the character are sent straight away
+        :param compiled: a message_cache.CompiledDraw
+        :return:
+        """
+        with self.led_lock:
+            if not self.auto_flush or self.dirty_leds:
+                # Part way through a batch, or an OutputWriter is sending, so join in with everything else
+                with self.batch_updates():
+                    for (x, y), value in zip(compiled.pads, compiled.values):
+                        self.store_led(x, y, value)
+                return
+            shown = tuple(self.led_shown[y][x] for x, y in compiled.pads)
+            messages, changed = compiled.messages_from(shown, self.encode_leds)
+            for (x, y), value in zip(compiled.pads, compiled.values):
+                self.led_buffer[y][x] = value
+                self.led_shown[y][x] = value
+            self.write_count += len(compiled.pads)
+            self.dropped_count += len(compiled.pads) - changed
+            for msg in messages:
+                self.send_message(msg)
 
-            for x in range(columns - offset):
+    def draw_row(self, row_data, row, erase_previous=False):
+        with self.batch_updates():
+            for x in range(0, 9):
                 # We have a decimal number that must be translated to binary.
                 # Take our data and use a "AND" mask comparing a single bit at each of the 8 bits
+                # Don't over write if bit is zero
                 mask = 128 >> x
-                if data & mask:
-                    self.set_led_xy_by_colour(x + offset, y + y_start, self.draw_colour)
-                else:
-                    self.set_led_xy_by_colour(x + offset, y + y_start, 'off')
-
-    def draw_row(self, row_data, row, erase_previous=False):
-        for x in range(0, 9):
-            # We have a decimal number that must be translated to binary.
-            # Take our data and use a "AND" mask comparing a single bit at each of the 8 bits
-            # Don't over write if bit is zero
-            mask = 128 >> x
-            if row_data & mask:
-                self.set_led_xy_by_colour(x, row, self.draw_colour)
-            if row == 0 and erase_previous:
-                self.set_led_xy_by_colour(x, row, 0)
+                if row_data & mask:
+                    self.set_led_xy_by_colour(x, row, self.draw_colour)
+                if row == 0 and erase_previous:
+                    self.set_led_xy_by_colour(x, row, 0)
 
     def set_led_xy(self, x, y, red, green, blue):
         pass
@@ -385,25 +1042,26 @@ class LaunchpadBase(object):
 
         pass
 
-    def scroll_on_right(self, char_data):
+    def scroll_on_right(self, char_data, clock=None):
         """
         Scroll a character from the left to the right of the launchpad
         :param char_data: 8 byte_count of bitmap data, 1 per row
+        :param clock: a FrameClock to keep several characters on the same schedule
         :return:
         """
+        if clock is None:
+            clock = self.new_frame_clock()
+        # Plain bitboard numbers in the loop, see bitboard.py, a Bitboard object per frame costs more than the shifts
+        char = Bitboard.from_rows(char_data).bits
+        frame = Bitboard.from_rows(self.frame_buffer).bits
+        draw = True
         for column in range(8):
-
-            for row in range(8):
-                bit_mask = 1 << column  # Start at LSB and shift left
-                # shift whatever is in the frame buffer along one column
-                self.frame_buffer[row] = self.frame_buffer[row] >> 1
-                new_data = char_data[row] & bit_mask
-                new_data = new_data << (7 - column)
-                row_data = new_data | self.frame_buffer[row]
-                self.frame_buffer[row] = row_data
-
-            self.draw_char(self.frame_buffer)
-            time.sleep(self.delay_time)
+            # Move whatever is showing along one column and bring on the character's columns from its right edge
+            frame = ((frame >> 1) & RIGHT_KEEP[1]) | ((char & COLUMNS[7 - column]) << (7 - column))
+            self.frame_buffer = Bitboard(frame).rows()
+            if draw:
+                self.draw_char(self.frame_buffer)
+            draw = clock.tick()
 
     def scroll_frames_right(self, frame_data):
         """
@@ -411,53 +1069,53 @@ class LaunchpadBase(object):
         :param frame_data: list of frames where each is 8 bytes of data, each byte one row of mono pixels
         :return:
         """
-        frame_count = len(frame_data)
+        frames = [Bitboard.from_rows(frame) for frame in frame_data]
+        frame_count = len(frames)
         current_frame = 0
+        clock = self.new_frame_clock()
+        draw = True
         for column in range(8):
-            char_data = frame_data[current_frame]
-            # as column goes up, we want 1 bit, 2 bits, 3 bits, 4 bits ....
-            for row in range(8):
-                # 2*column 0,2,4,8,16,32,64,128  + 1
-                bit_mask = (2 << column) - 1  # Start at LSB and shift left
-                new_data = char_data[row] & bit_mask
-                new_data = new_data << (7 - column)
-                self.frame_buffer[row] = new_data
-            self.draw_char(self.frame_buffer)
-            time.sleep(self.delay_time)
+            # As column goes up, 1, 2, 3 ... of the frame's right hand columns show on the left
+            self.frame_buffer = frames[current_frame].shift(column - 7, 0).rows()
+            if draw:
+                self.draw_char(self.frame_buffer)
+            draw = clock.tick()
 
             current_frame += 1
             if current_frame > frame_count - 1:
                 current_frame = 0
 
-        # Now scroll off, use the starting column parameter of draw_char...
+        # Now scroll off to the right
         for column in range(1, 8):
-            self.draw_char(frame_data[current_frame], column)
+            if draw:
+                self.draw_char(frames[current_frame].shift(column, 0))
             current_frame += 1
             if current_frame > frame_count - 1:
                 current_frame = 0
-            time.sleep(self.delay_time)
-        self.draw_char(nl.letters[' '])
+            draw = clock.tick()
+        self.draw_char(get_font()[' '])
         # Tidy up the frame buffer so it is empty
         self.clear_frame_buffer()
 
-    def scroll_on_left(self, char_data):
+    def scroll_on_left(self, char_data, clock=None):
         """
         Scroll a character from the right to the left of the launchpad
         :param char_data: 8 byte_count of bitmap data, 1 byte per row
+        :param clock: a FrameClock to keep several characters on the same schedule
         :return:
         """
-
+        if clock is None:
+            clock = self.new_frame_clock()
+        char = Bitboard.from_rows(char_data).bits
+        frame = Bitboard.from_rows(self.frame_buffer).bits
+        draw = True
         for column in range(8):
-            bit_mask = 128 >> column  # Start at MSB and shift right
-            for row in range(8):
-                self.frame_buffer[row] = self.frame_buffer[row] << 1
-                new_data = char_data[row] & bit_mask
-                new_data = new_data >> (7 - column)
-                row_data = new_data | self.frame_buffer[row]
-                self.frame_buffer[row] = row_data
-
-            self.draw_char(self.frame_buffer)
-            time.sleep(self.delay_time)
+            # Move whatever is showing back one column and bring on the character's columns from its left edge
+            frame = ((frame << 1) & LEFT_KEEP[1]) | ((char & COLUMNS[column]) >> (7 - column))
+            self.frame_buffer = Bitboard(frame).rows()
+            if draw:
+                self.draw_char(self.frame_buffer)
+            draw = clock.tick()
 
     def scroll_up(self, message):
         """
@@ -469,49 +1127,48 @@ class LaunchpadBase(object):
         message = " " + message + " "
         full_bitmap = []
         for char in message:
-            full_bitmap += nl.letters[char]  # Build an array with all of the data for all of the letters
+            full_bitmap += get_font()[char]  # Build an array with all of the data for all of the letters
             full_bitmap += [0]
+        clock = self.new_frame_clock()
+        draw = True
         for i in range(len(full_bitmap)):
-            self.draw_char(full_bitmap[i:i + 8])
-            time.sleep(self.delay_time)
+            if draw:
+                self.draw_char(full_bitmap[i:i + 8])
+            draw = clock.tick()
 
-    def scroll_message(self, message, direction=None, wide=False):
+    def scroll_message(self, message, direction=None, wide=False, proportional=True):
         """
         Scroll a series of characters from the left or the right
+        The whole message is laid out once by a TextStrip and each frame is a slice of it
         :param message: A series of characters to display
-        :param direction: From the left or right. If scrolling to the right the message is reversed
+        :param direction: From the left or right. If scrolling to the right the message comes on last character first
         :param bool wide: Set to True to use a Wide font
+        :param bool proportional: Set to False to give every character 8 columns, as scroll_on_left does
         :return:
         """
-        message = f" {message}  "  # extra space leaves the launchpad empty when message has scrolled
         if direction is None:
             direction = self.SCROLL_LEFT
-
-        if direction == self.SCROLL_RIGHT:
-            message = message[::-1]
-            for i in range(len(message)):
-                if wide:
-                    char = nl.letters[message[i]]
-                else:
-                    char = wf.letters[message[i]]
-                self.scroll_on_right(char)
-
-        else:
-            for i in range(len(message)):
-                if wide:
-                    char = nl.letters[message[i]]
-                else:
-                    char = wf.letters[message[i]]
-                self.scroll_on_left(char)
+        font = get_font(wide)
+        strip = TextStrip(message, font, proportional)
+        # One clock for the whole message, so the speed doesn't change between characters
+        clock = self.new_frame_clock()
+        draw = True
+        for frame in strip.frames(reverse=direction == self.SCROLL_RIGHT):
+            if draw:
+                self.draw_char(frame)
+            draw = clock.tick()
+        # The strip ends with a blank grid, leave the frame buffer the same for scroll_on_left / scroll_on_right
+        self.clear_frame_buffer()
 
 
 class LaunchpadPro(LaunchpadBase):
     """
     Support for the Launchpad Pro (experimental, not all working yet)
     """
+    profile_key = 'pro'
 
-    def __init__(self, name, out_port_num, in_port_num):
-        super(LaunchpadPro, self).__init__(name, out_port_num, in_port_num)
+    def __init__(self, name, out_port_num, in_port_num, backend=None, profile=None):
+        super(LaunchpadPro, self).__init__(name, out_port_num, in_port_num, backend, profile)
         print("Launchpad Pro startup")
         # The PRO has a bigger frame, so we need a larger storage space for our picture
         self.painter_frame = [[0 for _ in range(10)] for _ in range(10)]
@@ -526,45 +1183,31 @@ class LaunchpadPro(LaunchpadBase):
         :return:
         """
 
-        msg = [240, 0, 32, 41, 2, 16, 15, 0] + [red, green, blue] * 99 + [247]
-        self.lp_midi_out_port.send_message(msg)
+        self.send_message(self.encode_fill((red, green, blue)))
+        self.fill_led_state((red, green, blue))
 
-    def decode_button_message(self, msg):
-        button_number = msg[1]
-        pressed = False
-        x = button_number % 10
-        y = int((99 - button_number) / 10)
-        print(f"X: {x} Y: {y} Pressed = {pressed}")
-        return x, y
+    def encode_fill(self, value):
+        """
+        The Pro can fill every LED with one palette colour, or with one RGB colour in a single long message
+        :param value: a palette colour number or an (r, g, b) tuple
+        :return:
+        """
+        if isinstance(value, tuple):
+            return self.profile.sysex_prefix + [15, 0] + list(value) * 99 + [247]
+        return self.profile.sysex_prefix + [14, value, 247]
 
-    @staticmethod
-    def xy_to_number(x, y):
+    def xy_to_number(self, x, y):
         """
         Convert an x,y coordinate to an LED number
         :param x:
         :param y:
         :return:
         """
-        # The pro misses out buttons 0, 9, 90, where there could be buttons but aren't
-        if x < 0 or x > 9 or y < 0 or y > 9:
+        # The pro misses out the corners, where there could be buttons but aren't
+        if not self.is_pad(x, y):
             print(f"{x}, {y}")
             raise ValueError
-        # top row (round buttons) check
-        if y == 0 and x > 7:
-            print(f"{x}, {y}")
-            raise ValueError
-        # bottom row check
-        if y == 9 and 1 <= x > 7:
-            print(f"{x}, {y}")
-            raise ValueError
-        if y == 0:
-            led = 91 + x
-        elif y == 9:
-            led = x
-        else:
-            # swap y
-            led = 90 - (10 * y) + x
-        return led
+        return self.note_table[y][x][1]
 
     def set_led_xy(self, x, y, red, green, blue):
         """
@@ -577,9 +1220,7 @@ class LaunchpadPro(LaunchpadBase):
         :return:
         """
 
-        try:
-            led = self.xy_to_number(x, y)
-        except ValueError:
+        if not self.is_pad(x, y):
             return
 
         red = self.limit(red, 0, 63)
@@ -588,15 +1229,12 @@ class LaunchpadPro(LaunchpadBase):
             blue = 0
         else:
             blue = self.limit(blue, 0, 63)
-
-        # needs a sysex message , so wrap with byte_count 240 and 247
-        self.lp_midi_out_port.send_message([240, 0, 32, 41, 2, 16, 11, led, red, green, blue, 247])
-        # self.lp_midi_out_port.send_message([240, 0, 32, 41, 2, 24, 11, led, red, green, blue, 247])
+        self.store_led(x, y, (red, green, blue))
 
     def set_led_by_number(self, number, color_code):
         if not self.is_number(color_code):
             color_code = self.colour_to_number(color_code)
-        self.lp_midi_out_port.send_message([144, number, color_code])
+        self.store_led_by_message(144, number, color_code)
 
     def led_all_on(self, colour_code):
         """
@@ -616,7 +1254,8 @@ class LaunchpadPro(LaunchpadBase):
             colour_code = min(colour_code, 127)
             colour_code = max(colour_code, 0)
 
-        self.lp_midi_out_port.send_message([240, 0, 32, 41, 2, 16, 14, colour_code, 247])
+        self.send_message(self.encode_fill(colour_code))
+        self.fill_led_state(colour_code)
 
     def set_led_xy_by_colour(self, x, y, colour_code=48):
 
@@ -630,11 +1269,11 @@ class LaunchpadPro(LaunchpadBase):
         :return:
         """
 
-        try:
-            led = self.xy_to_number(x, y)
-            self.set_led_by_number(led, colour_code)
-        except ValueError:
-            pass
+        if not self.is_pad(x, y):
+            return
+        if not self.is_number(colour_code):
+            colour_code = self.colour_to_number(colour_code)
+        self.store_led(x, y, colour_code)
 
     def reset(self):
         """
@@ -703,8 +1342,10 @@ class LaunchpadMk2(LaunchpadBase):
     #        +---+---+---+---+---+---+---+---+  +---+
     #
 
+    profile_key = 'mk2'
+
     def programmer_mode(self):
-        self.lp_midi_out_port.send_message([240, 0, 32, 41, 2, 24, 34, 0, 247])
+        self.send_message(self.profile.sysex_prefix + [34, 0, 247])
 
     def led_all_on(self, colour_code='green'):
         """
@@ -712,7 +1353,6 @@ class LaunchpadMk2(LaunchpadBase):
         :param colour_code:
         :return:
         """
-        # BUG BUG - Single sysex message Not implemented on the MK3
         if not self.is_number(colour_code):
             # Try and find the text string in self.colours
             colour_code = self.colour_to_number(colour_code)
@@ -722,30 +1362,32 @@ class LaunchpadMk2(LaunchpadBase):
         else:
             colour_code = min(colour_code, 127)
             colour_code = max(colour_code, 0)
-        for led in range(11, 112):
-            self.set_led_by_number(led, colour_code)
+        # The MK2 sends one "all LEDs" message, the Mini MK3 doesn't have one so it gets multi LED messages
+        self.clear_led_state()
+        self.fill_leds(colour_code)
 
     def set_all_on(self, red, green, blue):
         red = int(red)
         green = int(green)
         blue = int(blue)
 
-        base_msg = [240, 0, 32, 41, 2, 24, 11]
+        base_msg = list(self.rgb_sysex_header)
         for led in range(11, 71):
             base_msg.append(led)
             base_msg.append(red)
             base_msg.append(green)
             base_msg.append(blue)
         base_msg.append(247)
-        self.lp_midi_out_port.send_message(base_msg)
-        base_msg = [240, 0, 32, 41, 2, 24, 11]
+        self.send_message(base_msg)
+        base_msg = list(self.rgb_sysex_header)
         for led in range(71, 111):
             base_msg.append(led)
             base_msg.append(red)
             base_msg.append(green)
             base_msg.append(blue)
         base_msg.append(247)
-        self.lp_midi_out_port.send_message(base_msg)
+        self.send_message(base_msg)
+        self.fill_led_state((red, green, blue))
 
     def reset(self):
         """
@@ -754,7 +1396,18 @@ class LaunchpadMk2(LaunchpadBase):
         """
         self.last_y = 0
         self.last_x = 0
-        self.lp_midi_out_port.send_message([240, 0, 32, 41, 2, 24, 14, 0, 247])
+        self.send_message(self.encode_fill(0))
+        self.fill_led_state(0)
+
+    def encode_fill(self, value):
+        """
+        The MK2 can set every LED to one palette colour, there's no RGB version
+        :param value: a palette colour number or an (r, g, b) tuple
+        :return:
+        """
+        if isinstance(value, tuple):
+            return None
+        return self.profile.sysex_prefix + [14, value, 247]
 
     def set_led_by_number(self, number, color_code):
 
@@ -774,9 +1427,9 @@ class LaunchpadMk2(LaunchpadBase):
             self.draw_colour = self.colours['red']
 
         if number < 104:
-            self.lp_midi_out_port.send_message([144, number, color_code])
+            self.store_led_by_message(144, number, color_code)
         else:
-            self.lp_midi_out_port.send_message([176, number, color_code])
+            self.store_led_by_message(176, number, color_code)
 
     def set_led_xy_by_colour(self, x, y, colour_code=None):
 
@@ -791,10 +1444,13 @@ class LaunchpadMk2(LaunchpadBase):
         """
         if colour_code is None:
             colour_code = 'green'
-        if x < 0 or x > 8 or y < 0 or y > 8:
+        if not self.is_pad(x, y):
             return
-        led = self.xy_to_number(x, y)
-        self.set_led_by_number(led, colour_code)
+        if not self.is_number(colour_code):
+            colour_code = self.colour_to_number(colour_code)
+        if self.draw_colour is None:
+            self.draw_colour = self.colours['red']
+        self.store_led(x, y, colour_code)
 
     def xy_to_number(self, x, y):
         """
@@ -822,19 +1478,16 @@ class LaunchpadMk2(LaunchpadBase):
         :return:
         """
 
-        if x < 0 or x > 8 or y < 0 or y > 8:
+        if not self.is_pad(x, y):
             return
 
-        led = self.xy_to_number(x, y)
         red = self.limit(red, 0, 63)
         green = self.limit(green, 0, 63)
         if blue is None:
             blue = 0
         else:
             blue = self.limit(blue, 0, 63)
-
-        # needs a sysex message , so wrap with byte_count 240 and 247
-        self.lp_midi_out_port.send_message([240, 0, 32, 41, 2, 16, 11, led, red, green, blue, 247])
+        self.store_led(x, y, (red, green, blue))
 
     def button_state_xy(self):
         """
@@ -849,58 +1502,58 @@ class LaunchpadMk2(LaunchpadBase):
             self.decode_button_message(msg[0])
         time.sleep(0.01)
 
-    def decode_button_message(self, msg):
-        x, y = 0, 0
-        msg_type = msg[0]
-        button_number = msg[1]
-        msg_data = msg[2]
-        pressed = False
-        print(f"msg {msg_type}, data = {msg_data}, button {button_number}")
-        if msg_type == 144:
-            x = (button_number % 10) - 1
-            y = 9 - int(button_number / 10)
-        elif msg_type == 176:
-            x, y = button_number - 104, 0
-        if msg_data > 0:
-            pressed = True
-
-        print(f"X: {x} Y: {y} Pressed = {pressed}")
-        return x, y
-
 
 class LaunchpadMiniMk3(LaunchpadMk2):
     """
     The LP mini MK3 is similar to the Launchpad MK2, but with some notable differences.
     """
 
+    # The Launchpad X talks the same protocol, it is driven by this class with its own profile
+    profile_key = 'minimk3'
+
+    def encode_sysex_entry(self, x, y, value):
+        """
+        The bytes for one LED inside a multi LED sysex, the lighting type 0 is a static palette colour
+        and 3 is a static RGB colour. Each LED has a lighting type before it, so palette and RGB colours
+        can be mixed in the same message and all 81 fit in one message
+        :param x:
+        :param y:
+        :param value: a palette colour number or an (r, g, b) tuple
+        :return:
+        """
+        led = self.note_table[y][x][1]
+        if isinstance(value, tuple):
+            red, green, blue = value
+            return [3, led, red, green, blue]
+        return [0, led, value]
+
     def programmer_mode(self):
         # self.lp_midi_out_port.send_message([240, 0, 32, 41, 2, 24, 14, colour_code, 247])
-        self.lp_midi_out_port.send_message([240, 0, 32, 41, 2, 13, 14, 1, 247])
+        self.send_message(self.profile.sysex_prefix + [14, 1, 247])
 
     def reset(self, colour=0):
         """
-        No global reset message, so doing this the slow way
-        Could use a RGB style message
+        No global reset message, so every pad is set, in as few multi LED messages as possible.
+        Pads we know are already showing the colour are left alone
         :param colour:
         :return:
         """
         self.last_y = 0
         self.last_x = 0
-        if colour == 0:
-            self.set_all_on(0, 0, 0)
-            return
-        # If we have a specific colour, then use the slower method
-        for x in range(9):
-            for y in range(9):
-                self.set_led_xy_by_colour(x, y, colour)
+        self.fill_leds(colour)
+
+    def encode_fill(self, value):
+        # Unlike the MK2 there's no "all LEDs" message
+        return None
 
     def set_all_on_slow(self, red, green, blue):
-        for x in range(9):
-            for y in range(9):
-                self.set_led_xy(x, y, red, green, blue)
+        with self.batch_updates():
+            for x in range(9):
+                for y in range(9):
+                    self.set_led_xy(x, y, red, green, blue)
 
     def set_all_on(self, red, green, blue):
-        base_msg = [240, 0, 32, 41, 2, 13, 3]
+        base_msg = list(self.rgb_sysex_header)
         for led in range(11, 100):
             base_msg.append(3)  # 3 is static, followed by R,G,B
             base_msg.append(led)
@@ -908,8 +1561,8 @@ class LaunchpadMiniMk3(LaunchpadMk2):
             base_msg.append(green)
             base_msg.append(blue)
         base_msg.append(247)
-        self.lp_midi_out_port.send_message(base_msg)
-        return
+        self.send_message(base_msg)
+        self.fill_led_state((red, green, blue))
 
     def set_led_xy(self, x, y, red, green, blue):
         """
@@ -922,18 +1575,16 @@ class LaunchpadMiniMk3(LaunchpadMk2):
         :return:
         """
 
-        if x < 0 or x > 8 or y < 0 or y > 8:
+        if not self.is_pad(x, y):
             return
 
-        led = self.xy_to_number(x, y)
         red = int(self.limit(red, 0, 63))
         green = int(self.limit(green, 0, 63))
         if blue is None:
             blue = 0
         else:
             blue = int(self.limit(blue, 0, 63))
-        # needs a sysex message , so wrap with byte_count 240 and 247
-        self.lp_midi_out_port.send_message([240, 0, 32, 41, 2, 13, 3, 3, led, red, green, blue, 247])
+        self.store_led(x, y, (red, green, blue))
 
     def set_led_by_number(self, number, color_code=None):
 
@@ -947,26 +1598,9 @@ class LaunchpadMiniMk3(LaunchpadMk2):
             self.draw_colour = self.colours['red']
 
         if number < 90:
-            self.lp_midi_out_port.send_message([144, number, color_code])
+            self.store_led_by_message(144, number, color_code)
         else:
-            self.lp_midi_out_port.send_message([176, number, color_code])
-
-    def decode_button_message(self, msg):
-        x, y = 0, 0
-        msg_type = msg[0]
-        button_number = msg[1]
-        msg_data = msg[2]
-        pressed = False
-        print(f"msg {msg_type}, data = {msg_data}, button {button_number}")
-        if msg_type == 144 or msg_type == 176:
-            x = (button_number % 10) - 1
-            y = 9 - int(button_number / 10)
-
-        if msg_data > 0:
-            pressed = True
-
-        print(f"X: {x} Y: {y} Pressed = {pressed}")
-        return x, y
+            self.store_led_by_message(176, number, color_code)
 
     def xy_to_number(self, x, y):
         """
@@ -1034,11 +1668,33 @@ class LpMini(LaunchpadBase):
     # +---+---+---+---+---+---+---+---+  +---+
     # |   |   |   |   |   |   |   |   |  |8/8|  8
     # +---+---+---+---+---+---+---+---+  +---+
+    profile_key = 'mini'
 
     def reset(self):
         self.last_y = 0
         self.last_x = 0
-        self.lp_midi_out_port.send_message([176, 0, 0])
+        self.send_message(self.encode_fill(0))
+        self.fill_led_state(0)
+
+    def encode_fill(self, value):
+        """
+        The only way to set every LED at once is the reset message, which turns them all off
+        :param value: a colour from get_led_color()
+        :return:
+        """
+        if value != 0:
+            return None
+        return [176, 0, 0]
+
+    def rgb_value(self, red, green, blue):
+        """
+        Scale 0 - 63 RGB to the nearest of the 0 - 3 red and green brightness levels, blue is ignored
+        :param red:
+        :param green:
+        :param blue:
+        :return:
+        """
+        return palette.red_green_value(red, green)
 
     def get_led_color(self, red, green):
         """
@@ -1056,21 +1712,18 @@ class LpMini(LaunchpadBase):
 
     def set_led_xy_by_colour(self, x, y, colour=None):
         """
-        Note that this doesn't appear to be working for top row buttons, Y = 0
+        The top row buttons, Y = 0, need a controller message rather than a note
         :param x:
         :param y:
         :param colour:
         :return:
         """
+        if not self.is_pad(x, y):
+            return
         if not self.is_number(colour):
             # Try and find the text string in self.colours
             colour = self.colour_to_number(colour)
-
-        led_id = self.xy_to_number(x, y)
-        if y == 0:
-            self.lp_midi_out_port.send_message([240, 176, 104 + x, colour, 247])
-        else:
-            self.lp_midi_out_port.send_message([144, led_id, colour])
+        self.store_led(x, y, colour)
 
     def set_led_by_number(self, led_id, red, green):
 
@@ -1079,10 +1732,10 @@ class LpMini(LaunchpadBase):
         # Due to the top row also being button IDs, 104-111 we have to subtract the extra 100 we
         # added previously to avoid confusion.
 
-        if led_id > 199 & led_id < 208:
-            self.lp_midi_out_port.send_message([176, led_id - 100, colour])
+        if 204 <= led_id <= 211:
+            self.store_led_by_message(176, led_id - 100, colour)
         else:
-            self.lp_midi_out_port.send_message([144, led_id, colour])
+            self.store_led_by_message(144, led_id, colour)
 
     def set_led_xy(self, x, y, red, green, blue=None):
         """
@@ -1094,11 +1747,9 @@ class LpMini(LaunchpadBase):
         :param blue: Ignored for the original lP mini which doesn't have blue
         :return:
         """
-        if x < 0 or x > 8 or y < 0 or y > 8:
+        if not self.is_pad(x, y):
             return
-
-        led_id = self.xy_to_number(x, y)
-        self.set_led_by_number(led_id, red, green)
+        self.store_led(x, y, self.get_led_color(red, green))
 
     def xy_to_number(self, x, y):
         # Convert the X,Y to a single number. Top 4 bits are the Y value, bottom 4 bits are X
@@ -1128,29 +1779,124 @@ class LpMini(LaunchpadBase):
 
         time.sleep(0.01)
 
-    def decode_button_message(self, msg):
-        """
-        Translate the midi message into X/Y coordinates and a button state
-        :param msg:
+
+class OutputWriter(object):
+    """
+    Send a Launchpad's LED changes from a background thread at a fixed frame rate.
+    While the writer is running, set_led_xy and friends only update the LED buffer, so any number of
+    writes to the same pad between frames becomes a single message with the latest colour.
+    Safe to draw from the midi input callback and the main thread at the same time
+    e.g.
+    writer = OutputWriter(pad, frame_rate=50)
+    writer.start()
+    ... draw as normal ...
+    print(writer.stats())
+    writer.stop()
+    """
+
+    def __init__(self, pad, frame_rate=60):
+        self.pad = pad
+        self.frame_rate = frame_rate
+        self.thread = None
+        self.running = False
+        self.previous_auto_flush = pad.auto_flush
+        self.frames = 0  # How many times we actually sent something
+        self.pads_sent = 0
+        self.max_queue_depth = 0
+        self.last_latency = 0.0  # Seconds from the oldest change being made to it being sent
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+        self.last_send_time = 0.0  # Seconds spent in send_message for the last frame
+        self.max_send_time = 0.0
+        self.late_frames = 0  # Frames where sending took longer than the frame time, the port is saturated
+
+    def start(self):
+        """
+        Start sending from the background thread
         :return:
         """
-        x, y = 0, 0
-        msg_type = msg[0]
-        button_number = msg[1]
-        msg_data = msg[2]
-        pressed = False
-        print(f"msg type {msg_type}, button number {button_number}")
-        if msg_type == 144:
-            x = button_number & 0x0f
-            y = 1 + (button_number >> 4)
-        elif msg_type == 176:  # Top Row
-            x, y = button_number - 104, 0
-
-        if msg_data > 0:
-            pressed = True
+        if self.running:
+            return
+        with self.pad.led_lock:
+            self.previous_auto_flush = self.pad.auto_flush
+            self.pad.auto_flush = False
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="LaunchpadOutputWriter", daemon=True)
+        self.thread.start()
 
-        print(f"X: {x} Y: {y} Pressed = {pressed}")
-        return x, y
+    def stop(self):
+        """
+        Stop the background thread, anything still waiting is sent before returning
+        :return:
+        """
+        if not self.running:
+            return
+        self.running = False
+        self.thread.join()
+        self.thread = None
+        with self.pad.led_lock:
+            self.write_frame()
+            self.pad.auto_flush = self.previous_auto_flush
+
+    def run(self):
+        # Dropping frames here just means the next frame carries more changes
+        clock = FrameClock(1.0 / self.frame_rate, drop_frames=True)
+        clock.start()
+        while self.running:
+            self.write_frame()
+            if not clock.tick():
+                self.late_frames += 1
+
+    def write_frame(self):
+        """
+        Send everything that has changed since the last frame
+        :return:
+        """
+        pad = self.pad
+        with pad.led_lock:
+            depth = len(pad.dirty_leds)
+            if not depth:
+                return
+            dirty_since = pad.dirty_since
+            start = time.perf_counter()
+            pad.flush()
+            end = time.perf_counter()
+        self.frames += 1
+        self.pads_sent += depth
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.last_send_time = end - start
+        self.max_send_time = max(self.max_send_time, self.last_send_time)
+        self.last_latency = end - dirty_since
+        self.max_latency = max(self.max_latency, self.last_latency)
+        self.total_latency += self.last_latency
+
+    def queue_depth(self):
+        """
+        :return: how many pads are waiting to be sent
+        """
+        return len(self.pad.dirty_leds)
+
+    def stats(self):
+        """
+        Report how busy the writer is. If late_frames keeps going up, or max_send_time is close
+        to the frame time, the midi port can't keep up with the frame rate
+        :return: dictionary of statistics
+        """
+        pad = self.pad
+        return {'frame_rate': self.frame_rate,
+                'frames': self.frames,
+                'queue_depth': self.queue_depth(),
+                'max_queue_depth': self.max_queue_depth,
+                'writes': pad.write_count,
+                'pads_sent': self.pads_sent,
+                'coalesced': pad.coalesced_count,
+                'dropped': pad.dropped_count,
+                'last_latency': self.last_latency,
+                'max_latency': self.max_latency,
+                'mean_latency': self.total_latency / self.frames if self.frames else 0.0,
+                'last_send_time': self.last_send_time,
+                'max_send_time': self.max_send_time,
+                'late_frames': self.late_frames}
 
 
 def rgb_from_int(rgb):
@@ -1166,6 +1912,65 @@ def rgb_from_int(rgb):
     return red, green, blue
 
 
+def rgb_frame_bytes(frame):
+    """
+    Flatten a frame of RGB data into bytes of red, green, blue values limited to 0 - 63
+    :param frame: a flat list, bytes or memoryview of channel values, a list of rows of (r, g, b)
+    or a NumPy uint8 array
+    :return: the bytes and the width of the square frame
+    """
+    if hasattr(frame, "reshape"):
+        # A NumPy array, let it do the flattening
+        data = frame.reshape(-1).tobytes()
+    elif isinstance(frame, memoryview):
+        data = frame.tobytes()
+    elif isinstance(frame, (bytes, bytearray)):
+        data = bytes(frame)
+    else:
+        flat = []
+        for item in frame:
+            if isinstance(item, (list, tuple)):
+                # A row of pixels, or a single pixel
+                for pixel in item:
+                    if isinstance(pixel, (list, tuple)):
+                        flat += pixel
+                    else:
+                        flat.append(pixel)
+            else:
+                flat.append(item)
+        data = bytes(int(value) for value in flat)
+    widths = {192: 8, 243: 9, 300: 10}
+    if len(data) not in widths:
+        raise ValueError(f"A frame needs 8*8, 9*9 or 10*10 RGB values, not {len(data)} bytes")
+    return data.translate(LIMIT_63), widths[len(data)]
+
+
+def pack_sysex(header, entries, per_message):
+    """
+    Pack a list of LED entries into as few sysex messages as possible
+    :param header: The start of each sysex message, including the 240
+    :param entries: list of lists of bytes, one per LED
+    :param per_message: the most entries allowed in a single message
+    :return: a list of midi messages
+    """
+    messages = []
+    for start in range(0, len(entries), per_message):
+        msg = list(header)
+        for entry in entries[start:start + per_message]:
+            msg += entry
+        msg.append(247)
+        messages.append(msg)
+    return messages
+
+
+def message_bytes(messages):
+    """
+    :param messages: list of midi messages
+    :return: how many bytes they take to send
+    """
+    return sum(len(msg) for msg in messages)
+
+
 def save_frame(frame, filename="my_picture.csv"):
     """
     Store a the frame bitmap to a CSV file, will overwrite any previously saved file
@@ -1173,6 +1978,7 @@ def save_frame(frame, filename="my_picture.csv"):
     :param filename: Name of the file to save the data
     :return:
     """
+    import csv
     # TODO - Handle IO errors
     with open(filename, "w+", newline="") as my_csv:
         csv_writer = csv.writer(my_csv, delimiter=',')
@@ -1186,22 +1992,32 @@ def load_frame(pad, frame_file="my_picture.csv"):
     :param frame_file: name of the file to load
     :return:
     """
+    import csv
     # TODO Handle IO errors
+    frame = []
     with open(frame_file, "r") as csv_file:
         csv_reader = csv.reader(csv_file, delimiter=',')
-        for y, row in enumerate(csv_reader):
-            for x, value in enumerate(row):
-                red, green, blue = rgb_from_int(int(value))
-                pad.set_led_xy(x, y, red, green, blue)
+        for row in csv_reader:
+            frame.append([rgb_from_int(int(value)) for value in row])
+    pad.blit_rgb(frame, y_offset=0)
+
 
+# Which class drives each device_profiles protocol
+PAD_CLASSES = {'minimk3': LaunchpadMiniMk3,
+               'mk2': LaunchpadMk2,
+               'pro': LaunchpadPro,
+               'mini': LpMini}
 
-def get_me_a_pad():
+
+def get_me_a_pad(backend=None, cache_file=None):
     """
     Try and find a connected launchpad, currently only a single launchpad is used
+    :param backend: where to get midi ports from, defaults to real hardware via rtmidi
+    :param cache_file: where to remember the midi ports for a quicker start next time, e.g. PORT_CACHE_FILE
     :return: a Launchpad object
     """
     # Create a LaunchPad midi object to help us find the midi port a launchpad is connected to
-    lp_midi = LPMidi()
+    lp_midi = LPMidi(backend, cache_file)
     # Firstly find the port we can send messages to the Launchpad
     out_port = lp_midi.find_launchpad_out_port()
     # Now the port we will receive messages from
@@ -1214,22 +2030,48 @@ def get_me_a_pad():
     else:
         print("No Launchpad detected")
         sys.exit()
-    # This code supports LaunchPad mini, Mini Mk3 or Launchpad Mk2
-    # TODO put this in a lookup table
-    if "MiniMK3" in lp_midi.name:
-        pad = LaunchpadMiniMk3(lp_midi.name, out_port, in_port)
-    elif "Launchpad MK3" in lp_midi.name:
-        # Just for testing, no implementation yet
-        pad = LaunchpadMiniMk3( lp_midi.name, out_port, in_port)
-    elif "Mini" in lp_midi.name:
-        pad = LpMini(lp_midi.name, out_port, in_port)
-    elif "Pro" in lp_midi.name:
-        pad = LaunchpadPro(lp_midi.name, lp_midi.out_port_num, lp_midi.in_port_num)
-    else:
-        pad = LaunchpadMk2(lp_midi.name, out_port, in_port)
+    midi_out, midi_in = lp_midi.take_handles()
+    return open_pad(lp_midi.profile, lp_midi.name, out_port, in_port, lp_midi.backend, midi_out, midi_in,
+                    lp_midi.firmware.get(out_port))
+
+
+def get_all_pads(backend=None, cache_file=None):
+    """
+    Find and open every connected launchpad we support, e.g. for a pad_group.PadGroup
+    :param backend: where to get midi ports from, defaults to real hardware via rtmidi
+    :param cache_file: where to remember the midi ports for a quicker start next time, e.g. PORT_CACHE_FILE
+    :return: list of Launchpad objects, in midi output port order, empty if there aren't any
+    """
+    lp_midi = LPMidi(backend, cache_file)
+    pads = []
+    for profile, name, out_port, in_port in lp_midi.find_all_launchpads():
+        print(f"Midi out {out_port}, in {in_port}, name {name}")
+        # The first pad gets the rtmidi objects the ports were found with, the rest make their own
+        midi_out, midi_in = lp_midi.take_handles()
+        pads.append(open_pad(profile, name, out_port, in_port, lp_midi.backend, midi_out, midi_in,
+                             lp_midi.firmware.get(out_port)))
+    return pads
+
+
+def open_pad(profile, name, out_port, in_port, backend=None, midi_out=None, midi_in=None, firmware_version=None):
+    """
+    Make the Launchpad object for a profile, connect it up and reset it
+    :param profile: the device_profiles.DeviceProfile, which says which class talks to the Launchpad
+    :param name: the port name, or the part of it that was matched
+    :param out_port: midi output port number
+    :param in_port: midi input port number
+    :param backend: where to get midi ports from, defaults to real hardware via rtmidi
+    :param midi_out: rtmidi MidiOut to open the port on, None to make a new one
+    :param midi_in: rtmidi MidiIn to open the port on, None to make a new one
+    :param firmware_version: from the Launchpad's identity reply, see LPMidi.firmware
+    :return: a Launchpad object
+    """
+    pad_class = PAD_CLASSES[profile.protocol]
+    pad = pad_class(name, out_port, in_port, backend, profile)
+    pad.firmware_version = firmware_version
     pad.draw_colour = pad.colours['red']
     # Connect up and reset the LaunchPad
-    pad.open()
+    pad.open(midi_out, midi_in)
 
     pad.programmer_mode()
     pad.reset()
@@ -1,33 +1,17 @@
-import numpy as np
 import bitmaps as bmp
+from bitboard import Bitboard
 import time
 import pylaunchpad as pylp
 
 
 def rotate_bitmap(source_bmp, amount=1):
     """
-    Quick and dirty rotate an 8*8 bitmap 90 degrees clockwise
+    Rotate an 8*8 bitmap 90 degrees clockwise, see bitboard.Bitboard.rotate() to do it without the lists
     :param source_bmp: the 8*8 bitmap to rotate
     :param amount: how many times to rotate
     :return:
     """
-    bit_length = 8
-    bin_bitmap = []
-    # First build a bitmap from the 8 decimal numbers
-    for row in source_bmp:
-        bits = []
-        bin_val = bin(row)[2:].zfill(bit_length)
-        for bit in range(bit_length):
-            bits.append(bin_val[bit])
-        bin_bitmap.append(bits)
-    # Rotate the bitmap
-    bin_rot = np.rot90(bin_bitmap, amount, axes=(1, 0))
-    rotated_bmp = []
-    # convert the bitmap back to a list of decimal numbers
-    for row in bin_rot:
-        dec_val = sum(int(b) << i for i, b in enumerate(row[::-1]))
-        rotated_bmp.append(dec_val)
-    return rotated_bmp
+    return Bitboard.from_rows(source_bmp).rotate(amount).rows()
 
 
 def spin_ghost(pad):
@@ -4,9 +4,32 @@ for use with the Launchpad
 https://blinkinlabs.com/blinkytape/patternpaint/
 """
 import os
-import time
+import queue
+import threading
 from random import randint
 import glob
+import baked
+from frame_clock import FrameClock
+from pattern_file import PatternFile
+from pylaunchpad import RGB565, channel_tables, colour_bits
+
+# NumPy is only imported if load_frames() is used, see get_numpy()
+np = None
+
+
+def get_numpy():
+    """
+    Import NumPy the first time it is needed
+    :return: the numpy module, or None if it isn't installed
+    """
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        np = numpy
+    return np
 
 
 def get_csvfiles(directory):
@@ -18,16 +41,89 @@ def get_csvfiles(directory):
     return [f for f in glob.glob(directory + "/patterns/*.csv")]
 
 
-def frame_count(filename):
+def decode_line(line):
+    """
+    Turn one line of a CSV pattern into a frame
+    :param line: 64 comma separated 24 bit RGB values
+    :return: list of 64 packed RGB values, or None for a blank line
+    """
+    line = line.strip()
+    if not line:
+        return None
+    return [int(value) for value in line.split(",")]
+
+
+def stream_frames(my_file, loops=1, read_ahead=0):
+    """
+    Read the frames of a CSV pattern one at a time, as they are wanted, so the first frame can be shown
+    straight away and only a few frames are ever in memory, however big the file is
+    :param my_file: the CSV file, one frame of 64 packed RGB values per line
+    :param loops: how many times to go through the file, None to loop for ever. The file is read again
+    from the start for each loop rather than keeping the frames
+    :param read_ahead: if more than 0, read and decode up to this many frames ahead on a separate thread,
+    so a slow disk doesn't hold up the animation
+    :return: a generator of lists of 64 packed RGB values
+    """
+    if read_ahead > 0:
+        yield from read_ahead_frames(my_file, loops, read_ahead)
+        return
+    loop = 0
+    with open(my_file) as f:
+        while loops is None or loop < loops:
+            found = False
+            for line in f:
+                frame = decode_line(line)
+                if frame is not None:
+                    found = True
+                    yield frame
+            if not found:
+                # Nothing in the file, don't loop for ever
+                return
+            f.seek(0)
+            loop += 1
+
+
+def read_ahead_frames(my_file, loops, read_ahead):
     """
-    Simple count the number of lines in a file.  For small files this isn't worth optimising
-    For files that are hundreds of K then a different approach might be needed
-    For now it's plenty fast enough
-    Not there is no exception handling at all
-    :param filename: The file we want to count the number of lines in
-    :return: The number of lines
+    stream_frames() with the reading done by a separate thread, which stops if the generator is closed
     """
-    return len(open(filename).readlines())
+    frames = queue.Queue(read_ahead)
+    stop = threading.Event()
+    finished = object()  # Put on the queue after the last frame
+    errors = []
+
+    def put(item):
+        # Wait for room on the queue, giving up if the generator has been closed
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def reader():
+        try:
+            for frame in stream_frames(my_file, loops):
+                if not put(frame):
+                    return
+        except Exception as error:
+            errors.append(error)
+        put(finished)
+
+    thread = threading.Thread(target=reader, name="PatternReader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            frame = frames.get()
+            if frame is finished:
+                break
+            yield frame
+    finally:
+        stop.set()
+        thread.join()
+    if errors:
+        raise errors[0]
 
 
 def read_file(my_file):
@@ -37,72 +133,130 @@ def read_file(my_file):
     Every 8 rows is considered to be a single frame of animation
     There should be at least 8 rows and only multiples of 8
     The code does not validate the file in any way
-    The data is read into a list of frames, which are then appended to a master list of frames
+    The whole file is read, in one pass, use stream_frames() to only read frames as they are needed
     :return: A list of lists, each entry has 64 byte_count of RGB data for the 8*8 Matrix
     """
-
-    total_frames = int(frame_count(my_file))
-    mem_frames = []
-    with open(my_file) as f:
-        for frame in range(total_frames):
-            frame_mem = []
-            data = f.readline().split(",")
-            for y in range(8):
-                for x in range(8):
-                    packed = int(data[y * 8 + x])
-                    frame_mem.append(packed)
-            mem_frames.append(frame_mem)
-
-    return mem_frames
+    return list(stream_frames(my_file))
 
 
-def show_frames(pad, frame_data, modify_colour=False):
+def show_frames(pad, frame_data, modify_colour=False, frame_time=0.05, clock=None, gamma=1.0, bits=RGB565):
     """
     Show a series of frames on the Launchpad
     :param pad: A launchpad object
-    :param frame_data:The list of frames we want to display
+    :param frame_data:The list of frames we want to display, or a generator such as stream_frames()
     :param modify_colour: If we want random colours, set to true
-    :return:
+    :param frame_time: seconds per frame
+    :param clock: a FrameClock, to keep several calls on the same schedule
+    :param gamma: see pylaunchpad.gamma_table()
+    :param bits: RGB565 for the files in patterns/, 6 if the colours are already 0 - 63, 8 for 0 - 255
+    :return: the number of frames shown
     """
+    red_scale, green_scale, blue_scale = channel_tables(gamma, bits)
     red, green, blue = 0, 0, 0
-    # TODO - Use the faster sysex method of single message with all the rgb data
-    for frame in range(len(frame_data)):
+    shown = 0
+    if clock is None:
+        clock = FrameClock(frame_time)
+    for current_frame in frame_data:
         if modify_colour:
             red = randint(0, 63)
             green = randint(0, 63)
             blue = randint(0, 63)
 
-        current_frame = frame_data[frame]
-        time.sleep(0.05)
-        for y in range(8):
-            for x in range(8):
-                packed = current_frame[y * 8 + x]
-                if packed > 0 and modify_colour:  # if the colour is not black
-                    pad.set_led_xy(x, y, red, green, blue)
-                else:
-                    # Unpack the RGB value into its separate Red, Green & Blue values
-                    r = (packed & 0xFF0000) >> 16  # Shift the red value into the right most 8 bits
-                    g = (packed & 0xFF00) >> 8  # Shift the green value into the right most 8 bits
-                    b = packed & 0xFF  # Mask off the top two byte_count containing the red & green
-
-                    pad.set_led_xy(x, y + 1, int(r), int(g), int(b))
+        clock.tick()  # Wait for this frame's turn, whatever it took to draw the last one
+        rgb_frame = []
+        for packed in current_frame:
+            if packed > 0 and modify_colour:  # if the colour is not black
+                rgb_frame += [red, green, blue]
+            else:
+                # Unpack the RGB value into its separate Red, Green & Blue values, scaled to 0 - 63
+                rgb_frame.append(red_scale[(packed & 0xFF0000) >> 16])  # Shift the red into the right most 8 bits
+                rgb_frame.append(green_scale[(packed & 0xFF00) >> 8])  # Shift the green into the right most 8 bits
+                rgb_frame.append(blue_scale[packed & 0xFF])  # Mask off the top two byte_count, red & green
+        # The whole 8*8 frame goes in a single sysex message on the models that support it
+        pad.blit_rgb(rgb_frame)
+        shown += 1
+    return shown
 
 
-def show_single_frame(pad, single_frame):
+def show_single_frame(pad, single_frame, gamma=1.0, bits=RGB565):
     """
     Show a single frame from the animation CSV file,
     which contains a series of 24bit pixels
     :param pad:
     :param single_frame:
+    :param gamma: see pylaunchpad.gamma_table()
+    :param bits: RGB565 for the files in patterns/, 6 if the colours are already 0 - 63, 8 for 0 - 255
     :return:
     """
-    for y in range(8):
-        for x in range(8):
-            packed = single_frame[y * 8 + x]
-            r = (packed & 0xFF0000) >> 16
-            g = (packed & 0xFF00) >> 8
-            b = packed & 0xFF
-            pad.set_led_xy(x, y, int(r), int(g), int(b))
+    red_scale, green_scale, blue_scale = channel_tables(gamma, bits)
+    rgb_frame = []
+    for packed in single_frame:
+        rgb_frame.append(red_scale[(packed & 0xFF0000) >> 16])
+        rgb_frame.append(green_scale[(packed & 0xFF00) >> 8])
+        rgb_frame.append(blue_scale[packed & 0xFF])
+    pad.blit_rgb(bytes(rgb_frame), y_offset=0)
+
+
+def load_frames(my_file, gamma=1.0, bits=None):
+    """
+    Decode a whole CSV pattern in one go, using NumPy if it is installed.
+    The file is parsed by NumPy's loader and each of the unpacking, scaling and reshaping steps is a single
+    array operation, rather than Python code for every pixel
+    :param my_file: the CSV file, one frame of 64 packed RGB values per line
+    :param gamma: see pylaunchpad.gamma_table()
+    :param bits: RGB565, 6 if the colours are 0 - 63 or 8 if they are 0 - 255, None to decide from the biggest
+    value in each channel, see pylaunchpad.colour_bits()
+    :return: a (frames, 8, 8, 3) uint8 array of 0 - 63 values, each frame ready for pad.blit_rgb().
+    Without NumPy, a list of bytes with the same values
+    """
+    numpy = get_numpy()
+    if numpy is None:
+        frames = []
+        for frame in stream_frames(my_file):
+            rgb_frame = bytearray()
+            for packed in frame:
+                rgb_frame += bytes(((packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF))
+            frames.append(bytes(rgb_frame))
+        if bits is None:
+            bits = colour_bits(*(max((max(frame[channel::3], default=0) for frame in frames), default=0)
+                                 for channel in range(3)))
+        tables = channel_tables(gamma, bits)
+        scaled = []
+        for frame in frames:
+            rgb_frame = bytearray(frame)
+            for channel, table in enumerate(tables):
+                rgb_frame[channel::3] = frame[channel::3].translate(table)
+            scaled.append(bytes(rgb_frame))
+        return scaled
+    packed = numpy.loadtxt(my_file, delimiter=",", dtype=numpy.uint32, ndmin=2)
+    if packed.size == 0:
+        return numpy.zeros((0, 8, 8, 3), dtype=numpy.uint8)
+    # Split each 24 bit value into its three bytes, then look every byte up in the gamma table at once
+    channels = numpy.stack(((packed >> 16) & 0xFF, (packed >> 8) & 0xFF, packed & 0xFF), axis=-1).astype(numpy.uint8)
+    if bits is None:
+        bits = colour_bits(*channels.reshape(-1, 3).max(axis=0).tolist())
+    # One row of the lookup per channel, indexed by channel number and value together
+    lookup = numpy.frombuffer(b"".join(channel_tables(gamma, bits)), dtype=numpy.uint8).reshape(3, 256)
+    return lookup[numpy.arange(3), channels].reshape(-1, 8, 8, 3)
+
+
+def show_array(pad, frames, frame_time=0.05, clock=None):
+    """
+    Show frames that are already 0 - 63 RGB values, such as those from load_frames()
+    :param pad: A launchpad object
+    :param frames: a (frames, 8, 8, 3) array, or a list of anything pad.blit_rgb() takes
+    :param frame_time: seconds per frame
+    :param clock: a FrameClock, to keep several calls on the same schedule
+    :return: the number of frames shown
+    """
+    if clock is None:
+        clock = FrameClock(frame_time)
+    shown = 0
+    for frame in frames:
+        clock.tick()
+        pad.blit_rgb(frame)
+        shown += 1
+    return shown
 
 
 def show_all(pad):
@@ -118,12 +272,14 @@ def show_all(pad):
         show_file(pad, file, append_path=False)
 
 
-def show_file(pad, filename, append_path=True):
+def show_file(pad, filename, append_path=True, bake=False):
     """
-    display the frame data from a suitable CSV file
+    display the frame data from a suitable CSV file, or a .lpat pattern file
     :param pad:
     :param filename:
     :param append_path:
+    :param bake: work out the messages once and send the same ones each of the three times, see baked.py.
+    The whole pattern is then in memory before the first frame shows, so by default it is streamed instead
     :return:
     NOTE - No validation on the suitability of the file is done.  If it isn't in the right format
     then random or more likely, no data, will be displayed
@@ -132,13 +288,22 @@ def show_file(pad, filename, append_path=True):
         current_dir = os.path.dirname(os.path.realpath(__file__))
         filename = f"{current_dir}/patterns/{filename}"
     print(f"Using file {filename}")
-
-    frame_data = read_file(filename)
-    frames = len(frame_data)
-    print(f"frame_data has {frames} frames")
-    show_frames(pad, frame_data)
-    for _ in range(2):
-        show_frames(pad, frame_data, False)
+    if filename.endswith(".lpat"):
+        # A binary pattern file from pattern_file.py, frames are read as they are played
+        with PatternFile(filename) as pattern:
+            print(f"{filename} has {len(pattern)} frames")
+            if not bake:
+                pattern.play(pad, loops=3)
+                return
+            animation = baked.bake(pad, lambda clock: pattern.play(pad, clock=clock), pattern.frame_time)
+    elif not bake:
+        # Play it three times, reading the file as we go rather than loading it all first
+        show_frames(pad, stream_frames(filename, loops=3, read_ahead=8), clock=FrameClock(0.05))
+        return
+    else:
+        animation = baked.bake(pad, lambda clock: show_frames(pad, stream_frames(filename), clock=clock), 0.05)
+    # The messages are worked out once, then the same ones are sent each of the three times it is played
+    animation.play(pad, loops=3)
 
 
 if __name__ == "__main__":
@@ -3,28 +3,7 @@ import bitmaps as bmp
 import time
 from random import choice
 
-
-def get_tree_row_data(y):
-    if y == 0:
-        tree_row = 0
-    else:
-        tree_row = bmp.tree[y - 1]
-    return tree_row
-
-
-def draw_single_snow_row(pad, snow_rows, y):
-    for x in range(0, 8):
-        # the tree starts at row 1, so for row 0, snow is always drawn
-        mask = 128 >> x
-        tree_row = get_tree_row_data(y)
-
-        if mask & snow_rows[y]:
-            pad.set_led_xy_by_colour(x, y, pad.colours['white'])
-        else:
-            if tree_row & mask:
-                pad.set_led_xy_by_colour(x, y, pad.colours['green'])
-            else:
-                pad.set_led_xy_by_colour(x, y, pad.colours['black'])
+from compositor import Compositor
 
 
 def tree(pad):
@@ -37,18 +16,28 @@ def tree(pad):
     pad.draw_char(bmp.tree)
 
 
-def snow_tree(pad):
+def snow_tree(pad, frame_time=.8):
+    """
+    Snow falling on the tree, drawn in front of it
+    :param pad:
+    :param frame_time: seconds between frames
+    :return:
+    """
     snow_flakes = [0x1, 0x2, 0x4, 0x8, 0x10, 0x20, 0x00, 0x40, 0x00, 0x80, 0x00]
 
+    # The tree and the snow are layers, so where snow has fallen past the tree comes back by itself,
+    # and each frame only works out the pads a flake has left or landed on
+    scene = Compositor(pad)
+    scene.add_layer(bmp.tree, 'green')
+    snow_layer = scene.add_layer([], 'white', y=0, z=1)
     snow_rows = []
     for _ in range(10):
         snow_rows.insert(0, choice(snow_flakes))
-
-        for y in range(len(snow_rows)):
-            draw_single_snow_row(pad, snow_rows, y)
+        snow_layer.set_bitmap(snow_rows)
+        scene.show()
         if len(snow_rows) == 9:
             snow_rows.pop(8)
-        time.sleep(.8)
+        time.sleep(frame_time)
 
 
 if __name__ == "__main__":
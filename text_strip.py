@@ -0,0 +1,144 @@
+"""
+Lay out a whole message once, then scroll it by sliding an 8 pixel window along it.
+Each row of the message is kept as one long Python integer, the left most column in the highest bit,
+so a frame of the scroll is 8 shifts and masks rather than re-doing the bit twiddling for every
+column of every character.
+The fonts are 8 * 8 bitmaps but most characters are narrower than that, narrow_letters are only 5
+pixels wide, so by default each character only takes up as many columns as it needs plus a gap,
+which means far fewer frames to scroll the same message.
+e.g.
+strip = TextStrip("Hello World", get_font())
+for frame in strip.frames():
+    pad.draw_char(frame)
+"""
+
+# Columns added between characters, and columns used for a space, when proportional
+SPACING = 1
+SPACE_WIDTH = 3
+
+# The fonts are only imported when text is first drawn, see get_font()
+fonts = {}
+
+
+def get_font(wide=False):
+    """
+    :param wide: True for wide_font, otherwise narrow_letters
+    :return: the font's dictionary of 8 * 8 characters
+    """
+    if wide not in fonts:
+        if wide:
+            import wide_font as font_module
+        else:
+            import narrow_letters as font_module
+        fonts[wide] = font_module.letters
+    return fonts[wide]
+
+
+def glyph_metrics(glyph):
+    """
+    Find which columns of an 8 * 8 character are used
+    :param glyph: 8 bytes, one per row, the left most pixel is bit 7
+    :return: (first column used, number of columns used), (0, 0) for an empty character
+    """
+    used = 0
+    for row in glyph:
+        used |= int(row)
+    used &= 0xFF
+    if not used:
+        return 0, 0
+    first = 0
+    while not used & (128 >> first):
+        first += 1
+    last = 7
+    while not used & (128 >> last):
+        last -= 1
+    return first, last - first + 1
+
+
+class TextStrip(object):
+    """
+    A message rendered into 8 rows of pixels, as wide as it needs to be
+    """
+
+    def __init__(self, message, font=None, proportional=True, spacing=SPACING, space_width=SPACE_WIDTH,
+                 kerning=None, padding=8):
+        """
+        :param message: the text to show
+        :param font: dictionary of 8 * 8 characters, e.g. narrow_letters.letters or wide_font.letters
+        :param proportional: if True each character is only as wide as it needs to be, otherwise every
+        character is 8 columns wide, as the old scroll_on_left / scroll_on_right did
+        :param spacing: blank columns between characters when proportional
+        :param space_width: columns for a space when proportional
+        :param kerning: optional dictionary of (char, next char) to a number of columns to add to the gap,
+        negative to close it up (never past touching), e.g. {('T', 'o'): -1}
+        :param padding: blank columns before and after the message, 8 so it scrolls on and off an empty grid
+        """
+        if font is None:
+            font = get_font()
+        kerning = kerning or {}
+        self.message = message
+        # (char, first column in the strip, width) for each character, for anyone wanting to find a character
+        self.metrics = []
+        # Columns are added on the right, shifting everything already there to the left
+        self.rows = [0] * 8
+        width = padding
+        previous = None
+        for char in message:
+            glyph = font.get(char, font[' '])
+            if proportional:
+                first, char_width = glyph_metrics(glyph)
+                if char_width == 0:
+                    first, char_width = 0, space_width
+                if previous is not None:
+                    gap = max(spacing + kerning.get((previous, char), 0), 0)
+                    self.rows = [row << gap for row in self.rows]
+                    width += gap
+            else:
+                first, char_width = 0, 8
+            # Move the columns the character uses down to the bottom bits
+            shift = 8 - first - char_width
+            mask = (1 << char_width) - 1
+            self.metrics.append((char, width, char_width))
+            self.rows = [(row << char_width) | ((int(glyph[y]) >> shift) & mask)
+                         for y, row in enumerate(self.rows)]
+            width += char_width
+            previous = char
+        self.rows = [row << padding for row in self.rows]
+        self.width = width + padding
+
+    def window(self, offset, columns=8):
+        """
+        The pixels of the strip from offset, as 8 bytes ready for draw_char
+        :param offset: the strip column at the left of the window
+        :param columns: how many columns wide the window is
+        :return: list of 8 row values, the left most pixel is bit 7
+        """
+        shift = self.width - offset - columns
+        mask = (1 << columns) - 1
+        if shift >= 0:
+            rows = [(row >> shift) & mask for row in self.rows]
+        else:
+            rows = [(row << -shift) & mask for row in self.rows]
+        if columns != 8:
+            rows = [row << (8 - columns) for row in rows]
+        return rows
+
+    def frame_count(self):
+        """
+        :return: how many frames it takes to scroll the whole message across the grid
+        """
+        return self.width - 8
+
+    def frames(self, reverse=False):
+        """
+        Slide the window along the strip one column at a time. The first frame already has the first
+        column of the message in it, and the last is empty
+        :param reverse: False to scroll the message on from the right, so it moves to the left,
+        True to scroll it on from the left
+        :return: a generator of 8 byte frames
+        """
+        offsets = range(1, self.width - 7)
+        if reverse:
+            offsets = range(self.width - 9, -1, -1)
+        for offset in offsets:
+            yield self.window(offset)